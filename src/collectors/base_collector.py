@@ -1,37 +1,219 @@
 """Базовый класс для коллекторов данных"""
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
-import requests
-from requests.exceptions import HTTPError
-from bs4 import BeautifulSoup
-from src.utils.helpers import get_headers, sleep_random
+from typing import TYPE_CHECKING, List, Dict, Optional, Callable, Iterable, Tuple
+from urllib.parse import quote
+from src.utils.helpers import make_soup, sleep_random, load_json
+from src.utils.http_client import (
+    create_session, fetch_with_retry, fetch_shared, canonicalize_url, is_host_available,
+    CIRCUIT_OPEN, HOST_FAILURE_STATUSES, HTML_CONTENT_TYPES, JSON_CONTENT_TYPES
+)
+from src.utils.name_matching import accepts_name, rank_candidates
+from src.utils.parse_cache import content_key
+from src.utils.snippets import parse_search_snippet, missing_fields
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 
 class BaseCollector(ABC):
     """Базовый класс для всех коллекторов"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(get_headers())
+    BASE_URL = ''
+    SOURCE = ''
     
-    def fetch_page(self, url: str, timeout: int = 10) -> Optional[BeautifulSoup]:
-        """Получает HTML страницу и парсит её"""
-        try:
+    # Сколько лучших кандидатов со страницы поиска проверять по детальным страницам
+    MAX_DETAIL_FETCHES = 3
+    
+    # Регулярное выражение для ссылок на компании в результатах поиска
+    # (группа 1 - путь относительно BASE_URL); None - источник без поиска
+    SEARCH_RESULT_PATTERN = None
+    
+    # Версия разбора детальных страниц: увеличивается при изменении parse_company_page,
+    # чтобы записи этого источника в кеше разобранных страниц разбирались заново
+    EXTRACTOR_VERSION = 1
+    
+    _session = None
+    
+    def __init__(self, parse_pool=None, base_url: Optional[str] = None, parse_cache=None,
+                 proxy_pool=None):
+        # Необязательный ParsePool: разбор страниц выполняется в отдельных процессах
+        self.parse_pool = parse_pool
+        # Необязательный ParsedRecordCache: неизменившиеся страницы не разбираются повторно
+        self.parse_cache = parse_cache
+        # Необязательный ProxyPool: запросы идут через исходящие прокси со своим бюджетом у каждого
+        self.proxy_pool = proxy_pool
+        # Другой адрес источника (например, локальный симулятор src/simulator)
+        if base_url:
+            self.BASE_URL = base_url.rstrip('/')
+        # Статус последней загрузки - свой у каждого потока (поиски идут параллельно)
+        self._local = threading.local()
+    
+    @property
+    def last_fetch_status(self) -> Optional[str]:
+        """Класс результата последней загрузки в текущем потоке (см. src.utils.http_client)"""
+        return getattr(self._local, 'last_fetch_status', None)
+    
+    @last_fetch_status.setter
+    def last_fetch_status(self, status: Optional[str]):
+        self._local.last_fetch_status = status
+    
+    @property
+    def fetch_deadline(self) -> Optional[float]:
+        """
+        Срок (time.monotonic) для загрузок текущего потока: повторы, паузы и
+        чтение ответа не выходят за него (см. fetch_with_retry, deadline_at)
+        """
+        return getattr(self._local, 'fetch_deadline', None)
+    
+    @fetch_deadline.setter
+    def fetch_deadline(self, deadline: Optional[float]):
+        self._local.fetch_deadline = deadline
+    
+    def last_fetch_failed(self) -> bool:
+        """Последняя загрузка в текущем потоке не удалась из-за источника (блокировка, 5xx, сеть)"""
+        return self.last_fetch_status in HOST_FAILURE_STATUSES or self.last_fetch_status == CIRCUIT_OPEN
+    
+    @property
+    def session(self):
+        """HTTP-сессия создается при первом запросе (запуски без сети не импортируют requests)"""
+        if self._session is None:
+            self._session = create_session()
+        return self._session
+    
+    def fetch_content(self, url: str, timeout: int = 10,
+                      allowed_types: Optional[Tuple[str, ...]] = HTML_CONTENT_TYPES) -> Optional[bytes]:
+        """
+        Загружает страницу и возвращает тело ответа без разбора.
+        
+        None возвращается и для отсутствующей страницы, и для ошибки;
+        причина сохраняется в self.last_fetch_status (см. src.utils.http_client).
+        Ответы с другим Content-Type (allowed_types; None - любой), слишком
+        большие или слишком медленные не загружаются целиком.
+        """
+        # Хост отключен circuit breaker'ом - не ждем ни паузы, ни таймаута
+        if not is_host_available(url):
+            self.last_fetch_status = CIRCUIT_OPEN
+            return None
+        
+        fetch_deadline = self.fetch_deadline
+        
+        def fetch(page_url: str):
+            # Пауза вежливости - только перед настоящим запросом, а не для ожидающих его результата
             sleep_random(1.0, 2.5)
-            response = self.session.get(url, timeout=timeout, allow_redirects=True)
-            # Не выводим ошибку для 404, просто возвращаем None
-            if response.status_code == 404:
-                return None
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'lxml')
-        except HTTPError as e:
-            if hasattr(e, 'response') and e.response.status_code == 404:
-                return None
-            # Для других ошибок не выводим сообщение
+            return fetch_with_retry(self.session, page_url, timeout=timeout,
+                                    allowed_types=allowed_types, proxy_pool=self.proxy_pool,
+                                    deadline_at=fetch_deadline, allow_redirects=True)
+        
+        result = fetch_shared(url, fetch, allowed_types)
+        self.last_fetch_status = result.status
+        return result.content if result.ok else None
+    
+    def search_page_url(self, query: str, page: int = 1) -> str:
+        """URL страницы результатов поиска (страницы нумеруются с 1)"""
+        url = f"{self.BASE_URL}/search?query={quote(query)}"
+        return url if page <= 1 else f"{url}&page={page}"
+    
+    def is_available(self) -> bool:
+        """False, пока источник отключен circuit breaker'ом после серии отказов"""
+        if not self.BASE_URL:
+            return True
+        return is_host_available(self.BASE_URL)
+    
+    def fetch_page(self, url: str, timeout: int = 10) -> Optional['BeautifulSoup']:
+        """Получает HTML страницу и парсит её"""
+        content = self.fetch_content(url, timeout=timeout)
+        if content is None:
             return None
-        except Exception:
-            # Молча игнорируем другие ошибки
+        return make_soup(content)
+    
+    def fetch_json(self, url: str, timeout: int = 10):
+        """Получает JSON-ответ (API источника) и разбирает его; None - ошибка загрузки или не JSON"""
+        content = self.fetch_content(url, timeout=timeout, allowed_types=JSON_CONTENT_TYPES)
+        if content is None:
             return None
+        try:
+            return load_json(content)
+        except ValueError as e:
+            print(f"Некорректный JSON {url}: {e}")
+            return None
+    
+    def parse_content(self, parser: Callable, content: bytes, url: str):
+        """
+        Разбирает загруженную страницу: в пуле процессов, если он задан, иначе в текущем потоке.
+        
+        Если задан parse_cache, страница с тем же телом, уже разобранная
+        тем же парсером текущей версии (EXTRACTOR_VERSION), берется из кеша.
+        Записи разделены по парсерам, а не только по SOURCE: разные коллекторы
+        одного источника разбирают страницы по-разному.
+        """
+        if self.parse_cache is not None:
+            namespace = f"{self.SOURCE}:{parser.__module__}.{parser.__qualname__}"
+            key = content_key(content, url)
+            found, record = self.parse_cache.get(namespace, key, self.EXTRACTOR_VERSION)
+            if found:
+                return record
+        
+        if self.parse_pool is not None:
+            record = self.parse_pool.run(parser, content, url)
+        else:
+            record = parser(content, url)
+        
+        if self.parse_cache is not None:
+            self.parse_cache.put(namespace, key, self.EXTRACTOR_VERSION, record)
+        return record
+    
+    def resolve_candidates(self, company_name: str, candidates: List[Tuple[str, str]],
+                           required_fields: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """
+        Проверяет лучших кандидатов (url, фрагмент) со страницы поиска.
+        
+        Если задан required_fields и фрагмент результата поиска уже содержит
+        все эти поля, возвращается неполная запись из фрагмента (с detail_url)
+        без загрузки детальной страницы. Иначе загружается детальная страница.
+        """
+        # Одна и та же карточка находится и по ссылке, и по регулярному выражению:
+        # повторы схлопываются по каноническому URL, а загружается исходный
+        original_urls = {}
+        for url, _ in candidates:
+            original_urls.setdefault(canonicalize_url(url), url)
+        candidates = [(canonicalize_url(url), snippet) for url, snippet in candidates]
+        for canonical_url, snippet in rank_candidates(candidates, company_name, self.MAX_DETAIL_FETCHES):
+            company_url = original_urls[canonical_url]
+            partial = parse_search_snippet(snippet, company_url, self.SOURCE)
+            if (required_fields and partial and accepts_name(company_name, partial['name'])
+                    and not missing_fields(partial, required_fields)):
+                return partial
+            
+            company_data = self.get_company_data(company_url)
+            if company_data and accepts_name(company_name, company_data.get('name', '')):
+                # Поля, которых нет на детальной странице, берем из фрагмента
+                if partial:
+                    for key, value in partial.items():
+                        if key != 'detail_url' and not company_data.get(key) and value:
+                            company_data[key] = value
+                return company_data
+        return None
+    
+    def complete_company(self, company: Dict, fields: Iterable[str]) -> Dict:
+        """
+        Дозагружает недостающие поля неполной записи с детальной страницы.
+        
+        Страница загружается, только если хотя бы одно из полей fields пусто
+        и в записи есть detail_url. Заполненные поля не перезаписываются.
+        """
+        detail_url = company.get('detail_url')
+        if not detail_url or not missing_fields(company, fields):
+            return company
+        
+        company_data = self.get_company_data(detail_url)
+        if company_data:
+            for key, value in company_data.items():
+                if not company.get(key) and value:
+                    company[key] = value
+        # Детальная страница уже загружена - больше дозагружать нечего
+        company['detail_url'] = None
+        return company
     
     @abstractmethod
     def search_companies(self, query: str, max_results: int = 50) -> List[Dict]:
@@ -42,4 +224,3 @@ class BaseCollector(ABC):
     def get_company_data(self, company_url: str) -> Optional[Dict]:
         """Получение данных о компании по URL"""
         pass
-
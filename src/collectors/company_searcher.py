@@ -1,21 +1,180 @@
 """Поиск конкретных компаний на rusprofile.ru по названиям"""
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable
 from urllib.parse import quote
 from src.collectors.base_collector import BaseCollector
-from src.utils.helpers import normalize_revenue, normalize_inn, normalize_employees, normalize_url
+from src.utils.helpers import normalize_revenue, normalize_inn, normalize_employees, normalize_url, make_soup
+from src.utils.name_matching import matches_name, snippet_text
+from src.utils.snippets import iter_result_windows
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+def parse_company_page(content: bytes, company_url: str) -> Optional[Dict]:
+    """Извлекает данные о компании из HTML страницы rusprofile.ru (может выполняться в пуле процессов)"""
+    soup = make_soup(content)
+    
+    try:
+        # Получаем HTML как текст для поиска с помощью регулярных выражений
+        html_text = str(soup)
+        page_text = soup.get_text()
+        
+        # Извлечение ИНН с помощью регулярных выражений
+        inn = None
+        # Пробуем найти ИНН в URL
+        if '/inn/' in company_url:
+            inn_match = re.search(r'/inn/(\d{10,12})', company_url)
+            if inn_match:
+                inn = normalize_inn(inn_match.group(1))
+        
+        # Если ИНН не найден, ищем на странице с помощью регулярных выражений
+        if not inn:
+            # Паттерны для поиска ИНН
+            inn_patterns = [
+                r'ИНН[:\s</>]*(\d{10,12})',
+                r'ИНН\s*[:\s</>]*(\d{10,12})',
+                r'inn[:\s</>]*(\d{10,12})',
+                r'<[^>]*>ИНН[:\s]*</[^>]*>[\s<]*(\d{10,12})',
+            ]
+            for pattern in inn_patterns:
+                match = re.search(pattern, html_text, re.IGNORECASE)
+                if match:
+                    inn = normalize_inn(match.group(1))
+                    if inn:
+                        break
+        
+        # Название компании - ищем в различных местах
+        name = None
+        # Сначала пробуем через BeautifulSoup
+        name_elem = soup.find('h1') or soup.find('title')
+        if name_elem:
+            name = name_elem.get_text(strip=True)
+        
+        # Если не нашли, ищем с помощью регулярных выражений
+        if not name or len(name) < 3:
+            name_patterns = [
+                r'<h1[^>]*>([^<]+)</h1>',
+                r'<title>([^<]+)</title>',
+                r'company-name[^>]*>([^<]+)',
+                r'название[:\s</>]*([А-Яа-яЁё\s"«»]+)',
+            ]
+            for pattern in name_patterns:
+                match = re.search(pattern, html_text, re.IGNORECASE)
+                if match:
+                    name = match.group(1).strip()
+                    if name and len(name) > 3:
+                        break
+        
+        # Выручка - ищем с помощью регулярных выражений
+        revenue = None
+        revenue_patterns = [
+            r'выручка[:\s</>]*(\d+(?:\s*\d+)*)\s*руб',
+            r'выручка[:\s</>]*(\d+(?:\s*\d+)*)',
+            r'доход[:\s</>]*(\d+(?:\s*\d+)*)\s*руб',
+            r'(\d+(?:\s*\d+)*)\s*руб[.\s]*выручка',
+            r'выручка[^<]*>(\d+(?:\s*\d+)*)',
+            r'<[^>]*>(\d+(?:\s*\d+)*)\s*руб[^<]*выручка',
+        ]
+        
+        for pattern in revenue_patterns:
+            match = re.search(pattern, html_text, re.IGNORECASE)
+            if match:
+                revenue_str = match.group(1).replace(' ', '').replace('\xa0', '')
+                revenue = normalize_revenue(revenue_str)
+                if revenue:
+                    break
+        
+        # Сайт - ищем с помощью регулярных выражений
+        site = None
+        # Паттерны для поиска сайта (более точные)
+        site_patterns = [
+            r'сайт[:\s</>]*https?://([^\s<"\'<>]+)',
+            r'сайт[:\s</>]*www\.([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
+            r'href=["\'](https?://(?!baturin|rusprofile|yandex|google|facebook|vk|twitter|linkedin)[^"\']+)["\']',
+            r'www\.([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})(?!.*rusprofile|.*yandex|.*google)',
+        ]
+        
+        for pattern in site_patterns:
+            matches = re.finditer(pattern, html_text, re.IGNORECASE)
+            for match in matches:
+                href = match.group(1) if match.lastindex >= 1 else match.group(0)
+                # Исключаем известные домены
+                if any(domain in href.lower() for domain in ['facebook', 'vk.com', 'twitter', 'linkedin', 'rusprofile.ru', 'yandex.ru', 'google.com', 'baturin.ru', 'list-org.com', 'nalog.gov.ru']):
+                    continue
+                if not href.startswith('http'):
+                    href = 'http://' + href
+                site = normalize_url(href)
+                if site and 'baturin' not in site.lower():
+                    break
+            if site and 'baturin' not in site.lower():
+                break
+        
+        # Сотрудники - ищем с помощью регулярных выражений
+        employees = None
+        employees_patterns = [
+            r'(\d+)\s*сотрудник',
+            r'сотрудник[:\s</>]*(\d+)',
+            r'персонал[:\s</>]*(\d+)',
+        ]
+        for pattern in employees_patterns:
+            match = re.search(pattern, page_text, re.IGNORECASE)
+            if match:
+                employees = normalize_employees(match.group(1))
+                if employees:
+                    break
+        
+        # ОКВЭД - ищем с помощью регулярных выражений
+        okved = None
+        okved_patterns = [
+            r'ОКВЭД[:\s</>]*(\d{2}\.\d{2}\.\d{2})',
+            r'оквэд[:\s</>]*(\d{2}\.\d{2}\.\d{2})',
+            r'(\d{2}\.\d{2}\.\d{2})[^<]*оквэд',
+        ]
+        for pattern in okved_patterns:
+            match = re.search(pattern, html_text, re.IGNORECASE)
+            if match:
+                okved = match.group(1)
+                if okved:
+                    break
+        
+        if inn and name:
+            return {
+                'inn': inn,
+                'name': name.strip(),
+                'revenue': revenue,
+                'site': site,
+                'employees': employees,
+                'okved_main': okved,
+                'source': 'rusprofile'
+            }
+    except Exception as e:
+        print(f"Ошибка при парсинге {company_url}: {e}")
+    
+    return None
+
+
+# Названия источников в сообщениях каскадного поиска
+SOURCE_TITLES = {
+    'rusprofile': 'rusprofile.ru',
+    'list-org': 'list-org.com',
+    'nalog.gov.ru': 'nalog.gov.ru',
+}
 
 
 class CompanySearcher(BaseCollector):
     """Поиск конкретных компаний по названиям на rusprofile.ru"""
     
+    SOURCE = 'rusprofile'
     BASE_URL = "https://www.rusprofile.ru"
+    SEARCH_RESULT_PATTERN = r'href=["\']?(/(?:inn|id)/\d+)'
     
     def search_companies(self, query: str, max_results: int = 50) -> List[Dict]:
         """Реализация абстрактного метода - поиск по названию компании"""
-        return [self.search_company_by_name(query)] if self.search_company_by_name(query) else []
+        company = self.search_company_by_name(query)
+        return [company] if company else []
     
-    def search_company_by_name(self, company_name: str) -> Optional[Dict]:
+    def search_company_by_name(self, company_name: str,
+                               required_fields: Optional[Iterable[str]] = None) -> Optional[Dict]:
         """Ищет компанию по названию на rusprofile.ru с использованием регулярных выражений"""
         # Очищаем название от лишних символов
         clean_name = company_name.strip()
@@ -32,18 +191,19 @@ class CompanySearcher(BaseCollector):
         try:
             # Получаем весь HTML как текст для поиска с помощью регулярных выражений
             html_text = str(soup)
-            name_lower = clean_name.lower()
-            name_words = [w for w in name_lower.split() if len(w) > 2]
             
             # Ищем ИНН в результатах поиска с помощью регулярных выражений
             # Паттерн для поиска ссылок с ИНН: /inn/XXXXXXXXXX или /id/XXXXX
             # Более точный паттерн - ищем ссылки вида href="/inn/XXXXXXXXXX"
             inn_pattern = r'href=["\']?/inn/(\d{10,12})["\']?'
-            inn_matches = re.finditer(inn_pattern, html_text, re.IGNORECASE)
             
+            # Кандидаты (url, фрагмент результата поиска) - детальные страницы
+            # загружаются только для лучших из них
+            candidates = []
             found_inns = set()  # Чтобы не проверять один ИНН дважды
             
-            for match in inn_matches:
+            # Карточка каждого результата - от его ссылки до ссылки следующего
+            for match, context in iter_result_windows(inn_pattern, html_text):
                 inn = match.group(1)
                 # Проверяем валидность ИНН (10 или 12 цифр)
                 if len(inn) not in [10, 12] or inn in found_inns:
@@ -51,40 +211,23 @@ class CompanySearcher(BaseCollector):
                 
                 found_inns.add(inn)
                 
-                # Ищем контекст вокруг ИНН (название компании должно быть рядом)
-                start_pos = max(0, match.start() - 500)
-                end_pos = min(len(html_text), match.end() + 500)
-                context = html_text[start_pos:end_pos].lower()
-                
                 # Проверяем, есть ли название компании в контексте
-                if (name_lower in context or 
-                    (len(name_words) > 0 and sum(1 for w in name_words if w in context) >= len(name_words) * 0.5)):
-                    # Пробуем получить данные по ИНН
-                    inn_url = f"{self.BASE_URL}/inn/{inn}"
-                    company_data = self.get_company_data(inn_url)
-                    if company_data:
-                        company_name_lower = company_data.get('name', '').lower()
-                        if (name_lower in company_name_lower or 
-                            len(name_words) > 0 and sum(1 for w in name_words if w in company_name_lower) >= len(name_words) * 0.5):
-                            return company_data
+                if matches_name(clean_name, context):
+                    candidates.append((f"{self.BASE_URL}/inn/{inn}", snippet_text(context)))
             
-            # Также пробуем найти через ссылки (старый метод как запасной)
+            # Также собираем кандидатов из ссылок (старый метод как запасной)
             company_links = soup.find_all('a', href=True)
-            for link in company_links[:30]:  # Увеличиваем количество проверок
+            for link in company_links[:30]:
                 href = link.get('href', '')
                 text = link.get_text(strip=True)
                 
-                if '/id/' in href or '/inn/' in href:
-                    text_lower = text.lower()
-                    if (name_lower in text_lower or 
-                        len(name_words) > 0 and sum(1 for w in name_words if w in text_lower) >= len(name_words) * 0.5):
-                        company_url = href if href.startswith('http') else self.BASE_URL + href
-                        company_data = self.get_company_data(company_url)
-                        if company_data:
-                            company_name_lower = company_data.get('name', '').lower()
-                            if (name_lower in company_name_lower or 
-                                len(name_words) > 0 and sum(1 for w in name_words if w in company_name_lower) >= len(name_words) * 0.5):
-                                return company_data
+                if ('/id/' in href or '/inn/' in href) and matches_name(clean_name, text):
+                    company_url = href if href.startswith('http') else self.BASE_URL + href
+                    candidates.append((company_url, text))
+            
+            # Проверяем только top-k кандидатов, лучшие первыми; детальная страница
+            # загружается, если фрагмента результата поиска недостаточно
+            return self.resolve_candidates(clean_name, candidates, required_fields)
         
         except Exception as e:
             print(f"      Ошибка при поиске компании {clean_name}: {e}")
@@ -93,208 +236,242 @@ class CompanySearcher(BaseCollector):
     
     def get_company_data(self, company_url: str) -> Optional[Dict]:
         """Получение данных о компании с rusprofile.ru с использованием регулярных выражений"""
-        soup = self.fetch_page(company_url)
-        if not soup:
+        content = self.fetch_content(company_url)
+        if content is None:
             return None
+        return self.parse_content(parse_company_page, content, company_url)
+    
+    def search_multiple_companies(self, company_names: Iterable[str], 
+                                  list_org_collector=None, 
+                                  nalog_collector=None,
+                                  registry_collector=None,
+                                  revenue_index=None,
+                                  required_fields: Optional[Iterable[str]] = None,
+                                  max_workers: int = 1,
+                                  time_budget: Optional[float] = None,
+                                  company_budget: Optional[float] = None,
+                                  deadline: Optional[float] = None,
+                                  source_stats=None,
+                                  min_revenue: Optional[int] = None) -> List[Dict]:
+        """
+        Ищет несколько компаний по списку названий с каскадным поиском
+        (см. search_one_company).
         
-        try:
-            # Получаем HTML как текст для поиска с помощью регулярных выражений
-            html_text = str(soup)
-            page_text = soup.get_text()
-            
-            # Извлечение ИНН с помощью регулярных выражений
-            inn = None
-            # Пробуем найти ИНН в URL
-            if '/inn/' in company_url:
-                inn_match = re.search(r'/inn/(\d{10,12})', company_url)
-                if inn_match:
-                    inn = normalize_inn(inn_match.group(1))
-            
-            # Если ИНН не найден, ищем на странице с помощью регулярных выражений
-            if not inn:
-                # Паттерны для поиска ИНН
-                inn_patterns = [
-                    r'ИНН[:\s</>]*(\d{10,12})',
-                    r'ИНН\s*[:\s</>]*(\d{10,12})',
-                    r'inn[:\s</>]*(\d{10,12})',
-                    r'<[^>]*>ИНН[:\s]*</[^>]*>[\s<]*(\d{10,12})',
-                ]
-                for pattern in inn_patterns:
-                    match = re.search(pattern, html_text, re.IGNORECASE)
-                    if match:
-                        inn = normalize_inn(match.group(1))
-                        if inn:
-                            break
-            
-            # Название компании - ищем в различных местах
-            name = None
-            # Сначала пробуем через BeautifulSoup
-            name_elem = soup.find('h1') or soup.find('title')
-            if name_elem:
-                name = name_elem.get_text(strip=True)
-            
-            # Если не нашли, ищем с помощью регулярных выражений
-            if not name or len(name) < 3:
-                name_patterns = [
-                    r'<h1[^>]*>([^<]+)</h1>',
-                    r'<title>([^<]+)</title>',
-                    r'company-name[^>]*>([^<]+)',
-                    r'название[:\s</>]*([А-Яа-яЁё\s"«»]+)',
-                ]
-                for pattern in name_patterns:
-                    match = re.search(pattern, html_text, re.IGNORECASE)
-                    if match:
-                        name = match.group(1).strip()
-                        if name and len(name) > 3:
-                            break
-            
-            # Выручка - ищем с помощью регулярных выражений
-            revenue = None
-            revenue_patterns = [
-                r'выручка[:\s</>]*(\d+(?:\s*\d+)*)\s*руб',
-                r'выручка[:\s</>]*(\d+(?:\s*\d+)*)',
-                r'доход[:\s</>]*(\d+(?:\s*\d+)*)\s*руб',
-                r'(\d+(?:\s*\d+)*)\s*руб[.\s]*выручка',
-                r'выручка[^<]*>(\d+(?:\s*\d+)*)',
-                r'<[^>]*>(\d+(?:\s*\d+)*)\s*руб[^<]*выручка',
-            ]
-            
-            for pattern in revenue_patterns:
-                match = re.search(pattern, html_text, re.IGNORECASE)
-                if match:
-                    revenue_str = match.group(1).replace(' ', '').replace('\xa0', '')
-                    revenue = normalize_revenue(revenue_str)
-                    if revenue:
-                        break
-            
-            # Сайт - ищем с помощью регулярных выражений
-            site = None
-            # Паттерны для поиска сайта (более точные)
-            site_patterns = [
-                r'сайт[:\s</>]*https?://([^\s<"\'<>]+)',
-                r'сайт[:\s</>]*www\.([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-                r'href=["\'](https?://(?!baturin|rusprofile|yandex|google|facebook|vk|twitter|linkedin)[^"\']+)["\']',
-                r'www\.([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})(?!.*rusprofile|.*yandex|.*google)',
-            ]
-            
-            for pattern in site_patterns:
-                matches = re.finditer(pattern, html_text, re.IGNORECASE)
-                for match in matches:
-                    href = match.group(1) if match.lastindex >= 1 else match.group(0)
-                    # Исключаем известные домены
-                    if any(domain in href.lower() for domain in ['facebook', 'vk.com', 'twitter', 'linkedin', 'rusprofile.ru', 'yandex.ru', 'google.com', 'baturin.ru', 'list-org.com', 'nalog.gov.ru']):
-                        continue
-                    if not href.startswith('http'):
-                        href = 'http://' + href
-                    site = normalize_url(href)
-                    if site and 'baturin' not in site.lower():
-                        break
-                if site and 'baturin' not in site.lower():
+        Названия читаются из company_names лениво, поэтому можно передать
+        генератор по файлу любого размера. Одновременно ищется не более
+        max_workers компаний; после time_budget секунд (или к моменту deadline
+        по time.monotonic) новые названия не берутся, а уже начатые поиски
+        не переходят к следующим источникам. На одну компанию отводится не
+        больше company_budget секунд. С source_stats порядок источников
+        подстраивается под их текущую статистику (см. search_one_company).
+        С revenue_index и min_revenue ИНН, выручка которых по индексу ниже
+        порога, отсеиваются до запросов к источникам (RevenueIndex.prescreen).
+        Результаты возвращаются в порядке входных названий.
+        """
+        if revenue_index is not None and min_revenue:
+            company_names = revenue_index.prescreen(company_names, min_revenue)
+        if time_budget:
+            budget_end = time.monotonic() + time_budget
+            deadline = budget_end if deadline is None else min(deadline, budget_end)
+        
+        def search(name):
+            company_deadline = deadline
+            if company_budget:
+                budget_end = time.monotonic() + company_budget
+                company_deadline = budget_end if deadline is None else min(deadline, budget_end)
+            return self.search_one_company(
+                name, list_org_collector, nalog_collector,
+                registry_collector, revenue_index, required_fields,
+                deadline=company_deadline, source_stats=source_stats
+            )
+        
+        if max_workers <= 1:
+            companies = []
+            for name in company_names:
+                if deadline is not None and time.monotonic() >= deadline:
+                    print("   ⏱ Время на поиск истекло, остальные названия пропущены")
                     break
-            
-            # Сотрудники - ищем с помощью регулярных выражений
-            employees = None
-            employees_patterns = [
-                r'(\d+)\s*сотрудник',
-                r'сотрудник[:\s</>]*(\d+)',
-                r'персонал[:\s</>]*(\d+)',
-            ]
-            for pattern in employees_patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE)
-                if match:
-                    employees = normalize_employees(match.group(1))
-                    if employees:
+                companies.append(search(name))
+            return companies
+        
+        results = {}
+        in_flight = {}
+        names = iter(enumerate(company_names))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            exhausted = False
+            while True:
+                # Держим в работе не больше max_workers названий
+                while not exhausted and len(in_flight) < max_workers:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        print("   ⏱ Время на поиск истекло, остальные названия пропущены")
+                        exhausted = True
                         break
-            
-            # ОКВЭД - ищем с помощью регулярных выражений
-            okved = None
-            okved_patterns = [
-                r'ОКВЭД[:\s</>]*(\d{2}\.\d{2}\.\d{2})',
-                r'оквэд[:\s</>]*(\d{2}\.\d{2}\.\d{2})',
-                r'(\d{2}\.\d{2}\.\d{2})[^<]*оквэд',
-            ]
-            for pattern in okved_patterns:
-                match = re.search(pattern, html_text, re.IGNORECASE)
-                if match:
-                    okved = match.group(1)
-                    if okved:
+                    item = next(names, None)
+                    if item is None:
+                        exhausted = True
                         break
-            
-            if inn and name:
-                return {
-                    'inn': inn,
-                    'name': name.strip(),
-                    'revenue': revenue,
-                    'site': site,
-                    'employees': employees,
-                    'okved_main': okved,
-                    'source': 'rusprofile'
-                }
-        except Exception as e:
-            print(f"Ошибка при парсинге {company_url}: {e}")
+                    index, name = item
+                    in_flight[executor.submit(search, name)] = index
+                
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = in_flight.pop(future)
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        print(f"      Ошибка поиска: {e}")
         
-        return None
+        return [results[index] for index in sorted(results)]
     
-    def search_multiple_companies(self, company_names: List[str], 
-                                  list_org_collector=None, 
-                                  nalog_collector=None) -> List[Dict]:
+    def search_one_company(self, name: str,
+                           list_org_collector=None,
+                           nalog_collector=None,
+                           registry_collector=None,
+                           revenue_index=None,
+                           required_fields: Optional[Iterable[str]] = None,
+                           deadline: Optional[float] = None,
+                           source_stats=None) -> Dict:
         """
-        Ищет несколько компаний по списку названий с каскадным поиском:
+        Ищет одну компанию с каскадным поиском:
+        0. Локальный реестр ФНС (если передан registry_collector)
         1. rusprofile.ru
         2. list-org.com
         3. bo.nalog.gov.ru
         4. Если не найдена - добавляет без реквизитов
+        
+        Источник, отключенный circuit breaker'ом (серия 429/403/5xx/таймаутов),
+        пропускается сразу, без ожидания таймаутов.
+        
+        Если передан revenue_index, недостающая выручка найденных компаний
+        заполняется из индекса без запросов к сайтам.
+        
+        required_fields передается в search_company_by_name: если фрагмента
+        результата поиска достаточно, детальная страница не загружается
+        (ее можно дозагрузить позже через complete_company).
+        
+        Если передан source_stats (SourceStats), порядок опроса сайтов выбирается
+        по текущей статистике источников, а результат попытки в нее записывается:
+        источник, который сейчас медленный или блокирует запросы, опрашивается
+        последним или пропускается.
+        
+        После deadline (по time.monotonic) следующие источники не опрашиваются:
+        компания, не найденная к этому моменту, добавляется без реквизитов.
         """
-        companies = []
-        for name in company_names:
-            print(f"   Поиск: {name}")
-            company = None
-            source = None
-            
-            # 1. Пробуем найти на rusprofile.ru
-            company = self.search_company_by_name(name)
+        def in_time() -> bool:
+            return deadline is None or time.monotonic() < deadline
+        
+        # Вместо названия может быть передан ИНН - тогда поиск не нужен
+        inn = normalize_inn(name) if name.strip().isdigit() else None
+        if inn:
+            return self.search_company_by_inn(inn, nalog_collector, registry_collector, revenue_index,
+                                              deadline=deadline)
+        
+        print(f"   Поиск: {name}")
+        company = None
+        source = None
+        
+        # 0. Пробуем найти в локальном реестре ФНС (без сетевых запросов)
+        if registry_collector:
+            company = registry_collector.search_company_by_name(name)
             if company:
-                source = 'rusprofile'
-                print(f"      ✓ Найдена на rusprofile.ru: {company.get('name')} (ИНН: {company.get('inn')})")
-            else:
-                # 2. Пробуем найти на list-org.com
-                if list_org_collector:
-                    try:
-                        company = list_org_collector.search_company_by_name(name)
-                        if company:
-                            source = 'list-org'
-                            print(f"      ✓ Найдена на list-org.com: {company.get('name')} (ИНН: {company.get('inn')})")
-                    except Exception as e:
-                        print(f"      Ошибка поиска на list-org.com: {e}")
-                
-                # 3. Пробуем найти на bo.nalog.gov.ru
-                if not company and nalog_collector:
-                    try:
-                        company = nalog_collector.search_company_by_name(name)
-                        if company:
-                            source = 'nalog.gov.ru'
-                            print(f"      ✓ Найдена на nalog.gov.ru: {company.get('name')} (ИНН: {company.get('inn')})")
-                    except Exception as e:
-                        print(f"      Ошибка поиска на nalog.gov.ru: {e}")
-                
-                # 4. Если не найдена нигде - добавляем без реквизитов
-                if not company:
-                    company = {
-                        'inn': None,
-                        'name': name,
-                        'revenue': None,
-                        'site': None,
-                        'employees': None,
-                        'okved_main': None,
-                        'source': 'manual'
-                    }
-                    source = 'manual'
-                    print(f"      ⚠ Не найдена, добавлена без реквизитов: {name}")
-            
+                source = registry_collector.SOURCE
+                print(f"      ✓ Найдена в локальном реестре ФНС: {company.get('name')} (ИНН: {company.get('inn')})")
+        
+        # 1-3. Каскад по сайтам: rusprofile.ru -> list-org.com -> bo.nalog.gov.ru
+        # (с source_stats - в порядке наименьшего ожидаемого времени до успеха)
+        cascade = [c for c in (self, list_org_collector, nalog_collector) if c is not None]
+        if source_stats is not None and not company:
+            cascade = source_stats.order(cascade)
+        for collector in cascade:
+            if company:
+                break
+            if not collector.is_available() or not in_time():
+                continue
+            title = SOURCE_TITLES.get(collector.SOURCE, collector.SOURCE)
+            collector.last_fetch_status = None
+            started = time.monotonic()
+            failed = False
+            # Загрузки источника (с повторами и паузами) не выходят за срок компании
+            collector.fetch_deadline = deadline
+            try:
+                company = collector.search_company_by_name(name, required_fields)
+            except Exception as e:
+                print(f"      Ошибка поиска на {title}: {e}")
+                failed = True
+            finally:
+                collector.fetch_deadline = None
+            if source_stats is not None:
+                source_stats.record(collector.SOURCE, bool(company),
+                                    failed or not company and collector.last_fetch_failed(),
+                                    time.monotonic() - started)
             if company:
-                if source:
-                    company['source'] = source
-                companies.append(company)
+                source = collector.SOURCE
+                print(f"      ✓ Найдена на {title}: {company.get('name')} (ИНН: {company.get('inn')})")
         
-        return companies
-
+        # 4. Если не найдена нигде - добавляем без реквизитов
+        if not company:
+            company = {
+                'inn': None,
+                'name': name,
+                'revenue': None,
+                'site': None,
+                'employees': None,
+                'okved_main': None,
+                'source': 'manual'
+            }
+            source = 'manual'
+            if in_time():
+                print(f"      ⚠ Не найдена, добавлена без реквизитов: {name}")
+            else:
+                print(f"      ⏱ Время на поиск истекло, добавлена без реквизитов: {name}")
+    
+        if source:
+            company['source'] = source
+        if revenue_index is not None and not company.get('revenue') and company.get('inn'):
+            company['revenue'] = revenue_index.latest_revenue(company['inn'])
+        return company
+    
+    def search_company_by_inn(self, inn: str, nalog_collector=None,
+                              registry_collector=None, revenue_index=None,
+                              deadline: Optional[float] = None) -> Dict:
+        """
+        Ищет компанию по ИНН: локальный реестр, затем страницы /inn/ на rusprofile.ru и bo.nalog.gov.ru.
+        
+        Загрузки не выходят за deadline (по time.monotonic).
+        """
+        print(f"   Поиск по ИНН: {inn}")
+        company = None
+        if registry_collector:
+            company = registry_collector.get_company_by_inn(inn)
+        collectors = [c for c in (self, nalog_collector) if c is not None]
+        for collector in collectors:
+            collector.fetch_deadline = deadline
+        try:
+            if not company and self.is_available():
+                company = self.get_company_data(f"{self.BASE_URL}/inn/{inn}")
+            if not company and nalog_collector and nalog_collector.is_available():
+                company = nalog_collector.get_company_data(f"{nalog_collector.BASE_URL}/inn/{inn}")
+        finally:
+            for collector in collectors:
+                collector.fetch_deadline = None
+        
+        if company:
+            print(f"      ✓ Найдена: {company.get('name')} (ИНН: {inn})")
+        else:
+            company = {
+                'inn': inn,
+                'name': '',
+                'revenue': None,
+                'site': None,
+                'employees': None,
+                'okved_main': None,
+                'source': 'manual'
+            }
+            print(f"      ⚠ Не найдена, добавлена только с ИНН: {inn}")
+        
+        if revenue_index is not None and not company.get('revenue'):
+            company['revenue'] = revenue_index.latest_revenue(inn)
+        return company
@@ -0,0 +1,121 @@
+"""Поиск компаний по ключевым словам: параллельная загрузка страниц поиска всех источников"""
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterable, Iterator, List
+from src.utils.helpers import decode_html
+from src.utils.http_client import canonicalize_url
+from src.utils.name_matching import snippet_text
+from src.utils.name_source import SeenSet
+from src.utils.snippets import parse_search_snippet, iter_result_windows
+
+
+def extract_search_candidates(collector, html_text: str) -> List[Dict]:
+    """
+    Извлекает со страницы поиска все результаты в виде неполных записей.
+
+    Для результатов без ИНН во фрагменте (например, list-org.com ссылается
+    на внутренний ID) возвращается запись только с detail_url и source.
+    """
+    candidates = []
+    seen_urls = set()
+    for match, window in iter_result_windows(collector.SEARCH_RESULT_PATTERN, html_text):
+        # Повторы отсекаются по каноническому URL, в кандидате остается исходный
+        url = collector.BASE_URL + match.group(1)
+        canonical = canonicalize_url(url)
+        if canonical in seen_urls:
+            continue
+        seen_urls.add(canonical)
+
+        snippet = snippet_text(window)
+        candidates.append(
+            parse_search_snippet(snippet, url, collector.SOURCE)
+            or {'inn': None, 'name': None, 'source': collector.SOURCE, 'detail_url': url}
+        )
+    return candidates
+
+
+def discover_companies(queries: Iterable[str], collectors: Iterable, max_pages: int = 5,
+                       max_workers: int = 8, prefetch_pages: int = 2,
+                       fetch_details: bool = False) -> Iterator[Dict]:
+    """
+    Ищет компании по ключевым словам во всех источниках сразу и отдает их по мере нахождения.
+
+    Страницы поиска всех источников и запросов загружаются параллельно
+    (по prefetch_pages страниц вперед на каждый запрос и источник; следующая
+    страница запрашивается, пока на предыдущих находятся результаты).
+    Источники с API поиска (search_page_candidates, например bo.nalog.gov.ru)
+    опрашиваются так же, но без разбора HTML.
+    Повторы отбрасываются по ИНН глобально - между запросами и источниками -
+    до загрузки детальных страниц.
+
+    При fetch_details=True для каждой новой компании загружается детальная
+    страница; иначе отдаются неполные записи из результатов поиска
+    (с detail_url для последующего complete_company).
+    """
+    collectors = [c for c in collectors
+                  if getattr(c, 'SEARCH_RESULT_PATTERN', None) or hasattr(c, 'search_page_candidates')]
+    seen = SeenSet()
+
+    def fetch_search_page(collector, query, page):
+        # Источник с API поиска сам разбирает ответ в неполные записи
+        if hasattr(collector, 'search_page_candidates'):
+            return collector.search_page_candidates(query, page)
+        content = collector.fetch_content(collector.search_page_url(query, page))
+        if content is None:
+            return []
+        return extract_search_candidates(collector, decode_html(content))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+
+        def submit_page(collector, query, page):
+            if page <= max_pages and collector.is_available():
+                future = executor.submit(fetch_search_page, collector, query, page)
+                in_flight[future] = ('page', collector, query, page)
+
+        for query in queries:
+            for collector in collectors:
+                for page in range(1, prefetch_pages + 1):
+                    submit_page(collector, query, page)
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                # Для детальных страниц последним элементом хранится исходный кандидат
+                kind, collector, query, page = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"      Ошибка поиска '{query}' на {collector.SOURCE}: {e}")
+                    continue
+
+                if kind == 'detail':
+                    company, candidate = result, page
+                    if not company:
+                        continue
+                    inn = company.get('inn')
+                    if inn and inn != candidate.get('inn') and not seen.add('inn:' + inn):
+                        continue
+                    # Поля, которых нет на детальной странице, берем из результата поиска
+                    for key, value in candidate.items():
+                        if key != 'detail_url' and not company.get(key) and value:
+                            company[key] = value
+                    yield company
+                    continue
+
+                # Результаты есть - запрашиваем следующую страницу
+                if result:
+                    submit_page(collector, query, page + prefetch_pages)
+
+                for candidate in result:
+                    if candidate.get('inn'):
+                        key = 'inn:' + candidate['inn']
+                    else:
+                        key = 'url:' + canonicalize_url(candidate['detail_url'])
+                    if not seen.add(key):
+                        continue
+                    if fetch_details or not candidate.get('inn'):
+                        # Без ИНН компанию не объединить с другими - нужна детальная страница
+                        detail_future = executor.submit(collector.get_company_data, candidate['detail_url'])
+                        in_flight[detail_future] = ('detail', collector, query, candidate)
+                    else:
+                        yield candidate
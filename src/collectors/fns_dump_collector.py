@@ -0,0 +1,379 @@
+"""Коллектор данных из локальных выгрузок открытых данных ФНС (ЕГРЮЛ, БФО)"""
+import argparse
+import csv
+import io
+import os
+import re
+import sqlite3
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
+from src.collectors.base_collector import BaseCollector
+from src.utils.helpers import normalize_revenue, normalize_inn, normalize_employees
+from src.utils.revenue_index import build_revenue_index
+
+
+# Атрибуты XML-выгрузок ФНС (СЧР, РСМП, сведения о доходах и расходах)
+XML_INN_ATTRS = ('ИННЮЛ', 'ИННФЛ')
+XML_NAME_ATTRS = ('НаимОрг', 'НаимЮЛПолн', 'НаимЮЛСокр')
+XML_EMPLOYEES_ATTRS = ('КолРаб',)
+XML_REVENUE_ATTRS = ('СумДоход',)
+XML_OKVED_TAGS = ('СвОКВЭДОсн',)
+
+# Колонки CSV-выгрузок (в т.ч. БФО); строка 2110 в БФО указана в тыс. руб.
+CSV_INN_COLUMNS = ('inn', 'инн')
+CSV_NAME_COLUMNS = ('name', 'short_name', 'full_name', 'наименование')
+CSV_OKVED_COLUMNS = ('okved', 'okved_main', 'оквэд')
+CSV_EMPLOYEES_COLUMNS = ('employees', 'сотрудники', 'колраб')
+CSV_REVENUE_COLUMNS = ('revenue', 'выручка')
+CSV_REVENUE_THOUSANDS_COLUMNS = ('2110', 'line_2110', 'current_2110')
+CSV_YEAR_COLUMNS = ('year', 'period', 'год', 'период')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    inn TEXT PRIMARY KEY,
+    name TEXT,
+    name_lower TEXT,
+    okved_main TEXT,
+    employees INTEGER
+);
+CREATE TABLE IF NOT EXISTS revenue (
+    inn TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    revenue INTEGER NOT NULL,
+    PRIMARY KEY (inn, year)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS name_tokens (
+    token TEXT NOT NULL,
+    inn TEXT NOT NULL,
+    PRIMARY KEY (token, inn)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_companies_name_lower ON companies (name_lower);
+"""
+
+
+def tokenize_name(name: Optional[str]) -> List[str]:
+    """Разбивает название на значимые слова (как в каскадном поиске: длиннее 2 символов)"""
+    if not name:
+        return []
+    return [w for w in re.findall(r'[0-9a-zа-яё]+', name.lower()) if len(w) > 2]
+
+
+def _first_value(row: Dict[str, str], columns: Tuple[str, ...]) -> Optional[str]:
+    """Возвращает первое непустое значение из перечисленных колонок"""
+    for column in columns:
+        value = row.get(column)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _parse_year(value: Optional[str]) -> Optional[int]:
+    """Извлекает год из даты вида ДД.ММ.ГГГГ, ГГГГ-ММ-ДД или просто ГГГГ"""
+    if not value:
+        return None
+    match = re.search(r'(19|20)\d{2}', str(value))
+    return int(match.group()) if match else None
+
+
+def iter_xml_records(stream) -> Iterator[Dict]:
+    """Потоково разбирает XML-выгрузку ФНС, возвращая по записи на каждый <Документ>"""
+    # Открытые (еще не закрытые) элементы: последний из них - родитель текущего
+    parents = []
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        if elem.tag != 'Документ':
+            continue
+
+        record = {'year': _parse_year(elem.get('ДатаСост') or elem.get('ДатаДок'))}
+        for child in elem.iter():
+            attrs = child.attrib
+            for attr in XML_INN_ATTRS:
+                if attr in attrs and not record.get('inn'):
+                    record['inn'] = attrs[attr]
+            for attr in XML_NAME_ATTRS:
+                if attr in attrs and not record.get('name'):
+                    record['name'] = attrs[attr]
+            for attr in XML_EMPLOYEES_ATTRS:
+                if attr in attrs:
+                    record['employees'] = attrs[attr]
+            for attr in XML_REVENUE_ATTRS:
+                if attr in attrs:
+                    record['revenue'] = attrs[attr]
+            if child.tag in XML_OKVED_TAGS and child.get('КодОКВЭД'):
+                record['okved_main'] = child.get('КодОКВЭД')
+
+        # Освобождаем память: выгрузки ЕГРЮЛ занимают гигабайты. Одного clear()
+        # мало - пустой элемент остался бы в родителе, и корень копил бы их все
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+        yield record
+
+
+def iter_csv_records(stream) -> Iterator[Dict]:
+    """Потоково разбирает CSV-выгрузку (БФО и аналогичные наборы данных)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    first_line = text.readline()
+    delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+    header = [h.strip().lower() for h in next(csv.reader([first_line], delimiter=delimiter))]
+
+    for values in csv.reader(text, delimiter=delimiter):
+        row = dict(zip(header, values))
+        revenue = _first_value(row, CSV_REVENUE_COLUMNS)
+        revenue_thousands = _first_value(row, CSV_REVENUE_THOUSANDS_COLUMNS)
+        if revenue is None and revenue_thousands is not None:
+            value = normalize_revenue(revenue_thousands.split('.')[0].split(',')[0])
+            revenue = str(value * 1000) if value is not None else None
+        yield {
+            'inn': _first_value(row, CSV_INN_COLUMNS),
+            'name': _first_value(row, CSV_NAME_COLUMNS),
+            'okved_main': _first_value(row, CSV_OKVED_COLUMNS),
+            'employees': _first_value(row, CSV_EMPLOYEES_COLUMNS),
+            'revenue': revenue,
+            'year': _parse_year(_first_value(row, CSV_YEAR_COLUMNS)),
+        }
+
+
+def iter_dump_records(path: str) -> Iterator[Dict]:
+    """Перебирает записи локальной выгрузки: XML, CSV или ZIP-архив с ними"""
+    lower = path.lower()
+    if lower.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                member_lower = member.lower()
+                with archive.open(member) as stream:
+                    if member_lower.endswith('.xml'):
+                        yield from iter_xml_records(stream)
+                    elif member_lower.endswith('.csv'):
+                        yield from iter_csv_records(stream)
+    elif lower.endswith('.xml'):
+        with open(path, 'rb') as stream:
+            yield from iter_xml_records(stream)
+    elif lower.endswith('.csv'):
+        with open(path, 'rb') as stream:
+            yield from iter_csv_records(stream)
+
+
+def open_registry(db_path: str) -> sqlite3.Connection:
+    """Открывает (и при необходимости создает) индексированное хранилище реестра"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def import_fns_dumps(paths: Iterable[str], db_path: str, batch_size: int = 10_000) -> int:
+    """
+    Импортирует выгрузки открытых данных ФНС в локальное хранилище.
+
+    Записи из разных наборов данных дополняют друг друга по ИНН:
+    пустые поля не затирают уже загруженные значения.
+
+    Returns:
+        количество импортированных записей
+    """
+    conn = open_registry(db_path)
+    imported = 0
+    companies_batch = []
+    revenue_batch = []
+    tokens_batch = []
+
+    def flush():
+        conn.executemany(
+            """
+            INSERT INTO companies (inn, name, name_lower, okved_main, employees)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(inn) DO UPDATE SET
+                name = COALESCE(excluded.name, name),
+                name_lower = COALESCE(excluded.name_lower, name_lower),
+                okved_main = COALESCE(excluded.okved_main, okved_main),
+                employees = COALESCE(excluded.employees, employees)
+            """,
+            companies_batch
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO revenue (inn, year, revenue) VALUES (?, ?, ?)",
+            revenue_batch
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO name_tokens (token, inn) VALUES (?, ?)",
+            tokens_batch
+        )
+        conn.commit()
+        companies_batch.clear()
+        revenue_batch.clear()
+        tokens_batch.clear()
+
+    try:
+        for path in paths:
+            print(f"   Импорт {path}...")
+            for record in iter_dump_records(path):
+                inn = normalize_inn(record.get('inn'))
+                if not inn:
+                    continue
+
+                name = (record.get('name') or '').strip() or None
+                companies_batch.append((
+                    inn,
+                    name,
+                    name.lower() if name else None,
+                    record.get('okved_main') or None,
+                    normalize_employees(record.get('employees')),
+                ))
+
+                revenue = normalize_revenue((record.get('revenue') or '').split('.')[0])
+                year = record.get('year')
+                if revenue is not None and year:
+                    revenue_batch.append((inn, year, revenue))
+
+                tokens_batch.extend((token, inn) for token in set(tokenize_name(name)))
+
+                imported += 1
+                if len(companies_batch) >= batch_size:
+                    flush()
+        flush()
+    finally:
+        conn.close()
+
+    return imported
+
+
+class FnsDumpCollector(BaseCollector):
+    """
+    Коллектор по локальному хранилищу выгрузок ФНС.
+
+    Не выполняет сетевых запросов: ИНН, название, ОКВЭД, численность
+    и выручка берутся из индексированной SQLite-базы, собранной import_fns_dumps.
+    Поиски идут из нескольких потоков, поэтому соединение с базой у каждого
+    потока свое.
+    """
+
+    SOURCE = 'fns-dump'
+
+    def __init__(self, db_path: str):
+        super().__init__()
+        self.db_path = db_path
+        # Схема создается сразу, соединения потоков открываются при первом запросе
+        open_registry(db_path).close()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Соединение с базой реестра текущего потока"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path)
+        return conn
+
+    def _build_record(self, row: Tuple) -> Dict:
+        """Собирает запись компании в общем для коллекторов формате"""
+        inn, name, okved, employees = row
+        revenue_row = self.conn.execute(
+            "SELECT revenue FROM revenue WHERE inn = ? ORDER BY year DESC LIMIT 1",
+            (inn,)
+        ).fetchone()
+        return {
+            'inn': inn,
+            'name': name or '',
+            'revenue': revenue_row[0] if revenue_row else None,
+            'site': None,
+            'employees': employees,
+            'okved_main': okved,
+            'source': self.SOURCE
+        }
+
+    def get_company_by_inn(self, inn: str) -> Optional[Dict]:
+        """Возвращает компанию по ИНН"""
+        inn = normalize_inn(inn)
+        if not inn:
+            return None
+        row = self.conn.execute(
+            "SELECT inn, name, okved_main, employees FROM companies WHERE inn = ?",
+            (inn,)
+        ).fetchone()
+        return self._build_record(row) if row else None
+
+    def _find_inns_by_name(self, company_name: str, limit: int) -> List[str]:
+        """Ищет ИНН по названию: сначала точное совпадение, затем по словам названия"""
+        name_lower = company_name.strip().lower()
+        exact = self.conn.execute(
+            "SELECT inn FROM companies WHERE name_lower = ? LIMIT ?",
+            (name_lower, limit)
+        ).fetchall()
+        if exact:
+            return [row[0] for row in exact]
+
+        tokens = sorted(set(tokenize_name(name_lower)))
+        if not tokens:
+            return []
+
+        # Как и в каскадном поиске, достаточно совпадения половины слов
+        placeholders = ','.join('?' * len(tokens))
+        rows = self.conn.execute(
+            f"""
+            SELECT t.inn, COUNT(*) AS hits
+            FROM name_tokens t JOIN companies c ON c.inn = t.inn
+            WHERE t.token IN ({placeholders})
+            GROUP BY t.inn
+            HAVING hits >= ?
+            ORDER BY hits DESC, LENGTH(c.name) ASC
+            LIMIT ?
+            """,
+            (*tokens, len(tokens) * 0.5, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def search_company_by_name(self, company_name: str) -> Optional[Dict]:
+        """Ищет компанию по названию в локальном реестре"""
+        if not company_name or not company_name.strip():
+            return None
+        inns = self._find_inns_by_name(company_name, limit=1)
+        return self.get_company_by_inn(inns[0]) if inns else None
+
+    def search_companies(self, query: str, max_results: int = 50) -> List[Dict]:
+        """Поиск компаний по словам названия в локальном реестре"""
+        return [
+            company for company in
+            (self.get_company_by_inn(inn) for inn in self._find_inns_by_name(query, limit=max_results))
+            if company
+        ]
+
+    def get_company_data(self, company_url: str) -> Optional[Dict]:
+        """Получение данных о компании по URL вида .../inn/<ИНН> или по самому ИНН"""
+        inn_match = re.search(r'(\d{10,12})', company_url or '')
+        if not inn_match:
+            return None
+        return self.get_company_by_inn(inn_match.group(1))
+
+    def get_revenue_by_year(self, inn: str) -> Dict[int, int]:
+        """Возвращает выручку компании по годам"""
+        rows = self.conn.execute(
+            "SELECT year, revenue FROM revenue WHERE inn = ? ORDER BY year",
+            (normalize_inn(inn),)
+        ).fetchall()
+        return dict(rows)
+
+    def iter_revenue_records(self) -> Iterator[Tuple[str, int, int]]:
+        """Перебирает все записи (ИНН, год, выручка) - источник для индекса выручки"""
+        yield from self.conn.execute("SELECT inn, year, revenue FROM revenue ORDER BY inn, year")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Импорт выгрузок открытых данных ФНС в локальный реестр')
+    parser.add_argument('paths', nargs='+', help='XML/CSV файлы или ZIP-архивы с ними')
+    parser.add_argument('--db', default=os.path.join('data', 'registry.sqlite'), help='путь к базе реестра')
+    parser.add_argument('--revenue-index', help='после импорта построить индекс выручки по этому пути')
+    args = parser.parse_args()
+
+    count = import_fns_dumps(args.paths, args.db)
+    print(f"Импортировано записей: {count}")
+
+    if args.revenue_index:
+        collector = FnsDumpCollector(args.db)
+        indexed = build_revenue_index(collector.iter_revenue_records(), args.revenue_index)
+        print(f"Записей в индексе выручки: {indexed}")
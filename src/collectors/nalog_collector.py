@@ -1,215 +1,244 @@
-"""Коллектор данных с bo.nalog.gov.ru (официальный сайт ФНС)"""
+"""Коллектор данных с bo.nalog.gov.ru (официальный сайт ФНС) через JSON API сайта"""
 import re
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterable, Any
 from urllib.parse import quote
 from src.collectors.base_collector import BaseCollector
-from src.utils.helpers import normalize_revenue, normalize_inn, normalize_employees, normalize_url
+from src.utils.helpers import normalize_inn
+from src.utils.name_matching import accepts_name, rank_candidates
+from src.utils.snippets import missing_fields
+
+
+# Эндпоинты, из которых страницы bo.nalog.gov.ru загружают данные
+SEARCH_API_PATH = '/advanced-search/organizations/search'
+BFO_API_PATH = '/nbo/organizations/{org_id}/bfo/'
+BFO_URL_RE = re.compile(r'/nbo/organizations/(\d+)/bfo')
+INN_URL_RE = re.compile(r'/inn/(\d{10,12})')
+
+# Результатов на одной странице поиска API
+SEARCH_PAGE_SIZE = 20
+# Сколько отчетностей (выручки) загружать одновременно
+BFO_WORKERS = 4
+
+
+def _okved_code(value: Any) -> Optional[str]:
+    """Код ОКВЭД из поля okved2: строка или объект {"id"/"code": ..., "name": ...}"""
+    if isinstance(value, dict):
+        value = value.get('code') or value.get('id')
+    return str(value) if value else None
+
+
+def parse_search_response(data: Any, base_url: str, source: str) -> List[Dict]:
+    """
+    Разбирает ответ поиска организаций в неполные записи.
+
+    В ответе есть ИНН, название и ОКВЭД, но нет выручки: в detail_url
+    сохраняется адрес отчетности организации, выручка дозагружается из нее
+    (complete_company).
+    """
+    if isinstance(data, dict):
+        items = data.get('content') or []
+    elif isinstance(data, list):
+        items = data
+    else:
+        return []
+
+    records = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        inn = normalize_inn(str(item.get('inn') or ''))
+        name = (item.get('shortName') or item.get('fullName') or '').strip()
+        org_id = item.get('id')
+        if not inn or not name or org_id is None:
+            continue
+        records.append({
+            'inn': inn,
+            'name': name,
+            'revenue': None,
+            'site': None,
+            'employees': None,
+            'okved_main': _okved_code(item.get('okved2') or item.get('okved')),
+            'source': source,
+            'detail_url': base_url + BFO_API_PATH.format(org_id=org_id),
+        })
+    return records
+
+
+def _year(period: Any) -> Optional[int]:
+    match = re.search(r'(\d{4})', str(period or ''))
+    return int(match.group(1)) if match else None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_bfo_response(data: Any) -> Dict[int, int]:
+    """
+    Выручка по годам (рубли) из ответа отчетности организации.
+
+    Строка 2110 отчета о финансовых результатах указана в тысячах рублей:
+    current2110 - за отчетный год, previous2110 - за предыдущий. Из нескольких
+    корректировок отчета берется последняя; previous2110 заполняет только годы,
+    за которые своего отчета нет.
+    """
+    if isinstance(data, dict):
+        data = data.get('content') or [data]
+    if not isinstance(data, list):
+        return {}
+
+    current = {}
+    previous = {}
+    for report in data:
+        if not isinstance(report, dict):
+            continue
+        year = _year(report.get('period'))
+        if year is None:
+            continue
+        corrections = report.get('typeCorrections') or [report]
+        correction = corrections[-1] if isinstance(corrections[-1], dict) else {}
+        correction = correction.get('correction') or correction
+        result = correction.get('financialResult') or {}
+
+        revenue = _to_int(result.get('current2110'))
+        if revenue is not None:
+            current[year] = revenue * 1000
+        revenue = _to_int(result.get('previous2110'))
+        if revenue is not None:
+            previous[year - 1] = revenue * 1000
+
+    previous.update(current)
+    return previous
+
+
+def latest_revenue(by_year: Dict[int, int]) -> Optional[int]:
+    """Выручка за последний год с ненулевой выручкой"""
+    for year in sorted(by_year, reverse=True):
+        if by_year[year]:
+            return by_year[year]
+    return None
 
 
 class NalogCollector(BaseCollector):
-    """Коллектор для bo.nalog.gov.ru"""
-    
+    """
+    Коллектор для bo.nalog.gov.ru.
+
+    Страницы сайта загружают данные из JSON API - его коллектор и использует:
+    поиск организаций (ИНН, название, ОКВЭД) и бухгалтерская отчетность
+    (выручка за несколько лет). HTML не загружается и не разбирается.
+    """
+
+    SOURCE = 'nalog.gov.ru'
     BASE_URL = "https://bo.nalog.gov.ru"
-    
-    def search_companies(self, query: str, max_results: int = 50) -> List[Dict]:
-        """Поиск компаний на bo.nalog.gov.ru"""
-        companies = []
-        search_url = f"{self.BASE_URL}/search?query={quote(query)}"
-        
-        soup = self.fetch_page(search_url)
-        if not soup:
+
+    def search_api_url(self, query: str, page: int = 0) -> str:
+        """URL страницы поиска организаций в API (страницы нумеруются с 0)"""
+        return f"{self.BASE_URL}{SEARCH_API_PATH}?query={quote(query)}&page={page}&size={SEARCH_PAGE_SIZE}"
+
+    def search_page_candidates(self, query: str, page: int = 1) -> List[Dict]:
+        """Результаты страницы поиска (с 1, как у search_page_url) в виде неполных записей"""
+        data = self.fetch_json(self.search_api_url(query, page - 1))
+        if data is None:
+            return []
+        return parse_search_response(data, self.BASE_URL, self.SOURCE)
+
+    def get_revenue_by_year(self, bfo_url: str) -> Dict[int, int]:
+        """Возвращает выручку компании по годам по адресу ее отчетности (detail_url)"""
+        data = self.fetch_json(bfo_url)
+        if data is None:
+            return {}
+        return parse_bfo_response(data)
+
+    def fill_revenues(self, companies: List[Dict]) -> List[Dict]:
+        """
+        Дозагружает выручку для нескольких записей из результатов поиска.
+
+        Отчетности загружаются параллельно (BFO_WORKERS запросов одновременно).
+        """
+        pending = [c for c in companies if not c.get('revenue') and c.get('detail_url')]
+        if not pending:
             return companies
-        
-        # Ищем ссылки на компании
-        company_links = soup.find_all('a', href=True)
-        for link in company_links[:max_results]:
-            href = link.get('href', '')
-            if '/company/' in href or '/inn/' in href:
-                company_url = href if href.startswith('http') else self.BASE_URL + href
-                company_data = self.get_company_data(company_url)
-                if company_data:
-                    companies.append(company_data)
-                    if len(companies) >= max_results:
-                        break
-        
+
+        # Срок загрузок - свой у каждого потока: передаем его потокам пула
+        deadline = self.fetch_deadline
+
+        def load(company: Dict) -> Dict[int, int]:
+            self.fetch_deadline = deadline
+            try:
+                return self.get_revenue_by_year(company['detail_url'])
+            finally:
+                self.fetch_deadline = None
+
+        with ThreadPoolExecutor(max_workers=min(BFO_WORKERS, len(pending))) as executor:
+            revenues = executor.map(load, pending)
+            for company, by_year in zip(pending, revenues):
+                company['revenue'] = latest_revenue(by_year)
+                company['detail_url'] = None
         return companies
-    
-    def search_company_by_name(self, company_name: str) -> Optional[Dict]:
-        """Ищет компанию по названию на bo.nalog.gov.ru с использованием регулярных выражений"""
-        search_url = f"{self.BASE_URL}/search?query={quote(company_name)}"
-        
-        soup = self.fetch_page(search_url)
-        if not soup:
-            return None
-        
-        try:
-            html_text = str(soup)
-            name_lower = company_name.lower()
-            name_words = [w for w in name_lower.split() if len(w) > 2]
-            
-            # Ищем ИНН в результатах поиска
-            inn_pattern = r'(?:/company/|/inn/)(\d{10,12})'
-            inn_matches = re.finditer(inn_pattern, html_text)
-            
-            for match in inn_matches:
-                inn = match.group(1)
-                start_pos = max(0, match.start() - 500)
-                end_pos = min(len(html_text), match.end() + 500)
-                context = html_text[start_pos:end_pos].lower()
-                
-                if (name_lower in context or 
-                    (len(name_words) > 0 and sum(1 for w in name_words if w in context) >= len(name_words) * 0.5)):
-                    inn_url = f"{self.BASE_URL}/inn/{inn}"
-                    company_data = self.get_company_data(inn_url)
-                    if company_data:
-                        company_name_lower = company_data.get('name', '').lower()
-                        if (name_lower in company_name_lower or 
-                            len(name_words) > 0 and sum(1 for w in name_words if w in company_name_lower) >= len(name_words) * 0.5):
-                            return company_data
-            
-            # Также пробуем через ссылки
-            company_links = soup.find_all('a', href=True)
-            for link in company_links[:30]:
-                href = link.get('href', '')
-                text = link.get_text(strip=True)
-                
-                if '/company/' in href or '/inn/' in href:
-                    text_lower = text.lower()
-                    if (name_lower in text_lower or 
-                        len(name_words) > 0 and sum(1 for w in name_words if w in text_lower) >= len(name_words) * 0.5):
-                        company_url = href if href.startswith('http') else self.BASE_URL + href
-                        company_data = self.get_company_data(company_url)
-                        if company_data:
-                            company_name_lower = company_data.get('name', '').lower()
-                            if (name_lower in company_name_lower or 
-                                len(name_words) > 0 and sum(1 for w in name_words if w in company_name_lower) >= len(name_words) * 0.5):
-                                return company_data
-        except Exception as e:
-            print(f"      Ошибка при поиске на nalog.gov.ru: {e}")
-        
+
+    def search_companies(self, query: str, max_results: int = 50) -> List[Dict]:
+        """Поиск компаний на bo.nalog.gov.ru (с выручкой за последний год)"""
+        companies = []
+        page = 1
+        while len(companies) < max_results:
+            found = self.search_page_candidates(query, page)
+            companies.extend(found)
+            if len(found) < SEARCH_PAGE_SIZE:
+                break
+            page += 1
+
+        return self.fill_revenues(companies[:max_results])
+
+    def search_company_by_name(self, company_name: str,
+                               required_fields: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """
+        Ищет компанию по названию через API поиска bo.nalog.gov.ru.
+
+        Если результат поиска уже содержит все required_fields, отчетность
+        не загружается (в записи остается detail_url для complete_company).
+        """
+        candidates = self.search_page_candidates(company_name)
+        by_url = {c['detail_url']: c for c in candidates}
+        ranked = rank_candidates([(c['detail_url'], c['name']) for c in candidates],
+                                 company_name, self.MAX_DETAIL_FETCHES)
+        for detail_url, name in ranked:
+            if not accepts_name(company_name, name):
+                continue
+            company = by_url[detail_url]
+            if required_fields and not missing_fields(company, required_fields):
+                return company
+            return self.fill_revenues([company])[0]
         return None
-    
-    def get_company_data(self, company_url: str) -> Optional[Dict]:
-        """Получение данных о компании с bo.nalog.gov.ru с использованием регулярных выражений"""
-        soup = self.fetch_page(company_url)
-        if not soup:
+
+    def get_company_by_inn(self, inn: str) -> Optional[Dict]:
+        """Возвращает компанию по ИНН (поиск API по ИНН и отчетность)"""
+        inn = normalize_inn(inn)
+        if not inn:
             return None
-        
-        try:
-            html_text = str(soup)
-            page_text = soup.get_text()
-            
-            # ИНН - ищем с помощью регулярных выражений
-            inn = None
-            if '/inn/' in company_url:
-                inn_match = re.search(r'/inn/(\d{10,12})', company_url)
-                if inn_match:
-                    inn = normalize_inn(inn_match.group(1))
-            
-            if not inn:
-                inn_patterns = [
-                    r'ИНН[:\s</>]*(\d{10,12})',
-                    r'ИНН\s*[:\s</>]*(\d{10,12})',
-                    r'inn[:\s</>]*(\d{10,12})',
-                ]
-                for pattern in inn_patterns:
-                    match = re.search(pattern, html_text, re.IGNORECASE)
-                    if match:
-                        inn = normalize_inn(match.group(1))
-                        if inn:
-                            break
-            
-            # Название
-            name = None
-            name_elem = soup.find('h1') or soup.find('title')
-            if name_elem:
-                name = name_elem.get_text(strip=True)
-            
-            if not name or len(name) < 3:
-                name_patterns = [
-                    r'<h1[^>]*>([^<]+)</h1>',
-                    r'<title>([^<]+)</title>',
-                    r'название[:\s</>]*([А-Яа-яЁё\s"«»]+)',
-                ]
-                for pattern in name_patterns:
-                    match = re.search(pattern, html_text, re.IGNORECASE)
-                    if match:
-                        name = match.group(1).strip()
-                        if name and len(name) > 3:
-                            break
-            
-            # Выручка
-            revenue = None
-            revenue_patterns = [
-                r'выручка[:\s</>]*(\d+(?:\s*\d+)*)\s*руб',
-                r'выручка[:\s</>]*(\d+(?:\s*\d+)*)',
-                r'доход[:\s</>]*(\d+(?:\s*\d+)*)\s*руб',
-            ]
-            for pattern in revenue_patterns:
-                match = re.search(pattern, html_text, re.IGNORECASE)
-                if match:
-                    revenue_str = match.group(1).replace(' ', '').replace('\xa0', '')
-                    revenue = normalize_revenue(revenue_str)
-                    if revenue:
-                        break
-            
-            # Сайт
-            site = None
-            site_patterns = [
-                r'href=["\'](https?://[^"\']+)["\']',
-                r'сайт[:\s</>]*https?://([^\s<]+)',
-            ]
-            for pattern in site_patterns:
-                matches = re.finditer(pattern, html_text, re.IGNORECASE)
-                for match in matches:
-                    href = match.group(1) if match.lastindex >= 1 else match.group(0)
-                    if not any(domain in href.lower() for domain in ['facebook', 'vk.com', 'twitter', 'linkedin', 'nalog.gov.ru', 'yandex.ru', 'google.com']):
-                        if not href.startswith('http'):
-                            href = 'http://' + href
-                        site = normalize_url(href)
-                        if site:
-                            break
-                if site:
-                    break
-            
-            # Сотрудники
-            employees = None
-            employees_patterns = [
-                r'(\d+)\s*сотрудник',
-                r'сотрудник[:\s</>]*(\d+)',
-            ]
-            for pattern in employees_patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE)
-                if match:
-                    employees = normalize_employees(match.group(1))
-                    if employees:
-                        break
-            
-            # ОКВЭД
-            okved = None
-            okved_patterns = [
-                r'ОКВЭД[:\s</>]*(\d{2}\.\d{2}\.\d{2})',
-                r'оквэд[:\s</>]*(\d{2}\.\d{2}\.\d{2})',
-            ]
-            for pattern in okved_patterns:
-                match = re.search(pattern, html_text, re.IGNORECASE)
-                if match:
-                    okved = match.group(1)
-                    if okved:
-                        break
-            
-            if inn and name:
-                return {
-                    'inn': inn,
-                    'name': name.strip(),
-                    'revenue': revenue,
-                    'site': site,
-                    'employees': employees,
-                    'okved_main': okved,
-                    'source': 'nalog.gov.ru'
-                }
-        except Exception as e:
-            print(f"Ошибка при парсинге {company_url}: {e}")
-        
+        for company in self.search_page_candidates(inn):
+            if company['inn'] == inn:
+                return self.fill_revenues([company])[0]
         return None
 
+    def get_company_data(self, company_url: str) -> Optional[Dict]:
+        """
+        Получение данных о компании по URL.
+
+        Для адреса отчетности (detail_url из результатов поиска) возвращается
+        запись только с выручкой - остальные поля уже есть в результате поиска;
+        для адреса вида .../inn/<ИНН> - полная запись.
+        """
+        if BFO_URL_RE.search(company_url or ''):
+            by_year = self.get_revenue_by_year(company_url)
+            if not by_year:
+                return None
+            return {'revenue': latest_revenue(by_year), 'source': self.SOURCE}
+
+        inn_match = INN_URL_RE.search(company_url or '')
+        if inn_match:
+            return self.get_company_by_inn(inn_match.group(1))
+        return None
@@ -1,9 +1,11 @@
 """Основной скрипт для сбора базы компаний с CAT-системами"""
-import csv
+import argparse
 import os
 import sys
+import time
 from pathlib import Path
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 
 # Добавляем корневую директорию в путь
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -12,9 +14,142 @@ from src.collectors.rusprofile_collector import RusprofileCollector
 from src.collectors.list_org_collector import ListOrgCollector
 from src.collectors.company_searcher import CompanySearcher
 from src.collectors.nalog_collector import NalogCollector
+from src.collectors.fns_dump_collector import FnsDumpCollector
+from src.collectors.discovery import discover_companies
 from src.processors.cat_detector import CATDetector
-from src.processors.data_normalizer import normalize_company_data, filter_companies
+from src.processors.data_normalizer import normalize_company_data, is_cat_producer
+from src.processors.classification import DEFAULT_RULES
 from src.processors.company_merger import merge_companies
+from src.utils.revenue_index import RevenueIndex
+from src.utils.output_sinks import save_companies, load_companies
+from src.utils.parse_pool import ParsePool
+from src.utils.cat_cache import CatResultCache
+from src.utils.parse_cache import ParsedRecordCache
+from src.utils.source_stats import SourceStats
+from src.utils.proxy_pool import pool_from_env
+from src.utils.http_client import bandwidth
+from src.utils.name_source import iter_names_from_file, iter_unique, iter_prioritized
+
+
+# Локальный реестр из выгрузок ФНС (создается: python -m src.collectors.fns_dump_collector <файлы>)
+REGISTRY_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'registry.sqlite')
+# Индекс выручки по ИНН (создается: ... fns_dump_collector <файлы> --revenue-index data/revenue.idx)
+REVENUE_INDEX_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'revenue.idx')
+# Результаты проверки сайтов на CAT-системы по доменам (переиспользуются между запусками)
+CAT_CACHE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'cat_cache.sqlite')
+# Разобранные страницы компаний по хешу тела ответа (PARSE_CACHE=0 - не использовать)
+PARSE_CACHE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'parsed_records.sqlite')
+# Статистика источников каскадного поиска (ADAPTIVE_CASCADE=0 - всегда прежний порядок)
+SOURCE_STATS_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'source_stats.sqlite')
+
+
+def create_parse_pool():
+    """
+    Создает пул процессов для разбора страниц, если задана переменная окружения
+    PARSE_WORKERS (число процессов; 0 или пусто - разбор в основном процессе)
+    """
+    workers = int(os.environ.get('PARSE_WORKERS') or 0)
+    return ParsePool(max_workers=workers) if workers > 0 else None
+
+
+# Поля, без которых запись из каскадного поиска не принимается; остальные
+# (сайт, выручка) дозагружаются с детальных страниц только когда понадобятся
+LOOKUP_REQUIRED_FIELDS = ('inn', 'name')
+
+# Сколько самых ценных названий из встроенного списка искать, если время не ограничено
+DEFAULT_LOOKUP_LIMIT = 30
+
+# Минимальная выручка (рубли) для отбора на этапе 8; ИНН с меньшей выручкой по индексу
+# выручки отсеиваются еще до поиска
+MIN_REVENUE = 100_000_000
+
+# Доля общего срока запуска (RUN_DEADLINE), которая отводится на поиск компаний;
+# остальное - на проверку сайтов, фильтрацию и сохранение
+COLLECT_SHARE = 0.7
+
+
+def source_base_urls() -> Dict[str, str]:
+    """
+    Адреса источников из переменной окружения SOURCE_BASE_URLS
+    ("rusprofile=http://127.0.0.2:8800,list-org=...") - для прогона на симуляторе
+    """
+    base_urls = {}
+    for item in os.environ.get('SOURCE_BASE_URLS', '').split(','):
+        source, _, url = item.partition('=')
+        if source.strip() and url.strip():
+            base_urls[source.strip()] = url.strip()
+    return base_urls
+
+
+def open_parse_cache() -> Optional[ParsedRecordCache]:
+    """Открывает кеш разобранных страниц, если он не отключен (PARSE_CACHE=0)"""
+    if os.environ.get('PARSE_CACHE', '1') == '0':
+        return None
+    return ParsedRecordCache(PARSE_CACHE_PATH)
+
+
+def create_collectors(parse_pool=None, base_urls: Optional[Dict[str, str]] = None,
+                      parse_cache: Optional[ParsedRecordCache] = None, proxy_pool=None) -> Dict:
+    """
+    Создает коллекторы каскадного поиска, по источнику записи (с общим кешем
+    разобранных страниц и, если заданы EGRESS_PROXIES, общим пулом прокси)
+    """
+    if base_urls is None:
+        base_urls = source_base_urls()
+    if parse_cache is None:
+        parse_cache = open_parse_cache()
+    if proxy_pool is None:
+        proxy_pool = pool_from_env()
+    return {
+        'rusprofile': CompanySearcher(parse_pool=parse_pool, base_url=base_urls.get('rusprofile'),
+                                      parse_cache=parse_cache, proxy_pool=proxy_pool),
+        'list-org': ListOrgCollector(parse_pool=parse_pool, base_url=base_urls.get('list-org'),
+                                     parse_cache=parse_cache, proxy_pool=proxy_pool),
+        'nalog.gov.ru': NalogCollector(parse_pool=parse_pool, base_url=base_urls.get('nalog.gov.ru'),
+                                       parse_cache=parse_cache, proxy_pool=proxy_pool),
+    }
+
+
+def complete_company_fields(company: Dict, fields, collectors: Dict) -> Dict:
+    """Дозагружает недостающие поля записи, собранной из результата поиска"""
+    detail_url = company.get('detail_url')
+    if not detail_url:
+        return company
+    for collector in collectors.values():
+        if detail_url.startswith(collector.BASE_URL):
+            return collector.complete_company(company, fields)
+    return company
+
+
+def lookup_priority(name: str, revenue_index=None) -> int:
+    """Ценность поиска названия (для ИНН учитывается выручка из индекса, если он есть)"""
+    revenue = None
+    if revenue_index is not None and name.strip().isdigit():
+        revenue = revenue_index.latest_revenue(name.strip())
+    return DEFAULT_RULES.lookup_priority(name, revenue)
+
+
+def open_revenue_index():
+    """Открывает индекс выручки, если он построен"""
+    if os.path.exists(REVENUE_INDEX_PATH):
+        return RevenueIndex(REVENUE_INDEX_PATH)
+    return None
+
+
+def open_source_stats() -> Optional[SourceStats]:
+    """Загружает статистику источников, если порядок каскада не зафиксирован (ADAPTIVE_CASCADE=0)"""
+    if os.environ.get('ADAPTIVE_CASCADE', '1') == '0':
+        return None
+    return SourceStats(SOURCE_STATS_PATH)
+
+
+def open_cat_cache() -> CatResultCache:
+    """
+    Открывает кеш результатов проверки сайтов; срок годности результата
+    задается переменной окружения CAT_CACHE_TTL_DAYS (по умолчанию 30 дней)
+    """
+    ttl_days = float(os.environ.get('CAT_CACHE_TTL_DAYS') or 30)
+    return CatResultCache(CAT_CACHE_PATH, ttl=ttl_days * 24 * 3600)
 
 
 def get_companies_list_from_internet() -> List[str]:
@@ -72,76 +207,137 @@ def get_companies_list_from_internet() -> List[str]:
     return companies
 
 
-def collect_companies() -> List[Dict]:
+def collect_companies(revenue_index=None, parse_pool=None, collectors=None,
+                      input_path: Optional[str] = None, max_workers: int = 1,
+                      time_budget: Optional[float] = None,
+                      discovery_queries: Optional[List[str]] = None,
+                      company_budget: Optional[float] = None,
+                      deadline: Optional[float] = None) -> List[Dict]:
     """
     Собирает данные о компаниях из различных источников.
     Новый подход: сначала получаем список компаний из интернета,
     затем ищем их на rusprofile.ru по конкретным названиям.
+    
+    Если задан input_path (CSV/JSONL/текст с названиями или ИНН), названия
+    читаются из файла потоково, без дубликатов и без ограничения количества;
+    объем работы ограничивают max_workers и time_budget (секунды) или
+    deadline (момент по time.monotonic). Названия ищутся в порядке ожидаемой
+    ценности (см. lookup_priority): к сроку успевают самые нужные. На одну
+    компанию отводится не больше company_budget секунд.
+    
+    discovery_queries - ключевые слова для поиска новых компаний по страницам
+    результатов всех источников (без заранее известных названий).
     """
     all_companies = []
     
     print("Начинаем сбор данных...")
     
-    # Получаем список компаний из интернета
-    print("\n1. Получение списка компаний из интернета...")
-    company_names = get_companies_list_from_internet()
-    print(f"   Найдено компаний для поиска: {len(company_names)}")
-    
     # Ищем компании с каскадным поиском: rusprofile -> list-org -> nalog.gov.ru -> без реквизитов
+    if collectors is None:
+        collectors = create_collectors(parse_pool)
+    searcher = collectors['rusprofile']
+    list_org = collectors['list-org']
+    nalog = collectors['nalog.gov.ru']
+    registry = None
+    if os.path.exists(REGISTRY_DB_PATH):
+        registry = FnsDumpCollector(REGISTRY_DB_PATH)
+    
+    if input_path:
+        print(f"\n1. Чтение названий компаний из {input_path}...")
+        companies_to_search = iter_prioritized(
+            iter_unique(iter_names_from_file(input_path)),
+            lambda name: lookup_priority(name, revenue_index)
+        )
+    else:
+        # Получаем список компаний из интернета
+        print("\n1. Получение списка компаний из интернета...")
+        company_names = get_companies_list_from_internet()
+        print(f"   Найдено компаний для поиска: {len(company_names)}")
+        
+        # Приоритет: сначала производители CAT-систем, затем переводческие компании;
+        # без ограничения по времени ищем только самые ценные, чтобы не зависнуть
+        companies_to_search = list(iter_prioritized(company_names, lookup_priority))
+        if not time_budget and deadline is None:
+            companies_to_search = companies_to_search[:DEFAULT_LOOKUP_LIMIT]
+    
     print("\n2. Каскадный поиск компаний по названиям...")
     print("   Порядок поиска: rusprofile.ru -> list-org.com -> bo.nalog.gov.ru -> без реквизитов")
+    source_stats = open_source_stats()
+    if source_stats is not None:
+        print("   (порядок сайтов подстраивается под их долю находок, скорость и ошибки)")
+    if registry:
+        print("   Используется локальный реестр ФНС (проверяется первым)")
+    if isinstance(companies_to_search, list):
+        print(f"   Ищем {len(companies_to_search)} компаний (приоритет: производители CAT-систем, "
+              f"переводческие компании, известная высокая выручка)...")
     
-    searcher = CompanySearcher()
-    list_org = ListOrgCollector()
-    nalog = NalogCollector()
-    
-    # Ограничиваем количество компаний для поиска, чтобы не зависнуть
-    # Приоритет: сначала производители CAT-систем, потом остальные
-    priority_companies = [
-        'PROMT', 'ПРОМТ', 'firstCAT', '1C International', '1Ci',
-        'Amberite Localization', 'Катминт', 'Catmint', 'Литерра', 'Гардарика',
-        'Логрус', 'Logrus IT', 'Logrus Global', 'ABBYY', 'ЦЛТ'
-    ]
-    other_companies = [c for c in company_names if c not in priority_companies]
-    companies_to_search = priority_companies + other_companies[:15]  # Приоритетные + еще 15
-    
-    print(f"   Ищем {len(companies_to_search)} компаний (приоритет: производители CAT-систем)...")
     companies = searcher.search_multiple_companies(
         companies_to_search,
         list_org_collector=list_org,
-        nalog_collector=nalog
+        nalog_collector=nalog,
+        registry_collector=registry,
+        revenue_index=revenue_index,
+        required_fields=LOOKUP_REQUIRED_FIELDS,
+        max_workers=max_workers,
+        time_budget=time_budget,
+        company_budget=company_budget,
+        deadline=deadline,
+        source_stats=source_stats,
+        min_revenue=MIN_REVENUE
     )
     all_companies.extend(companies)
     print(f"   Найдено компаний: {len(companies)}")
+    if source_stats is not None:
+        print("   Статистика источников:")
+        source_stats.report()
+        source_stats.save()
+    
+    if discovery_queries and (deadline is None or time.monotonic() < deadline):
+        print(f"\n2.1. Поиск компаний по ключевым словам: {', '.join(discovery_queries)}...")
+        discovered = list(discover_companies(
+            discovery_queries,
+            [searcher, list_org, nalog],
+            max_workers=max(max_workers, len(discovery_queries))
+        ))
+        all_companies.extend(discovered)
+        print(f"   Найдено по ключевым словам: {len(discovered)}")
     
     print(f"\nВсего собрано компаний: {len(all_companies)}")
     
     return all_companies
 
 
-def detect_cat_systems(companies: List[Dict]) -> List[Dict]:
+def detect_cat_systems(companies: List[Dict], parse_pool=None, cat_cache=None,
+                       max_workers: int = 8) -> List[Dict]:
     """Определяет наличие CAT-систем на сайтах компаний"""
     print("\n3. Проверка наличия CAT-систем на сайтах компаний...")
-    detector = CATDetector()
+    detector = CATDetector(parse_pool=parse_pool, cache=cat_cache, proxy_pool=pool_from_env())
     
     companies_with_cat = []
     checked = 0
     
+    # Сайты проверяются параллельно; результаты печатаются по мере готовности
+    by_site = {}
     for company in companies:
-        site = company.get('site')
-        if site:
+        if company.get('site'):
+            by_site.setdefault(company['site'], []).append(company)
+    site_results = {}
+    for site, result in detector.detect_many(by_site, max_workers=max_workers):
+        site_results[site] = result
+        for company in by_site[site]:
             checked += 1
             print(f"   Проверка {checked}/{len(companies)}: {company.get('name', 'Unknown')}")
-            has_cat, evidence, product = detector.detect_cat(site)
-            
+            print(f"      ✓ Найдена CAT-система: {result[1]}" if result[0] else f"      ✗ CAT-система не найдена")
+    
+    for company in companies:
+        site = company.get('site')
+        if site:
+            has_cat, evidence, product = site_results.get(site, (False, None, None))
             if has_cat:
                 company['cat_evidence'] = evidence
                 if product:
                     company['cat_product'] = product
                 companies_with_cat.append(company)
-                print(f"      ✓ Найдена CAT-система: {evidence}")
-            else:
-                print(f"      ✗ CAT-система не найдена")
         else:
             # Если сайта нет, но компания из поиска по CAT/TMS, добавляем с пометкой
             if any(keyword in str(company.get('name', '')).lower() for keyword in ['перевод', 'translation', 'локализация', 'localization']):
@@ -158,35 +354,68 @@ def save_to_csv(companies: List[Dict], output_path: str):
         print("Нет компаний для сохранения")
         return
     
-    # Определяем все возможные поля
-    fieldnames = [
-        'inn', 'name', 'revenue', 'site', 'cat_evidence', 'source',
-        'cat_product', 'employees', 'okved_main'
-    ]
-    
-    # Создаем директорию если её нет
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for company in companies:
-            row = {field: company.get(field, '') for field in fieldnames}
-            writer.writerow(row)
+    save_companies(companies, output_path, fmt='csv')
     
     print(f"\nДанные сохранены в {output_path}")
     print(f"Всего компаний в файле: {len(companies)}")
 
 
-def main():
-    """Основная функция"""
-    print("=" * 60)
-    print("Сбор базы российских компаний с CAT-системами")
-    print("=" * 60)
+def save_extra_outputs(companies: List[Dict], output_dir: str, formats: Optional[List[str]] = None):
+    """
+    Дополнительно сохраняет компании в типизированных форматах.
+    
+    Настраивается переменными окружения:
+    - OUTPUT_FORMATS: через запятую, например "parquet,arrow" (если formats не задан);
+      sqlite - база data/companies.sqlite, которая обновляется по ИНН (RUN_ID - метка запуска)
+    - OUTPUT_SHARD_SIZE: число строк в одном файле (по умолчанию без шардирования)
+    - OUTPUT_COMPRESSION: алгоритм сжатия (zstd, snappy, lz4, gzip)
+    """
+    if formats is None:
+        formats = [f.strip() for f in os.environ.get('OUTPUT_FORMATS', '').split(',') if f.strip()]
+    if not formats or not companies:
+        return
+    
+    shard_size = int(os.environ['OUTPUT_SHARD_SIZE']) if os.environ.get('OUTPUT_SHARD_SIZE') else None
+    compression = os.environ.get('OUTPUT_COMPRESSION') or None
     
+    for fmt in formats:
+        output_path = os.path.join(output_dir, f'companies.{fmt}')
+        paths = save_companies(companies, output_path, fmt=fmt,
+                               shard_size=shard_size, compression=compression)
+        print(f"Данные сохранены в формате {fmt}: {len(paths)} файл(ов)")
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+OUTPUT_PATH = os.path.join(DATA_DIR, 'companies.csv')
+
+# Промежуточные файлы этапов (JSONL со всеми полями записи)
+STAGE_PATHS = {
+    'collect': os.path.join(DATA_DIR, 'stages', 'collected.jsonl'),
+    'merge': os.path.join(DATA_DIR, 'stages', 'merged.jsonl'),
+    'detect': os.path.join(DATA_DIR, 'stages', 'detected.jsonl'),
+    'filter': os.path.join(DATA_DIR, 'stages', 'filtered.jsonl'),
+}
+
+
+def run_collect(collectors: Dict, parse_pool=None, revenue_index=None,
+                input_path: Optional[str] = None, max_workers: int = 1,
+                time_budget: Optional[float] = None,
+                discovery_queries: Optional[List[str]] = None,
+                company_budget: Optional[float] = None,
+                deadline: Optional[float] = None) -> List[Dict]:
+    """Этапы 1-4: поиск компаний и добавление известных компаний с CAT-системами"""
     # Собираем данные (пытаемся парсить, но если не получится - используем известные)
-    companies = collect_companies()
+    companies = collect_companies(
+        revenue_index=revenue_index,
+        parse_pool=parse_pool,
+        collectors=collectors,
+        input_path=input_path,
+        max_workers=max_workers,
+        time_budget=time_budget,
+        discovery_queries=discovery_queries,
+        company_budget=company_budget,
+        deadline=deadline
+    )
     
     # Если не удалось собрать данные через парсинг, используем известные компании
     if not companies:
@@ -198,7 +427,11 @@ def main():
     known_companies = get_known_companies()
     companies.extend(known_companies)
     print(f"   Всего компаний (включая известные): {len(companies)}")
-    
+    return companies
+
+
+def run_merge(companies: List[Dict]) -> List[Dict]:
+    """Этапы 5-6: нормализация и объединение дубликатов по ИНН"""
     # Нормализуем данные
     print("\n5. Нормализация данных...")
     normalized = [normalize_company_data(c) for c in companies]
@@ -208,95 +441,279 @@ def main():
     print("\n6. Объединение дубликатов...")
     merged = merge_companies(normalized)
     print(f"   После объединения: {len(merged)} компаний")
+    return merged
+
+
+def needs_site_check(company: Dict) -> bool:
+    """Признак CAT-системы определяется по сайту, а не по списку производителей или источнику"""
+    return DEFAULT_RULES.needs_site_check(company)
+
+
+def check_company_sites(companies: List[Dict], detector: CATDetector, collectors: Dict,
+                        max_workers: int = 1, deadline: Optional[float] = None) -> Dict[int, tuple]:
+    """
+    Проверяет сайты компаний, которым нужна проверка; max_workers сайтов одновременно.
     
+    Самые ценные компании (см. ClassificationRules.lookup_priority) идут первыми:
+    сайт дозагружается и сразу передается на проверку. После deadline (по
+    time.monotonic) новые сайты не дозагружаются и не проверяются, поэтому
+    к сроку проверены сайты самых нужных компаний.
+    
+    Returns:
+        {id(company): (has_cat, evidence, product)} для компаний с проверенным сайтом
+    """
+    def complete_site(company):
+        # Дозагружаем сайт, если запись собрана из результата поиска
+        if deadline is None or time.monotonic() < deadline:
+            complete_company_fields(company, ('site',), collectors)
+        return company
+    
+    pending = [c for c in companies if needs_site_check(c)]
+    pending.sort(key=lambda c: -DEFAULT_RULES.lookup_priority(c.get('name'), c.get('revenue')))
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        completed = executor.map(complete_site, pending)
+        site_results = dict(detector.detect_many(
+            (c['site'] for c in completed if c.get('site')), max_workers=max_workers, deadline=deadline
+        ))
+    return {id(c): site_results[c['site']] for c in pending if c.get('site') in site_results}
+
+
+def run_detect(merged: List[Dict], collectors: Dict, parse_pool=None, max_workers: int = 1,
+               deadline: Optional[float] = None) -> List[Dict]:
+    """
+    Этап 7: отбор компаний с признаками CAT-систем (с проверкой сайтов).
+    
+    После deadline (по time.monotonic) сайты и выручка не дозагружаются:
+    компании без проверенного сайта отбираются по остальным правилам.
+    """
     # Определяем CAT-системы (для компаний без cat_evidence)
     print("\n7. Проверка наличия CAT-систем на сайтах компаний...")
     
-    # Список производителей CAT-систем (для автоматического добавления cat_evidence)
-    cat_producers = [
-        'PROMT', 'ПРОМТ', 'firstCAT', '1C International', '1Ci',
-        'Amberite Localization', 'Катминт', 'Catmint', 'Литерра', 'Гардарика',
-        'Логрус', 'Logrus IT', 'Logrus Global', 'ABBYY'
-    ]
-    
     companies_with_cat = []
-    detector = CATDetector()
-    
+    cat_cache = open_cat_cache()
+    detector = CATDetector(parse_pool=parse_pool, cache=cat_cache, proxy_pool=pool_from_env())
+    site_checks = check_company_sites(merged, detector, collectors, max_workers=max_workers,
+                                      deadline=deadline)
+    cat_cache.close()
+    if deadline is not None and time.monotonic() >= deadline:
+        print(f"   ⏱ Время истекло: проверено сайтов - {len(site_checks)}")
+    
+    # Правила назначения cat_evidence - в src.processors.classification
     for company in merged:
-        name = company.get('name', '').upper()
-        source = company.get('source', '')
-        
-        # Если компания уже имеет cat_evidence
-        if company.get('cat_evidence'):
-            companies_with_cat.append(company)
-            continue
-        
-        # Если компания - производитель CAT-систем, добавляем автоматически
-        is_producer = any(prod.upper() in name for prod in cat_producers)
-        if is_producer:
-            company['cat_evidence'] = f"Производитель CAT-системы: {company.get('name')}"
-            companies_with_cat.append(company)
-            continue
-        
-        # Для компаний без реквизитов (manual) - добавляем базовое доказательство
-        if source == 'manual':
-            # Проверяем, является ли это производителем CAT-систем
-            original_name = company.get('name', '')
-            is_producer_manual = any(prod.upper() in original_name.upper() for prod in cat_producers)
-            if is_producer_manual:
-                company['cat_evidence'] = f"Производитель CAT-системы: {original_name}"
-            else:
-                company['cat_evidence'] = f"Компания из списка производителей/партнеров CAT-систем: {original_name}"
+        if DEFAULT_RULES.assign_evidence(company, site_checks.get(id(company))):
             companies_with_cat.append(company)
-            continue
-        
-        # Для остальных - проверяем сайт
-        site = company.get('site')
-        if site:
-            has_cat, evidence, product = detector.detect_cat(site)
-            if has_cat:
-                company['cat_evidence'] = evidence
-                if product:
-                    company['cat_product'] = product
-                companies_with_cat.append(company)
-            else:
-                # Если сайт есть, но CAT не найден, но компания из списка переводческих - добавляем с пометкой
-                name_lower = name.lower()
-                if any(keyword in name_lower for keyword in ['перевод', 'translation', 'локализация', 'localization', 'лингва', 'транс']):
-                    company['cat_evidence'] = f"Переводческая компания (CAT-система не обнаружена на сайте, но компания из списка): {company.get('name')}"
-                    companies_with_cat.append(company)
-        else:
-            # Если сайта нет, но компания из списка переводческих - добавляем с пометкой
-            name_lower = name.lower()
-            if any(keyword in name_lower for keyword in ['перевод', 'translation', 'локализация', 'localization', 'лингва', 'транс']):
-                company['cat_evidence'] = f"Переводческая компания из списка: {company.get('name')}"
-                companies_with_cat.append(company)
     
     print(f"   Компаний с CAT-системами: {len(companies_with_cat)}")
     
+    # Дозагружаем выручку только там, где она нужна для фильтрации
+    for company in companies_with_cat:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        if not company.get('revenue') and not is_cat_producer(company.get('name', '')):
+            complete_company_fields(company, ('revenue',), collectors)
+    
+    return companies_with_cat
+
+
+def run_filter(companies_with_cat: List[Dict], min_revenue: int = MIN_REVENUE,
+               revenue_index=None, min_count: int = 50) -> List[Dict]:
+    """Этапы 8-9: фильтрация по выручке и добор компаний с доказательством CAT до min_count"""
     # Фильтруем по критериям
-    print("\n8. Фильтрация по критериям (выручка >= 100 млн ₽)...")
-    filtered = filter_companies(companies_with_cat, min_revenue=100_000_000)
+    print(f"\n8. Фильтрация по критериям (выручка >= {min_revenue / 1_000_000:g} млн ₽)...")
+    filtered, additional = DEFAULT_RULES.select(companies_with_cat, min_revenue,
+                                                revenue_index=revenue_index, min_count=min_count)
     print(f"   После фильтрации: {len(filtered)} компаний")
     
     # Если компаний недостаточно, добавляем компании без выручки, но с доказательством CAT
-    if len(filtered) < 50:
+    # (с ИНН, которых еще нет среди отобранных) - до min_count компаний
+    if len(filtered) < min_count:
         print(f"\n9. Добавление компаний без выручки (но с доказательством CAT)...")
-        additional = []
-        for company in companies_with_cat:
-            if company not in filtered:
-                # Добавляем компании с доказательством CAT, но без выручки или с выручкой < 100 млн
-                if company.get('cat_evidence') and company.get('inn'):
-                    additional.append(company)
-        
-        # Ограничиваем до 50 компаний
-        filtered.extend(additional[:50 - len(filtered)])
-        print(f"   Добавлено компаний: {len(filtered) - (len(filtered) - len(additional[:50 - len(filtered)]))}")
+        filtered.extend(additional)
+        print(f"   Добавлено компаний: {len(additional)}")
         print(f"   Всего компаний: {len(filtered)}")
     
+    return filtered
+
+
+def run_export(companies: List[Dict], output_path: str = OUTPUT_PATH,
+               formats: Optional[List[str]] = None):
+    """Сохраняет итоговый CSV и дополнительные форматы"""
+    save_to_csv(companies, output_path)
+    save_extra_outputs(companies, os.path.dirname(output_path), formats=formats)
+
+
+def save_stage(companies: List[Dict], path: str):
+    """Сохраняет результат этапа в промежуточный файл"""
+    save_companies(companies, path, fmt='jsonl')
+    print(f"\nРезультат этапа сохранен в {path} ({len(companies)} записей)")
+
+
+def load_stage(paths: List[str]) -> List[Dict]:
+    """Читает записи из промежуточных файлов (JSONL) или готовых CSV"""
+    companies = []
+    for path in paths:
+        companies.extend(load_companies(path))
+    print(f"Загружено записей: {len(companies)} из {', '.join(paths)}")
+    return companies
+
+
+def run_deadlines(run_seconds: Optional[float]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Сроки (по time.monotonic) всего запуска и поиска компаний для срока запуска
+    run_seconds (RUN_DEADLINE): на поиск отводится COLLECT_SHARE срока
+    """
+    if not run_seconds:
+        return None, None
+    now = time.monotonic()
+    return now + run_seconds, now + run_seconds * COLLECT_SHARE
+
+
+def run_pipeline():
+    """
+    Полный прогон: все этапы подряд (настройки - из переменных окружения).
+    
+    RUN_DEADLINE - срок всего запуска в секундах: поиск компаний занимает
+    не больше COLLECT_SHARE от него, к сроку новые проверки не начинаются,
+    и сохраняется лучший частичный результат. COMPANY_TIME_BUDGET - сколько
+    секунд отводится на поиск одной компании.
+    """
+    run_deadline, collect_deadline = run_deadlines(float(os.environ.get('RUN_DEADLINE') or 0))
+    
+    revenue_index = open_revenue_index()
+    parse_pool = create_parse_pool()
+    collectors = create_collectors(parse_pool)
+    
+    companies = run_collect(
+        collectors,
+        parse_pool=parse_pool,
+        revenue_index=revenue_index,
+        input_path=os.environ.get('INPUT_PATH') or None,
+        max_workers=int(os.environ.get('LOOKUP_WORKERS') or 1),
+        time_budget=float(os.environ['TIME_BUDGET']) if os.environ.get('TIME_BUDGET') else None,
+        discovery_queries=[q.strip() for q in os.environ.get('DISCOVERY_QUERIES', '').split(',') if q.strip()],
+        company_budget=float(os.environ['COMPANY_TIME_BUDGET']) if os.environ.get('COMPANY_TIME_BUDGET') else None,
+        deadline=collect_deadline
+    )
+    merged = run_merge(companies)
+    companies_with_cat = run_detect(merged, collectors, parse_pool=parse_pool,
+                                    max_workers=int(os.environ.get('DETECT_WORKERS') or 8),
+                                    deadline=run_deadline)
+    filtered = run_filter(companies_with_cat, revenue_index=revenue_index)
+    
     # Сохраняем результат
-    output_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'companies.csv')
-    save_to_csv(filtered, output_path)
+    run_export(filtered, OUTPUT_PATH)
+    
+    if parse_pool is not None:
+        parse_pool.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Основная функция.
+    
+    Без аргументов выполняет все этапы подряд. Подкоманды выполняют один этап
+    над промежуточными файлами: collect -> merge -> detect -> filter -> export
+    (например, перепроверить сайты или перефильтровать по другой выручке
+    без повторного сбора).
+    """
+    parser = argparse.ArgumentParser(description='Сбор базы российских компаний с CAT-системами')
+    subparsers = parser.add_subparsers(dest='command')
+    
+    collect_parser = subparsers.add_parser('collect', help='поиск компаний (этапы 1-4)')
+    collect_parser.add_argument('--input', default=os.environ.get('INPUT_PATH') or None,
+                                help='файл с названиями или ИНН (CSV/JSONL/текст)')
+    collect_parser.add_argument('--workers', type=int, default=int(os.environ.get('LOOKUP_WORKERS') or 1),
+                                help='сколько компаний искать одновременно')
+    collect_parser.add_argument('--time-budget', type=float,
+                                default=float(os.environ.get('TIME_BUDGET') or 0) or None,
+                                help='ограничение времени поиска, с')
+    collect_parser.add_argument('--run-deadline', type=float,
+                                default=float(os.environ.get('RUN_DEADLINE') or 0) or None,
+                                help='срок всего запуска, с: на поиск отводится его часть, как в полном прогоне')
+    collect_parser.add_argument('--company-budget', type=float,
+                                default=float(os.environ.get('COMPANY_TIME_BUDGET') or 0) or None,
+                                help='ограничение времени поиска одной компании, с')
+    collect_parser.add_argument('--discovery', default=os.environ.get('DISCOVERY_QUERIES', ''),
+                                help='ключевые слова для поиска новых компаний, через запятую')
+    collect_parser.add_argument('--output', default=STAGE_PATHS['collect'])
+    
+    merge_parser = subparsers.add_parser('merge', help='нормализация и объединение дубликатов (этапы 5-6)')
+    merge_parser.add_argument('inputs', nargs='*', default=[STAGE_PATHS['collect']],
+                              help='файлы с записями (JSONL/CSV); можно несколько')
+    merge_parser.add_argument('--output', default=STAGE_PATHS['merge'])
+    
+    detect_parser = subparsers.add_parser('detect', help='проверка сайтов на CAT-системы (этап 7)')
+    detect_parser.add_argument('--input', default=STAGE_PATHS['merge'])
+    detect_parser.add_argument('--workers', type=int, default=int(os.environ.get('DETECT_WORKERS') or 8),
+                               help='сколько сайтов проверять одновременно')
+    detect_parser.add_argument('--time-budget', type=float, default=None,
+                               help='ограничение времени проверки сайтов, с')
+    detect_parser.add_argument('--output', default=STAGE_PATHS['detect'])
+    
+    filter_parser = subparsers.add_parser('filter', help='фильтрация по выручке (этапы 8-9)')
+    filter_parser.add_argument('--input', default=STAGE_PATHS['detect'])
+    filter_parser.add_argument('--min-revenue', type=int, default=MIN_REVENUE, help='минимальная выручка, ₽')
+    filter_parser.add_argument('--min-count', type=int, default=50,
+                               help='добирать компании без выручки до этого числа')
+    filter_parser.add_argument('--output', default=STAGE_PATHS['filter'])
+    
+    export_parser = subparsers.add_parser('export', help='сохранение итогового CSV и других форматов')
+    export_parser.add_argument('--input', default=STAGE_PATHS['filter'])
+    export_parser.add_argument('--output', default=OUTPUT_PATH, help='путь к CSV')
+    export_parser.add_argument('--formats', default=None,
+                               help='дополнительные форматы через запятую (parquet, arrow, jsonl, sqlite)')
+    
+    args = parser.parse_args(argv)
+    
+    print("=" * 60)
+    print("Сбор базы российских компаний с CAT-системами")
+    print("=" * 60)
+    
+    if args.command is None:
+        run_pipeline()
+    elif args.command == 'collect':
+        _, collect_deadline = run_deadlines(args.run_deadline)
+        revenue_index = open_revenue_index()
+        parse_pool = create_parse_pool()
+        companies = run_collect(
+            create_collectors(parse_pool),
+            parse_pool=parse_pool,
+            revenue_index=revenue_index,
+            input_path=args.input,
+            max_workers=args.workers,
+            time_budget=args.time_budget,
+            company_budget=args.company_budget,
+            discovery_queries=[q.strip() for q in args.discovery.split(',') if q.strip()],
+            deadline=collect_deadline
+        )
+        save_stage(companies, args.output)
+        if parse_pool is not None:
+            parse_pool.close()
+    elif args.command == 'merge':
+        save_stage(run_merge(load_stage(args.inputs)), args.output)
+    elif args.command == 'detect':
+        parse_pool = create_parse_pool()
+        deadline = time.monotonic() + args.time_budget if args.time_budget else None
+        companies_with_cat = run_detect(load_stage([args.input]), create_collectors(parse_pool),
+                                        parse_pool=parse_pool, max_workers=args.workers,
+                                        deadline=deadline)
+        save_stage(companies_with_cat, args.output)
+        if parse_pool is not None:
+            parse_pool.close()
+    elif args.command == 'filter':
+        filtered = run_filter(load_stage([args.input]), min_revenue=args.min_revenue,
+                              revenue_index=open_revenue_index(), min_count=args.min_count)
+        save_stage(filtered, args.output)
+    elif args.command == 'export':
+        formats = [f.strip() for f in args.formats.split(',') if f.strip()] if args.formats else None
+        run_export(load_stage([args.input]), args.output, formats=formats)
+    
+    bandwidth.report()
+    proxy_pool = pool_from_env()
+    if proxy_pool is not None:
+        print("\nЗапросы через прокси:")
+        proxy_pool.report()
     
     print("\n" + "=" * 60)
     print("Готово!")
@@ -1,28 +1,72 @@
 """Детектор CAT-систем на сайтах компаний"""
 import re
-from typing import Optional, Dict, Tuple
-import requests
-from bs4 import BeautifulSoup
-from src.utils.helpers import normalize_url, get_headers, sleep_random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, Optional, Dict, Tuple, Iterable, Iterator, List
+from src.utils.helpers import normalize_url, registrable_domain, make_soup, sleep_random
+from src.utils.cat_cache import CatResultCache
+from src.utils.http_client import (
+    HTML_CONTENT_TYPES, FetchResult, create_session, fetch_shared, fetch_with_retry, canonicalize_url,
+)
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 
 class CATDetector:
     """Класс для определения наличия CAT-систем на сайте компании"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(get_headers())
+    # Главной странице сайта компании достаточно 2 МБ и 20 секунд
+    MAX_PAGE_BYTES = 2 * 1024 * 1024
+    PAGE_DEADLINE = 20.0
     
-    def fetch_page(self, url: str, timeout: int = 10) -> Optional[BeautifulSoup]:
-        """Получает HTML страницу и парсит её"""
-        try:
+    _session = None
+    
+    def __init__(self, parse_pool=None, cache=None, proxy_pool=None):
+        # Необязательный ParsePool: анализ страниц выполняется в отдельных процессах
+        self.parse_pool = parse_pool
+        # Необязательный ProxyPool: сайты загружаются через исходящие прокси
+        self.proxy_pool = proxy_pool
+        # Кеш результатов по домену (CatResultCache); по умолчанию - только в памяти
+        self.cache = cache if cache is not None else CatResultCache()
+    
+    @property
+    def session(self):
+        """HTTP-сессия создается при первом запросе (проверки из кеша не импортируют requests)"""
+        if self._session is None:
+            self._session = create_session()
+        return self._session
+    
+    def fetch_content(self, url: str, timeout: int = 10) -> Optional[bytes]:
+        """
+        Загружает страницу и возвращает тело ответа без разбора.
+        
+        Один и тот же сайт часто указан у нескольких компаний - одновременные
+        и недавние запросы одного URL выполняются один раз (см. fetch_shared).
+        PDF, архивы и другие не-HTML ответы, слишком большие и бесконечные
+        ответы не загружаются целиком (см. fetch_with_retry).
+        """
+        def fetch(page_url: str) -> FetchResult:
             sleep_random(1.0, 2.5)
-            response = self.session.get(url, timeout=timeout)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'lxml')
-        except Exception as e:
-            print(f"Ошибка при загрузке {url}: {e}")
+            # Сайт компании - не источник данных: одной повторной попытки достаточно
+            return fetch_with_retry(self.session, page_url, timeout=timeout, max_retries=1,
+                                    max_bytes=self.MAX_PAGE_BYTES, deadline=self.PAGE_DEADLINE,
+                                    proxy_pool=self.proxy_pool)
+        
+        result = fetch_shared(url, fetch, HTML_CONTENT_TYPES)
+        if not result.ok:
+            print(f"Ошибка при загрузке {url}: {result.status}"
+                  + (f" (HTTP {result.status_code})" if result.status_code else ""))
+            return None
+        return result.content
+    
+    def fetch_page(self, url: str, timeout: int = 10) -> Optional['BeautifulSoup']:
+        """Получает HTML страницу и парсит её"""
+        content = self.fetch_content(url, timeout=timeout)
+        if content is None:
             return None
+        return make_soup(content)
     
     # Ключевые слова для поиска CAT-систем
     CAT_KEYWORDS = [
@@ -70,53 +114,176 @@ class CATDetector:
         if not site_url:
             return False, None, None
         
+        # Один домен у нескольких компаний проверяется один раз
+        domain = registrable_domain(site_url)
+        cached = self.cache.get(domain) if domain else None
+        if cached is not None:
+            return cached
+        
         try:
-            soup = self.fetch_page(site_url, timeout=8)
-            if not soup:
+            content = self.fetch_content(site_url, timeout=8)
+            if content is None:
+                # Сайт недоступен - не запоминаем, чтобы проверить в следующий раз
                 return False, None, None
             
-            # Получаем весь текст страницы
-            page_text = soup.get_text().lower()
-            
-            # Ищем упоминания CAT-систем
-            found_keywords = []
-            found_product = None
-            
-            for keyword in self.CAT_KEYWORDS:
-                if keyword.lower() in page_text:
-                    found_keywords.append(keyword)
-            
-            # Ищем конкретные продукты
-            for product_key, product_name in self.CAT_PRODUCTS.items():
-                if product_key.lower() in page_text:
-                    found_product = product_name
-                    break
-            
-            if found_keywords or found_product:
-                # Формируем доказательство
-                evidence_parts = []
-                
-                # Проверяем разделы сайта
-                sections = []
-                for section in ['технологи', 'услуг', 'о нас', 'about', 'services', 'technology']:
-                    if section in page_text:
-                        sections.append(section)
-                
-                if sections:
-                    evidence_parts.append(f"Упоминание в разделе '{sections[0]}'")
-                
-                if found_product:
-                    evidence_parts.append(f"Использование продукта {found_product}")
-                elif found_keywords:
-                    evidence_parts.append(f"Упоминание: {found_keywords[0]}")
-                
-                evidence = " | ".join(evidence_parts) if evidence_parts else "Упоминание CAT/TMS/локализации"
-                
-                return True, evidence, found_product
-            
-            return False, None, None
+            if self.parse_pool is not None:
+                result = self.parse_pool.run(analyze_cat_content, content)
+            else:
+                result = analyze_cat_content(content)
+            if domain:
+                self.cache.put(domain, result)
+            return result
             
         except Exception as e:
             print(f"Ошибка при проверке сайта {site_url}: {e}")
             return False, None, None
 
+
+    def detect_many(self, sites: Iterable[str], max_workers: int = 8,
+                    per_host_limit: int = 1,
+                    deadline: Optional[float] = None) -> Iterator[Tuple[str, Tuple[bool, Optional[str], Optional[str]]]]:
+        """
+        Проверяет много сайтов одновременно и отдает (site, результат) по мере готовности.
+        
+        Повторяющиеся сайты (после канонизации URL) проверяются один раз, но
+        результат отдается для каждого из переданных вариантов написания.
+        Одновременно выполняется не больше max_workers проверок и не больше
+        per_host_limit на один домен; следующий сайт того же домена обычно
+        берется уже из кеша результатов.
+        
+        sites читаются лениво, по мере освобождения слотов, и проверяются
+        в порядке передачи (первыми - самые ценные). После deadline (по
+        time.monotonic) новые проверки не начинаются, а незавершенные
+        не ожидаются: сайты без готового результата остаются без результата.
+        """
+        # Канонический URL -> варианты написания, домен -> очередь канонических URL
+        variants: Dict[str, List[str]] = {}
+        queues: Dict[str, deque] = {}
+        active: Dict[str, int] = {}
+        finished: Dict[str, Tuple[bool, Optional[str], Optional[str]]] = {}
+        # Домены, у которых есть непроверенные сайты и свободные слоты
+        ready = deque()
+        # Варианты уже проверенных сайтов, переданные после проверки
+        late = deque()
+        site_iter = iter(sites)
+        
+        def add(site: str):
+            normalized = normalize_url(site)
+            if not normalized:
+                return
+            key = canonicalize_url(normalized)
+            if key in finished:
+                late.append((site, finished[key]))
+            if key not in variants:
+                variants[key] = []
+                domain = registrable_domain(key) or key
+                queue = queues.setdefault(domain, deque())
+                queue.append(key)
+                active.setdefault(domain, 0)
+                if len(queue) == 1 and active[domain] < per_host_limit:
+                    ready.append(domain)
+            if site not in variants[key]:
+                variants[key].append(site)
+        
+        def take_next() -> Optional[Tuple[str, str]]:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            while not ready:
+                site = next(site_iter, None)
+                if site is None:
+                    return None
+                add(site)
+            domain = ready.popleft()
+            queue = queues[domain]
+            key = queue.popleft()
+            active[domain] += 1
+            if queue and active[domain] < per_host_limit:
+                ready.append(domain)
+            return domain, key
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            in_flight = {}
+            while True:
+                while len(in_flight) < max_workers:
+                    task = take_next()
+                    if task is None:
+                        break
+                    domain, key = task
+                    in_flight[executor.submit(self.detect_cat, variants[key][0])] = (domain, key)
+                while late:
+                    yield late.popleft()
+                if not in_flight:
+                    break
+                
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Срок истек - незавершенные проверки не ждем
+                    break
+                for future in done:
+                    domain, key = in_flight.pop(future)
+                    if queues[domain] and active[domain] == per_host_limit:
+                        ready.append(domain)
+                    active[domain] -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"Ошибка при проверке сайта {key}: {e}")
+                        result = (False, None, None)
+                    finished[key] = result
+                    for site in variants[key]:
+                        yield site, result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def analyze_cat_content(content: bytes) -> Tuple[bool, Optional[str], Optional[str]]:
+    """
+    Ищет признаки CAT-системы в HTML странице (может выполняться в пуле процессов)
+    
+    Returns:
+        (has_cat, evidence, product_name)
+    """
+    soup = make_soup(content)
+    
+    # Получаем весь текст страницы
+    page_text = soup.get_text().lower()
+    
+    # Ищем упоминания CAT-систем
+    found_keywords = []
+    found_product = None
+    
+    for keyword in CATDetector.CAT_KEYWORDS:
+        if keyword.lower() in page_text:
+            found_keywords.append(keyword)
+    
+    # Ищем конкретные продукты
+    for product_key, product_name in CATDetector.CAT_PRODUCTS.items():
+        if product_key.lower() in page_text:
+            found_product = product_name
+            break
+    
+    if found_keywords or found_product:
+        # Формируем доказательство
+        evidence_parts = []
+        
+        # Проверяем разделы сайта
+        sections = []
+        for section in ['технологи', 'услуг', 'о нас', 'about', 'services', 'technology']:
+            if section in page_text:
+                sections.append(section)
+        
+        if sections:
+            evidence_parts.append(f"Упоминание в разделе '{sections[0]}'")
+        
+        if found_product:
+            evidence_parts.append(f"Использование продукта {found_product}")
+        elif found_keywords:
+            evidence_parts.append(f"Упоминание: {found_keywords[0]}")
+        
+        evidence = " | ".join(evidence_parts) if evidence_parts else "Упоминание CAT/TMS/локализации"
+        
+        return True, evidence, found_product
+    
+    return False, None, None
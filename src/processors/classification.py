@@ -0,0 +1,181 @@
+"""Правила отбора компаний с CAT-системами: назначение cat_evidence и фильтрация"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Производители CAT-систем: им cat_evidence проставляется без проверки сайта
+CAT_PRODUCER_NAMES = [
+    'PROMT', 'ПРОМТ', 'firstCAT', '1C International', '1Ci',
+    'Amberite Localization', 'Катминт', 'Catmint', 'Литерра', 'Гардарика',
+    'Логрус', 'Logrus IT', 'Logrus Global', 'ABBYY'
+]
+
+# Производители CAT-систем, для которых при фильтрации не обязательна выручка
+CAT_PRODUCERS_KEYWORDS = [
+    'PROMT', 'ПРОМТ', 'firstCAT', '1C International', '1Ci',
+    'Amberite', 'Катминт', 'Catmint', 'Литерра', 'Гардарика',
+    'Логрус', 'ABBYY'
+]
+
+# Признаки переводческой компании в названии
+TRANSLATION_KEYWORDS = ['перевод', 'translation', 'локализация', 'localization', 'лингва', 'транс']
+
+# Решения по записи до проверки сайта
+HAS_EVIDENCE = 'has_evidence'
+PRODUCER = 'producer'
+MANUAL = 'manual'
+CHECK_SITE = 'check_site'
+
+SiteResult = Tuple[bool, Optional[str], Optional[str]]
+
+
+class KeywordMatcher:
+    """Проверка "есть ли в тексте хотя бы одна из подстрок" одним регулярным выражением"""
+
+    def __init__(self, keywords: Iterable[str]):
+        keywords = sorted({k for k in keywords if k}, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(re.escape(k) for k in keywords)) if keywords else None
+
+    def matches(self, text: str) -> bool:
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+
+class ClassificationRules:
+    """
+    Скомпилированные правила этапов 7-9.
+
+    Каждая запись классифицируется за один проход: название приводится
+    к верхнему регистру один раз и проверяется заранее скомпилированными
+    выражениями вместо перебора списков ключевых слов.
+    """
+
+    def __init__(self, producer_names: Iterable[str] = CAT_PRODUCER_NAMES,
+                 filter_producer_keywords: Iterable[str] = CAT_PRODUCERS_KEYWORDS,
+                 translation_keywords: Iterable[str] = TRANSLATION_KEYWORDS):
+        self.producer = KeywordMatcher(k.upper() for k in producer_names)
+        self.filter_producer = KeywordMatcher(k.upper() for k in filter_producer_keywords)
+        self.translation = KeywordMatcher(translation_keywords)
+
+    def classify(self, company: Dict) -> str:
+        """Решение по записи до проверки сайта: HAS_EVIDENCE, PRODUCER, MANUAL или CHECK_SITE"""
+        if company.get('cat_evidence'):
+            return HAS_EVIDENCE
+        if self.producer.matches(company.get('name', '').upper()):
+            return PRODUCER
+        if company.get('source', '') == 'manual':
+            return MANUAL
+        return CHECK_SITE
+
+    def needs_site_check(self, company: Dict) -> bool:
+        return self.classify(company) == CHECK_SITE
+
+    def is_translation_company(self, name: str) -> bool:
+        return self.translation.matches(name.upper().lower())
+
+    def is_cat_producer(self, name: Optional[str]) -> bool:
+        """Производитель CAT-систем (для фильтрации по выручке)"""
+        return self.filter_producer.matches((name or '').upper())
+
+    def lookup_priority(self, name: Optional[str], revenue: Optional[int] = None,
+                        min_revenue: int = 100_000_000) -> int:
+        """
+        Ожидаемая ценность поиска/проверки компании (чем больше, тем раньше):
+        производитель CAT-систем - 4, переводческая компания по названию - 2,
+        известная выручка не ниже min_revenue - еще 1.
+        """
+        name = name or ''
+        priority = 0
+        if self.producer.matches(name.upper()):
+            priority += 4
+        if self.is_translation_company(name):
+            priority += 2
+        if revenue and revenue >= min_revenue:
+            priority += 1
+        return priority
+
+    def assign_evidence(self, company: Dict, site_result: Optional[SiteResult] = None) -> bool:
+        """
+        Проставляет cat_evidence (и cat_product) по правилам этапа 7.
+
+        site_result - результат проверки сайта (для записей CHECK_SITE с сайтом).
+        Returns:
+            True, если компания отбирается как компания с CAT-системой
+        """
+        decision = self.classify(company)
+        name = company.get('name')
+
+        if decision == HAS_EVIDENCE:
+            return True
+        if decision == PRODUCER:
+            company['cat_evidence'] = f"Производитель CAT-системы: {name}"
+            return True
+        if decision == MANUAL:
+            company['cat_evidence'] = f"Компания из списка производителей/партнеров CAT-систем: {company.get('name', '')}"
+            return True
+
+        if company.get('site') and site_result is not None:
+            has_cat, evidence, product = site_result
+            if has_cat:
+                company['cat_evidence'] = evidence
+                if product:
+                    company['cat_product'] = product
+                return True
+            if self.is_translation_company(company.get('name', '')):
+                company['cat_evidence'] = f"Переводческая компания (CAT-система не обнаружена на сайте, но компания из списка): {name}"
+                return True
+            return False
+
+        if self.is_translation_company(company.get('name', '')):
+            company['cat_evidence'] = f"Переводческая компания из списка: {name}"
+            return True
+        return False
+
+    def passes_filter(self, company: Dict, min_revenue: int, revenue_index=None) -> bool:
+        """
+        Критерии этапа 8: cat_evidence; для manual - больше ничего, иначе российский ИНН
+        и выручка >= min_revenue (для производителей CAT-систем выручка не обязательна).
+        Недостающая выручка берется из revenue_index, если он передан.
+        """
+        if not company.get('cat_evidence'):
+            return False
+        if company.get('source', '') == 'manual':
+            return True
+
+        inn = company.get('inn')
+        if not inn or len(str(inn)) not in [10, 12]:
+            return False
+
+        revenue = company.get('revenue')
+        if not revenue and revenue_index is not None:
+            revenue = revenue_index.latest_revenue(inn)
+            if revenue:
+                company['revenue'] = revenue
+
+        if revenue and revenue >= min_revenue:
+            return True
+        return self.is_cat_producer(company.get('name', ''))
+
+    def select(self, companies: List[Dict], min_revenue: int, revenue_index=None,
+               min_count: int = 0) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Этапы 8-9: отбор по критериям и добор до min_count компаний с cat_evidence и ИНН.
+
+        Returns:
+            (отобранные по критериям, добавленные при доборе)
+        """
+        filtered = [c for c in companies if self.passes_filter(c, min_revenue, revenue_index)]
+        if len(filtered) >= min_count:
+            return filtered, []
+
+        selected_inns = {c.get('inn') for c in filtered if c.get('inn')}
+        additional = []
+        for company in companies:
+            if len(filtered) + len(additional) >= min_count:
+                break
+            inn = company.get('inn')
+            if inn and inn not in selected_inns and company.get('cat_evidence'):
+                additional.append(company)
+        return filtered, additional
+
+
+DEFAULT_RULES = ClassificationRules()
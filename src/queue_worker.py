@@ -0,0 +1,185 @@
+"""
+Режим очереди: поиск компаний и проверка сайтов распределяются между воркерами.
+
+    python src/queue_worker.py enqueue [файл_с_названиями]   # поставить названия в очередь
+    python src/queue_worker.py work --processes 4              # запустить воркеры (на любом числе машин)
+    python src/queue_worker.py merge --enqueue-sites           # объединить результаты поиска
+    python src/queue_worker.py work                            # воркеры проверяют сайты
+    python src/queue_worker.py merge                           # итоговый CSV с результатами проверки
+
+Очередь - файл SQLite (по умолчанию data/queue.sqlite). У каждого воркера
+свой исходящий IP, поэтому лимиты вежливости сайтов складываются.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.main import (
+    REGISTRY_DB_PATH, MIN_REVENUE, create_collectors, open_revenue_index, open_cat_cache,
+    get_companies_list_from_internet, save_to_csv,
+)
+from src.collectors.fns_dump_collector import FnsDumpCollector
+from src.processors.cat_detector import CATDetector
+from src.processors.data_normalizer import normalize_company_data
+from src.processors.company_merger import merge_companies
+from src.utils.work_queue import WorkQueue, LOOKUP, SITE_CHECK
+from src.utils.proxy_pool import pool_from_env
+from src.utils.name_source import iter_names_from_file, iter_unique
+
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'queue.sqlite')
+DEFAULT_OUTPUT_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'companies.csv')
+
+
+def read_names(path: Optional[str]) -> Iterable[str]:
+    """Читает названия компаний или ИНН из файла (CSV/JSONL/текст) или берет встроенный список"""
+    if not path:
+        return get_companies_list_from_internet()
+    return iter_unique(iter_names_from_file(path))
+
+
+def lookup_company(name: str, collectors: Dict, registry=None, revenue_index=None) -> Dict:
+    """Каскадный поиск одной компании; бросает исключение, если все источники недоступны"""
+    searcher = collectors['rusprofile']
+    company = searcher.search_one_company(
+        name,
+        list_org_collector=collectors['list-org'],
+        nalog_collector=collectors['nalog.gov.ru'],
+        registry_collector=registry,
+        revenue_index=revenue_index
+    )
+    # Не найдена, потому что источники отключены circuit breaker'ом, - пусть повторит
+    # позже этот или другой воркер (с другим исходящим IP)
+    if company.get('source') == 'manual' and not any(c.is_available() for c in collectors.values()):
+        raise RuntimeError("все источники временно недоступны")
+    return company
+
+
+def run_worker(queue_path: str, worker_id: str, wait: bool = False, poll_interval: float = 5.0) -> int:
+    """
+    Обрабатывает задания очереди, пока они есть (или ждет новые при wait=True).
+
+    Returns:
+        количество обработанных заданий
+    """
+    queue = WorkQueue(queue_path)
+    collectors = create_collectors()
+    registry = FnsDumpCollector(REGISTRY_DB_PATH) if os.path.exists(REGISTRY_DB_PATH) else None
+    revenue_index = open_revenue_index()
+    detector = None
+    processed = 0
+
+    while True:
+        kind = LOOKUP
+        task = queue.lease(LOOKUP, worker_id)
+        if not task:
+            kind = SITE_CHECK
+            task = queue.lease(SITE_CHECK, worker_id)
+        if not task:
+            if not wait:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        task_id, payload = task
+        print(f"   [{worker_id}] {kind}: {payload}")
+        try:
+            if kind == LOOKUP:
+                result = lookup_company(payload, collectors, registry, revenue_index)
+            else:
+                detector = detector or CATDetector(cache=open_cat_cache(), proxy_pool=pool_from_env())
+                has_cat, evidence, product = detector.detect_cat(payload)
+                result = {'has_cat': has_cat, 'evidence': evidence, 'product': product}
+            queue.complete(task_id, worker_id, result)
+        except Exception as e:
+            print(f"   [{worker_id}] Ошибка: {e}")
+            queue.fail(task_id, worker_id, str(e))
+        processed += 1
+
+    queue.close()
+    return processed
+
+
+def merge_results(queue_path: str, output_path: str, enqueue_sites: bool = False) -> List[Dict]:
+    """Объединяет результаты воркеров через merge_companies и сохраняет CSV"""
+    queue = WorkQueue(queue_path)
+
+    companies = [normalize_company_data(company) for _, company in queue.results(LOOKUP)]
+    merged = merge_companies(companies)
+    print(f"   Результатов поиска: {len(companies)}, после объединения: {len(merged)}")
+
+    # Подставляем результаты проверки сайтов, если они уже есть
+    site_checks = dict(queue.results(SITE_CHECK))
+    for company in merged:
+        check = site_checks.get(company.get('site'))
+        if check and check['has_cat'] and not company.get('cat_evidence'):
+            company['cat_evidence'] = check['evidence']
+            if check['product']:
+                company['cat_product'] = check['product']
+
+    if enqueue_sites:
+        sites = [c['site'] for c in merged if c.get('site') and c['site'] not in site_checks]
+        added = queue.enqueue(SITE_CHECK, sites)
+        print(f"   Поставлено в очередь проверок сайтов: {added}")
+
+    queue.close()
+    save_to_csv(merged, output_path)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Распределенный сбор компаний через очередь заданий')
+    parser.add_argument('--queue', default=DEFAULT_QUEUE_PATH, help='путь к файлу очереди')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = subparsers.add_parser('enqueue', help='поставить названия компаний в очередь')
+    enqueue_parser.add_argument('names_file', nargs='?', help='файл с названиями или ИНН (CSV/JSONL/текст)')
+
+    work_parser = subparsers.add_parser('work', help='запустить воркеры')
+    work_parser.add_argument('--processes', type=int, default=1, help='число процессов-воркеров')
+    work_parser.add_argument('--wait', action='store_true', help='ждать новые задания, а не завершаться')
+
+    merge_parser = subparsers.add_parser('merge', help='объединить результаты и сохранить CSV')
+    merge_parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help='путь к CSV')
+    merge_parser.add_argument('--enqueue-sites', action='store_true',
+                              help='поставить в очередь проверку сайтов найденных компаний')
+
+    args = parser.parse_args()
+
+    if args.command == 'enqueue':
+        queue = WorkQueue(args.queue)
+        names = read_names(args.names_file)
+        revenue_index = open_revenue_index()
+        if revenue_index is not None:
+            # ИНН с выручкой ниже порога по индексу не ставим в очередь вовсе
+            names = revenue_index.prescreen(names, MIN_REVENUE)
+        added = queue.enqueue(LOOKUP, names)
+        print(f"Добавлено заданий: {added}; состояние очереди: {queue.stats()}")
+        queue.close()
+    elif args.command == 'work':
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(args.queue, f"{prefix}-{i}", args.wait))
+            for i in range(args.processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        queue = WorkQueue(args.queue)
+        print(f"Состояние очереди: {queue.stats()}")
+        queue.close()
+    elif args.command == 'merge':
+        merge_results(args.queue, args.output, enqueue_sites=args.enqueue_sites)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Прогон конвейера src/main.py на локальном симуляторе с отказами.
+
+Поднимает симулятор (src.simulator.server), выполняет этапы collect -> merge ->
+detect -> filter -> export с заданными параллельностью и повторами и печатает
+названий в час, p50/p99 времени поиска одной компании и усиление нагрузки
+из-за повторов (запросов к симулятору на один уникальный URL).
+
+Пример:
+    python -m src.simulator.harness --companies 2000 --lookup-workers 16 --rate-limit 0.02
+    python -m src.simulator.harness --slow-source rusprofile --blocked-source list-org
+    python -m src.simulator.harness --ip-rate 2 --proxies 4 --dead-proxies 1
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.simulator.server import SimulatedWorld, SimulatorServer, FaultProfile
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль q (0-100) по ближайшему рангу"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def free_port() -> int:
+    """Порт, на котором никто не слушает (адрес недоступного прокси)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_simulation(world: SimulatedWorld, server: SimulatorServer, output_dir: str,
+                   lookup_workers: int = 8, detect_workers: int = 8,
+                   time_budget: Optional[float] = None, run_deadline: Optional[float] = None,
+                   company_budget: Optional[float] = None) -> Dict:
+    """
+    Выполняет все этапы конвейера на симуляторе и возвращает метрики прогона
+    (run_deadline - срок всего прогона в секундах, как RUN_DEADLINE у src/main.py)
+    """
+    # Конвейер импортируется после настройки пауз и повторов (см. main)
+    from src import main as pipeline
+
+    # Локальный реестр и кеши настоящих запусков не используются
+    pipeline.REGISTRY_DB_PATH = os.path.join(output_dir, 'registry.sqlite')
+    pipeline.CAT_CACHE_PATH = os.path.join(output_dir, 'cat_cache.sqlite')
+    pipeline.PARSE_CACHE_PATH = os.path.join(output_dir, 'parsed_records.sqlite')
+    pipeline.SOURCE_STATS_PATH = os.path.join(output_dir, 'source_stats.sqlite')
+
+    names_path = os.path.join(output_dir, 'names.txt')
+    with open(names_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(world.names()) + '\n')
+
+    collectors = pipeline.create_collectors(base_urls=server.base_urls())
+    searcher = collectors['rusprofile']
+
+    # Время поиска каждой компании (каскад по всем источникам) и найденный ИНН
+    latencies = []
+    lookups = []
+    search_one_company = searcher.search_one_company
+
+    def timed_search(name, *args, **kwargs):
+        started = time.monotonic()
+        company = None
+        try:
+            company = search_one_company(name, *args, **kwargs)
+            return company
+        finally:
+            latencies.append(time.monotonic() - started)
+            lookups.append((name, (company or {}).get('inn')))
+
+    searcher.search_one_company = timed_search
+
+    stages = {}
+    started = time.monotonic()
+    deadline = collect_deadline = None
+    if run_deadline:
+        deadline = started + run_deadline
+        collect_deadline = started + run_deadline * pipeline.COLLECT_SHARE
+    companies = pipeline.run_collect(collectors, input_path=names_path,
+                                     max_workers=lookup_workers, time_budget=time_budget,
+                                     company_budget=company_budget, deadline=collect_deadline)
+    stages['collect'] = time.monotonic() - started
+
+    stage_started = time.monotonic()
+    merged = pipeline.run_merge(companies)
+    companies_with_cat = pipeline.run_detect(merged, collectors, max_workers=detect_workers,
+                                             deadline=deadline)
+    stages['detect'] = time.monotonic() - stage_started
+
+    stage_started = time.monotonic()
+    filtered = pipeline.run_filter(companies_with_cat)
+    pipeline.run_export(filtered, os.path.join(output_dir, 'companies.csv'))
+    stages['filter'] = time.monotonic() - stage_started
+    elapsed = time.monotonic() - started
+
+    # Найдено верно - ИНН именно той компании, которую искали (а не похожей по названию)
+    found = [(name, inn) for name, inn in lookups if inn]
+    correct = sum(1 for name, inn in found if world.by_name[name.lower()].inn == inn)
+    return {
+        'names': len(latencies),
+        'found': len(found),
+        'correct': correct,
+        'with_cat': len(companies_with_cat),
+        'selected': len(filtered),
+        'elapsed': elapsed,
+        'stages': stages,
+        'latencies': latencies,
+        'server': server.stats(),
+        'parse_cache': (searcher.parse_cache.hits, searcher.parse_cache.misses) if searcher.parse_cache else None,
+        'proxies': searcher.proxy_pool.stats() if searcher.proxy_pool else None,
+    }
+
+
+def print_report(metrics: Dict):
+    """Печатает метрики прогона"""
+    server = metrics['server']
+    elapsed = metrics['elapsed']
+    latencies = metrics['latencies']
+    collect_time = metrics['stages']['collect']
+
+    print("\n=== Прогон на симуляторе ===")
+    print(f"Названий: {metrics['names']}, найдено ИНН: {metrics['found']} (верно: {metrics['correct']}), "
+          f"с CAT-системой: {metrics['with_cat']}, отобрано: {metrics['selected']}")
+    print("Этапы: " + ", ".join(f"{stage} {seconds:.1f} с" for stage, seconds in metrics['stages'].items())
+          + f", всего {elapsed:.1f} с")
+    if collect_time > 0:
+        print(f"Поиск: {metrics['names'] / collect_time * 3600:,.0f} названий/час, "
+              f"весь конвейер: {metrics['names'] / elapsed * 3600:,.0f} названий/час")
+    print(f"Время поиска одной компании: p50 {percentile(latencies, 50):.2f} с, "
+          f"p99 {percentile(latencies, 99):.2f} с")
+
+    if metrics['parse_cache']:
+        hits, misses = metrics['parse_cache']
+        print(f"Кеш разобранных страниц: {hits} из {hits + misses} страниц без повторного разбора")
+
+    total, distinct = server['total_requests'], server['distinct_urls']
+    amplification = total / distinct if distinct else 0.0
+    print(f"Запросов к симулятору: {total} на {distinct} уникальных URL "
+          f"(усиление из-за ошибок: {amplification:.2f}x)")
+    for role, count in sorted(server['requests'].items()):
+        faults = {fault: n for (fault_role, fault), n in server['faults'].items() if fault_role == role}
+        details = ", ".join(f"{fault}: {n}" for fault, n in sorted(faults.items()))
+        print(f"   {role}: {count} запросов" + (f" (отказы - {details})" if details else ""))
+    print("Запросов по исходящим адресам: "
+          + ", ".join(f"{egress}: {n}" for egress, n in sorted(server['egress'].items())))
+
+    if metrics['proxies']:
+        print("Пул прокси:")
+        for url, counts in metrics['proxies'].items():
+            print(f"   {url}: запросов {counts['requests']}, отказов {counts['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Прогон конвейера на локальном симуляторе с отказами')
+    parser.add_argument('--companies', type=int, default=1000, help='число синтетических компаний')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--port', type=int, default=0, help='порт симулятора (0 - любой свободный)')
+    parser.add_argument('--lookup-workers', type=int, default=8, help='параллельный поиск компаний')
+    parser.add_argument('--detect-workers', type=int, default=8, help='параллельная проверка сайтов')
+    parser.add_argument('--time-budget', type=float, help='время на поиск, с')
+    parser.add_argument('--run-deadline', type=float, help='срок всего прогона, с (RUN_DEADLINE)')
+    parser.add_argument('--company-budget', type=float, help='время на поиск одной компании, с')
+    parser.add_argument('--max-retries', type=int, help='число повторов запроса (HTTP_MAX_RETRIES)')
+    parser.add_argument('--delay-scale', type=float, default=0.0,
+                        help='множитель пауз вежливости и задержек перед повтором (REQUEST_DELAY_SCALE)')
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка ответа источников, с')
+    parser.add_argument('--jitter', type=float, default=0.05, help='случайная добавка к задержке, с')
+    parser.add_argument('--rate-limit', type=float, default=0.02, help='доля ответов 429 у источников')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After в ответах 429, с')
+    parser.add_argument('--server-error', type=float, default=0.02, help='доля ответов 503 у источников')
+    parser.add_argument('--slow-source', action='append', default=[],
+                        help='источник, который отвечает с задержкой --slow-source-latency (можно несколько)')
+    parser.add_argument('--slow-source-latency', type=float, default=1.0, help='задержка медленного источника, с')
+    parser.add_argument('--blocked-source', action='append', default=[],
+                        help='источник, который на все запросы отвечает 503 (можно несколько)')
+    parser.add_argument('--ip-rate', type=float, default=0.0,
+                        help='ограничение источников: запросов в секунду с одного адреса (0 - нет)')
+    parser.add_argument('--proxies', type=int, default=0,
+                        help='число прокси-заглушек (EGRESS_PROXIES); 0 - запросы напрямую')
+    parser.add_argument('--dead-proxies', type=int, default=0, help='сколько из прокси недоступны')
+    parser.add_argument('--proxy-rate', type=float,
+                        help='бюджет прокси, запросов в секунду на хост (PROXY_RATE; по умолчанию --ip-rate)')
+    parser.add_argument('--site-latency', type=float, default=0.1, help='задержка ответа сайтов, с')
+    parser.add_argument('--site-error', type=float, default=0.02, help='доля ответов 503 у сайтов')
+    parser.add_argument('--slow', type=float, default=0.005, help='доля медленных ответов сайтов')
+    parser.add_argument('--drip-seconds', type=float, default=30.0, help='длительность медленного ответа, с')
+    parser.add_argument('--oversized', type=float, default=0.005, help='доля слишком больших страниц сайтов')
+    parser.add_argument('--output-dir', help='каталог для результатов (по умолчанию - временный)')
+    args = parser.parse_args()
+
+    # Паузы и повторы задаются до импорта конвейера
+    os.environ['REQUEST_DELAY_SCALE'] = str(args.delay_scale)
+    if args.max_retries is not None:
+        os.environ['HTTP_MAX_RETRIES'] = str(args.max_retries)
+
+    world = SimulatedWorld(args.companies, seed=args.seed)
+    source_faults = FaultProfile(latency=args.latency, jitter=args.jitter,
+                                 rate_limit=args.rate_limit, retry_after=args.retry_after,
+                                 server_error=args.server_error, ip_rate=args.ip_rate)
+    per_source_faults = {}
+    for source in args.slow_source:
+        per_source_faults[source] = FaultProfile(latency=args.slow_source_latency, jitter=args.jitter,
+                                                 rate_limit=args.rate_limit, retry_after=args.retry_after,
+                                                 server_error=args.server_error, ip_rate=args.ip_rate)
+    for source in args.blocked_source:
+        per_source_faults[source] = FaultProfile(latency=args.latency, server_error=1.0)
+    site_faults = FaultProfile(latency=args.site_latency, jitter=args.jitter,
+                               server_error=args.site_error, slow=args.slow,
+                               drip_seconds=args.drip_seconds, oversized=args.oversized)
+    server = SimulatorServer(world, source_faults, site_faults, port=args.port, seed=args.seed,
+                             per_source_faults=per_source_faults).start()
+
+    # Прокси задаются до первого создания коллекторов (общий пул процесса - pool_from_env)
+    if args.proxies:
+        proxies = server.proxy_urls(args.proxies - args.dead_proxies)
+        for _ in range(args.dead_proxies):
+            proxies.append(f'http://127.2.1.{len(proxies) + 1}:{free_port()}')
+        os.environ['EGRESS_PROXIES'] = ','.join(proxies)
+        if args.proxy_rate or args.ip_rate:
+            os.environ['PROXY_RATE'] = str(args.proxy_rate or args.ip_rate)
+
+    try:
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            metrics = run_simulation(world, server, args.output_dir, args.lookup_workers,
+                                     args.detect_workers, args.time_budget,
+                                     args.run_deadline, args.company_budget)
+        else:
+            with tempfile.TemporaryDirectory() as output_dir:
+                metrics = run_simulation(world, server, output_dir, args.lookup_workers,
+                                         args.detect_workers, args.time_budget,
+                                         args.run_deadline, args.company_budget)
+    finally:
+        server.stop()
+
+    print_report(metrics)
+
+
+if __name__ == '__main__':
+    main()
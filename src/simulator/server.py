@@ -0,0 +1,529 @@
+"""
+Локальный симулятор источников: rusprofile, list-org, bo.nalog.gov.ru и тысячи сайтов компаний.
+
+Один HTTP-сервер отвечает за все роли и различает их по адресу из заголовка Host:
+у каждого источника свой адрес 127.0.0.x, у каждого сайта - свой 127.1.x.y
+(на Linux весь диапазон 127.0.0.0/8 указывает на локальную машину). Поэтому
+circuit breaker'ы, кеш результатов по доменам и ограничения на хост работают
+так же, как с настоящими сайтами.
+
+Запуск отдельно (для python src/main.py с SOURCE_BASE_URLS):
+    python -m src.simulator.server --companies 2000 --port 8800 --names-out names.txt
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+
+# Адреса источников; сайты компаний - 127.1.x.y
+SOURCE_HOSTS = {
+    'rusprofile': '127.0.0.2',
+    'list-org': '127.0.0.3',
+    'nalog.gov.ru': '127.0.0.4',
+}
+SITE_ROLE = 'site'
+# Адреса прокси-заглушек: 127.2.0.x на порту симулятора
+PROXY_PREFIX = '127.2.'
+
+# Доля компаний, которые находятся поиском на каждом из источников
+DEFAULT_COVERAGE = {
+    'rusprofile': 0.7,
+    'list-org': 0.6,
+    'nalog.gov.ru': 0.9,
+}
+
+# Слова для названий: 20 * 15 * 10 = 3000 сочетаний, дальше добавляется номер
+NAME_PREFIXES = [
+    'Альфа', 'Бета', 'Гамма', 'Дельта', 'Омега', 'Вектор', 'Спектр', 'Орион', 'Сигма', 'Квант',
+    'Север', 'Восток', 'Меридиан', 'Горизонт', 'Импульс', 'Полюс', 'Атлант', 'Зенит', 'Форум', 'Линия',
+]
+NAME_CORES = [
+    'Перевод', 'Лингва', 'Локализация', 'Текст', 'Консалт', 'Софт', 'Трейд', 'Сервис',
+    'Систем', 'Медиа', 'Технологии', 'Групп', 'Инжиниринг', 'Логистик', 'Диджитал',
+]
+NAME_SUFFIXES = ['Москва', 'Нева', 'Урал', 'Сибирь', 'Волга', 'Дон', 'Кама', 'Плюс', 'Про', 'Центр']
+
+OKVED_CODES = ['74.30.00', '62.01.00', '58.29.00', '73.11.00', '70.22.00', '46.90.00']
+CAT_PRODUCTS = ['SDL Trados', 'memoQ', 'Smartcat', 'Memsource', 'Crowdin', 'XTM']
+
+# Доля компаний с сайтом и доля сайтов с упоминанием CAT-системы
+SITE_SHARE = 0.8
+CAT_SHARE = 0.3
+
+# JSON API bo.nalog.gov.ru (поиск организаций и бухгалтерская отчетность) и годы отчетности
+NALOG_SEARCH_API = '/advanced-search/organizations/search'
+NALOG_BFO_RE = re.compile(r'^/nbo/organizations/(\d+)/bfo/$')
+BFO_YEARS = (2021, 2022, 2023)
+
+FILLER = ('Юридический адрес, руководитель, учредители, финансовая отчетность, '
+          'связанные организации и история изменений доступны в карточке компании. ')
+
+
+class SimulatedCompany:
+    """Синтетическая компания: реквизиты, сайт и источники, на которых она находится"""
+
+    def __init__(self, index: int, rng: random.Random, coverage: Dict[str, float]):
+        self.index = index
+        self.name = company_name(index)
+        self.inn = str(7700000000 + index)
+        self.list_org_id = 100000 + index
+        self.nalog_id = 200000 + index
+        self.revenue = rng.randint(10, 2000) * 1_000_000
+        self.employees = rng.randint(5, 500)
+        self.okved = rng.choice(OKVED_CODES)
+        self.has_site = rng.random() < SITE_SHARE
+        self.cat_product = rng.choice(CAT_PRODUCTS) if rng.random() < CAT_SHARE else None
+        self.sources = {source for source, share in coverage.items() if rng.random() < share}
+
+    @property
+    def full_name(self) -> str:
+        return f'ООО "{self.name}"'
+
+    @property
+    def site_host(self) -> str:
+        return f'127.1.{self.index // 250}.{self.index % 250 + 1}'
+
+    def revenue_by_year(self) -> Dict[int, int]:
+        """Выручка по годам отчетности: за последний год - revenue, раньше - немного меньше"""
+        years = sorted(BFO_YEARS, reverse=True)
+        growth = 100 + self.index % 15
+        return {year: self.revenue * 100 ** i // growth ** i for i, year in enumerate(years)}
+
+
+def company_name(index: int) -> str:
+    """Название компании по номеру (без организационно-правовой формы)"""
+    combinations = len(NAME_PREFIXES) * len(NAME_CORES) * len(NAME_SUFFIXES)
+    base, number = index % combinations, index // combinations
+    suffix = NAME_SUFFIXES[base % len(NAME_SUFFIXES)]
+    base //= len(NAME_SUFFIXES)
+    core = NAME_CORES[base % len(NAME_CORES)]
+    prefix = NAME_PREFIXES[base // len(NAME_CORES)]
+    name = f'{prefix} {core} {suffix}'
+    return f'{name} {number + 1}' if number else name
+
+
+def site_index(host: str) -> Optional[int]:
+    """Номер компании по адресу ее сайта 127.1.x.y"""
+    parts = host.split('.')
+    if len(parts) != 4 or parts[:2] != ['127', '1'] or not all(p.isdigit() for p in parts[2:]):
+        return None
+    return int(parts[2]) * 250 + int(parts[3]) - 1
+
+
+class SimulatedWorld:
+    """Набор синтетических компаний (детерминированный для заданного seed)"""
+
+    def __init__(self, companies: int = 1000, seed: int = 1,
+                 coverage: Optional[Dict[str, float]] = None):
+        # Сайты занимают 127.1.0.1 - 127.1.255.250
+        if companies > 256 * 250:
+            raise ValueError('Симулятор поддерживает не больше 64000 компаний')
+        rng = random.Random(seed)
+        coverage = DEFAULT_COVERAGE if coverage is None else coverage
+        self.companies = [SimulatedCompany(i, rng, coverage) for i in range(companies)]
+        self.by_name = {c.name.lower(): c for c in self.companies}
+        self.by_inn = {c.inn: c for c in self.companies}
+        self.by_list_org_id = {c.list_org_id: c for c in self.companies}
+        self.by_nalog_id = {c.nalog_id: c for c in self.companies}
+
+    def names(self) -> List[str]:
+        return [c.name for c in self.companies]
+
+    def search(self, source: str, query: str) -> List[SimulatedCompany]:
+        """Результаты поиска: сама компания (если источник ее знает) и похожие названия"""
+        company = self.by_name.get(query.strip().lower())
+        if company is None:
+            return []
+        # Соседние номера отличаются только последним словом - как однофамильцы в выдаче
+        similar = [self.companies[i] for i in (company.index - 1, company.index + 1)
+                   if 0 <= i < len(self.companies) and self.companies[i].index // len(NAME_SUFFIXES)
+                   == company.index // len(NAME_SUFFIXES)]
+        results = [c for c in similar if source in c.sources]
+        if source in company.sources:
+            results.insert(len(results) // 2, company)
+        return results
+
+
+class FaultProfile:
+    """
+    Задержки и отказы одной роли (источника или сайтов).
+
+    latency/jitter - задержка ответа (секунды, jitter - случайная добавка),
+    rate_limit и server_error - доли ответов 429 (с Retry-After) и 503,
+    slow - доля ответов, которые отдаются по 1 КБ в течение drip_seconds,
+    oversized - доля ответов размером oversized_bytes,
+    ip_rate - ограничение запросов в секунду с одного исходящего адреса
+    (сверх него - 429 с Retry-After; 0 - без ограничения).
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0,
+                 rate_limit: float = 0.0, retry_after: float = 1.0,
+                 server_error: float = 0.0, slow: float = 0.0, drip_seconds: float = 60.0,
+                 oversized: float = 0.0, oversized_bytes: int = 8 * 1024 * 1024,
+                 ip_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.server_error = server_error
+        self.slow = slow
+        self.drip_seconds = drip_seconds
+        self.oversized = oversized
+        self.oversized_bytes = oversized_bytes
+        self.ip_rate = ip_rate
+
+    def pick_fault(self, rng: random.Random) -> Optional[str]:
+        """Отказ для очередного запроса: '429', '503', 'slow', 'oversized' или None"""
+        roll = rng.random()
+        for fault, share in (('429', self.rate_limit), ('503', self.server_error),
+                             ('slow', self.slow), ('oversized', self.oversized)):
+            if roll < share:
+                return fault
+            roll -= share
+        return None
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов: роль определяется по Host, затем - по пути"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        simulator = self.server.simulator
+        host = (self.headers.get('Host') or '').split(':')[0]
+        role = simulator.role_for_host(host)
+        if role is None:
+            self.send_page(404, '<h1>Неизвестный хост</h1>')
+            return
+
+        # Запрос через прокси-заглушку: абсолютный URL в строке запроса, соединение - на адрес 127.2.x.x
+        path = self.path
+        if path.startswith('http://'):
+            parsed = urlparse(path)
+            path = parsed.path + (f'?{parsed.query}' if parsed.query else '')
+        local_address = self.connection.getsockname()[0]
+        egress = local_address if local_address.startswith(PROXY_PREFIX) else self.client_address[0]
+
+        fault = simulator.record_request(role, host, path, egress)
+        profile = simulator.profile_for(role)
+        delay = profile.latency + (simulator.rng_uniform(0, profile.jitter) if profile.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+        try:
+            if fault == '429':
+                self.send_page(429, '<h1>Слишком много запросов</h1>',
+                               {'Retry-After': f'{profile.retry_after:g}'})
+            elif fault == '503':
+                self.send_page(503, '<h1>Сервис временно недоступен</h1>')
+            elif fault == 'slow':
+                self.send_stream(profile.drip_seconds, None)
+            elif fault == 'oversized':
+                self.send_stream(None, profile.oversized_bytes)
+            else:
+                status, body = simulator.render(role, host, path)
+                if isinstance(body, str):
+                    self.send_page(status, body)
+                else:
+                    self.send_json(status, body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент оборвал загрузку (слишком большой или медленный ответ)
+            self.close_connection = True
+
+    def send_page(self, status: int, body: str, headers: Optional[Dict[str, str]] = None):
+        data = f'<html><head><meta charset="utf-8"></head><body>{body}</body></html>'.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, status: int, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, drip_seconds: Optional[float], size: Optional[int]):
+        """Тело без Content-Length до закрытия соединения: медленно по 1 КБ или size байт сразу"""
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        if drip_seconds is not None:
+            stop_at = time.monotonic() + drip_seconds
+            while time.monotonic() < stop_at:
+                self.wfile.write(b'<p>' + b'.' * 1017 + b'</p>')
+                self.wfile.flush()
+                time.sleep(0.5)
+        else:
+            chunk = (b'<p>' + b'x' * 1017 + b'</p>') * 64
+            for _ in range(size // len(chunk) + 1):
+                self.wfile.write(chunk)
+
+
+class SimulatorHTTPServer(ThreadingHTTPServer):
+    """Многопоточный сервер с длинной очередью соединений (сотни одновременных клиентов)"""
+
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class SimulatorServer:
+    """
+    HTTP-сервер симулятора со счетчиками запросов.
+
+    Запросы считаются по ролям и по URL (host + путь), отказы - по видам:
+    отношение числа запросов к числу разных URL показывает, во сколько раз
+    повторы и ошибки увеличивают нагрузку на источники.
+    """
+
+    def __init__(self, world: SimulatedWorld, source_faults: Optional[FaultProfile] = None,
+                 site_faults: Optional[FaultProfile] = None, port: int = 0, seed: int = 1,
+                 per_source_faults: Optional[Dict[str, FaultProfile]] = None):
+        self.world = world
+        self.source_faults = source_faults or FaultProfile()
+        self.site_faults = site_faults or FaultProfile()
+        # Отдельные профили отказов для некоторых источников (медленный, заблокированный)
+        self.per_source_faults = per_source_faults or {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.faults = Counter()
+        self.urls = set()
+        self.egress = Counter()
+        # Ведра токенов ограничения ip_rate: (исходящий адрес, роль) -> (токены, время)
+        self._ip_tokens: Dict = {}
+        self.source_by_host = {host: source for source, host in SOURCE_HOSTS.items()}
+
+        self.httpd = SimulatorHTTPServer(('', port), SimulatorHandler)
+        self.httpd.simulator = self
+        self.port = self.httpd.server_address[1]
+        self._thread = None
+
+    def start(self) -> 'SimulatorServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def base_urls(self) -> Dict[str, str]:
+        """Адреса источников для create_collectors / SOURCE_BASE_URLS"""
+        return {source: f'http://{host}:{self.port}' for source, host in SOURCE_HOSTS.items()}
+
+    def role_for_host(self, host: str) -> Optional[str]:
+        if host in self.source_by_host:
+            return self.source_by_host[host]
+        index = site_index(host)
+        if index is not None and index < len(self.world.companies):
+            return SITE_ROLE
+        return None
+
+    def profile_for(self, role: str) -> FaultProfile:
+        if role == SITE_ROLE:
+            return self.site_faults
+        return self.per_source_faults.get(role, self.source_faults)
+
+    def rng_uniform(self, low: float, high: float) -> float:
+        with self._lock:
+            return self._rng.uniform(low, high)
+
+    def proxy_urls(self, count: int) -> List[str]:
+        """Адреса прокси-заглушек для EGRESS_PROXIES: запросы через них симулятор видит с адреса прокси"""
+        return [f'http://{PROXY_PREFIX}0.{i + 1}:{self.port}' for i in range(count)]
+
+    def _over_ip_rate(self, profile: FaultProfile, egress: str, role: str) -> bool:
+        if not profile.ip_rate:
+            return False
+        now = time.monotonic()
+        burst = max(1.0, profile.ip_rate)
+        tokens, updated = self._ip_tokens.get((egress, role), (burst, now))
+        tokens = min(burst, tokens + (now - updated) * profile.ip_rate)
+        if tokens < 1:
+            self._ip_tokens[(egress, role)] = (tokens, now)
+            return True
+        self._ip_tokens[(egress, role)] = (tokens - 1, now)
+        return False
+
+    def record_request(self, role: str, host: str, path: str, egress: str = '127.0.0.1') -> Optional[str]:
+        """Учитывает запрос и выбирает для него отказ (в том числе 429 сверх ip_rate с адреса egress)"""
+        with self._lock:
+            profile = self.profile_for(role)
+            fault = '429' if self._over_ip_rate(profile, egress, role) else profile.pick_fault(self._rng)
+            self.requests[role] += 1
+            self.egress[egress] += 1
+            self.urls.add(host + path)
+            if fault:
+                self.faults[(role, fault)] += 1
+            return fault
+
+    def render(self, role: str, host: str, path: str):
+        """(HTTP-код, HTML) для страницы роли; для JSON API - (HTTP-код, данные)"""
+        parsed = urlparse(path)
+        if role == SITE_ROLE:
+            return 200, render_site(self.world.companies[site_index(host)])
+        if role == 'nalog.gov.ru' and parsed.path == NALOG_SEARCH_API:
+            params = parse_qs(parsed.query)
+            query = params.get('query', [''])[0]
+            page = int(params.get('page', ['0'])[0] or 0)
+            company = self.world.by_inn.get(query.strip())
+            results = [company] if company else self.world.search(role, query)
+            results = [c for c in results if role in c.sources] if page == 0 else []
+            return 200, render_search_json(results)
+        bfo_match = NALOG_BFO_RE.match(parsed.path)
+        if role == 'nalog.gov.ru' and bfo_match:
+            company = self.world.by_nalog_id.get(int(bfo_match.group(1)))
+            if company is None or role not in company.sources:
+                return 404, {'message': 'Организация не найдена'}
+            return 200, render_bfo_json(company)
+        if parsed.path == '/search':
+            query = parse_qs(parsed.query).get('query', [''])[0]
+            return 200, render_search(role, self.world.search(role, query))
+
+        company = None
+        parts = parsed.path.strip('/').split('/')
+        if len(parts) == 2 and parts[1].isdigit():
+            if role == 'list-org' and parts[0] == 'company':
+                company = self.world.by_list_org_id.get(int(parts[1]))
+            elif role != 'list-org' and parts[0] == 'inn':
+                company = self.world.by_inn.get(parts[1])
+        if company is None or role not in company.sources:
+            return 404, '<h1>Страница не найдена</h1>'
+        return 200, render_company(role, company, self.port)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': dict(self.requests),
+                'faults': dict(self.faults),
+                'egress': dict(self.egress),
+                'total_requests': sum(self.requests.values()),
+                'distinct_urls': len(self.urls),
+            }
+
+
+def company_path(role: str, company: SimulatedCompany) -> str:
+    if role == 'list-org':
+        return f'/company/{company.list_org_id}'
+    return f'/inn/{company.inn}'
+
+
+def render_search(role: str, results: List[SimulatedCompany]) -> str:
+    """Страница результатов поиска в разметке, которую разбирают коллекторы"""
+    items = []
+    for company in results:
+        items.append(
+            f'<div class="company-item"><a href="{company_path(role, company)}">{company.full_name}</a>'
+            f'<div>ИНН {company.inn}, ОКВЭД {company.okved}</div><div>{FILLER * 3}</div></div>'
+        )
+    body = ''.join(items) if items else '<p>Ничего не найдено</p>'
+    return f'<h2>Результаты поиска</h2>{body}'
+
+
+def render_search_json(results: List[SimulatedCompany]) -> Dict:
+    """Ответ API поиска организаций bo.nalog.gov.ru (поля - как в ответах сайта)"""
+    content = [{
+        'id': company.nalog_id,
+        'inn': company.inn,
+        'ogrn': str(1027700000000 + company.index),
+        'shortName': company.full_name,
+        'fullName': f'ОБЩЕСТВО С ОГРАНИЧЕННОЙ ОТВЕТСТВЕННОСТЬЮ "{company.name.upper()}"',
+        'okved2': {'id': company.okved[:5], 'name': 'Деятельность по письменному и устному переводу'},
+        'region': 'г. Москва',
+    } for company in results]
+    return {'content': content, 'totalElements': len(content), 'totalPages': 1 if content else 0}
+
+
+def render_bfo_json(company: SimulatedCompany) -> List[Dict]:
+    """Ответ API отчетности: по отчету на год, строка 2110 - в тысячах рублей"""
+    by_year = company.revenue_by_year()
+    reports = []
+    for year in sorted(by_year):
+        result = {'current2110': by_year[year] // 1000}
+        if year - 1 in by_year:
+            result['previous2110'] = by_year[year - 1] // 1000
+        reports.append({
+            'id': company.nalog_id * 10 + year % 10,
+            'period': str(year),
+            'typeCorrections': [{'correction': {'financialResult': result}}],
+        })
+    return reports
+
+
+def render_company(role: str, company: SimulatedCompany, port: int) -> str:
+    """Детальная страница компании: ссылка на сайт - единственная абсолютная ссылка"""
+    site = ''
+    if company.has_site:
+        url = f'http://{company.site_host}:{port}/'
+        site = f'<p>Сайт: <a href="{url}">{url}</a></p>'
+    return (
+        f'<h1>{company.full_name}</h1>'
+        f'<p>ИНН: {company.inn}</p>'
+        f'<p>ОКВЭД: {company.okved}</p>'
+        f'<p>Выручка: {company.revenue} руб.</p>'
+        f'<p>{company.employees} сотрудников</p>'
+        f'{site}<p>{FILLER}</p>'
+    )
+
+
+def render_site(company: SimulatedCompany) -> str:
+    """Главная страница сайта компании; у части компаний - упоминание CAT-системы"""
+    cat = ''
+    if company.cat_product:
+        cat = f'<h2>Технологии</h2><p>В работе используем {company.cat_product} и базы памяти переводов.</p>'
+    return (
+        f'<h1>{company.full_name}</h1>'
+        f'<h2>О компании</h2><p>Работаем с {2000 + company.index % 20} года, '
+        f'в штате {company.employees} человек.</p>{cat}'
+        f'<h2>Контакты</h2><p>Москва, ул. Примерная, д. {company.index % 100 + 1}</p>'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Локальный симулятор источников и сайтов компаний')
+    parser.add_argument('--companies', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка ответа источников, с')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='доля ответов 429')
+    parser.add_argument('--server-error', type=float, default=0.0, help='доля ответов 503')
+    parser.add_argument('--names-out', help='записать названия компаний в файл')
+    args = parser.parse_args()
+
+    world = SimulatedWorld(args.companies, seed=args.seed)
+    faults = FaultProfile(latency=args.latency, rate_limit=args.rate_limit,
+                          server_error=args.server_error)
+    server = SimulatorServer(world, faults, port=args.port, seed=args.seed)
+    if args.names_out:
+        with open(args.names_out, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(world.names()) + '\n')
+    urls = ','.join(f'{source}={url}' for source, url in server.base_urls().items())
+    print(f'Симулятор запущен: SOURCE_BASE_URLS="{urls}"')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
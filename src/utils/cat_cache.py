@@ -0,0 +1,94 @@
+"""Кеш результатов проверки сайтов на CAT-системы по регистрируемому домену"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+# Срок годности результата проверки по умолчанию (секунды)
+DEFAULT_TTL = 30 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cat_results (
+    domain TEXT PRIMARY KEY,
+    has_cat INTEGER NOT NULL,
+    evidence TEXT,
+    product TEXT,
+    checked REAL NOT NULL
+);
+"""
+
+CatResult = Tuple[bool, Optional[str], Optional[str]]
+
+
+class CatResultCache:
+    """
+    Результаты detect_cat (has_cat, evidence, product) по регистрируемому домену.
+
+    Результаты хранятся в памяти и, если задан path, в файле SQLite, поэтому
+    повторная проверка домена бесплатна и в следующих запусках - пока
+    результат не старше ttl секунд.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._memory: Dict[str, Tuple[float, CatResult]] = {}
+        self._lock = threading.Lock()
+        self.conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Кеш могут одновременно дополнять несколько воркеров очереди
+            self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        # Под блокировкой: после срока запуска проверки могут еще завершаться в фоне
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, domain: str) -> Optional[CatResult]:
+        """Результат проверки домена или None, если его нет или он устарел"""
+        oldest = time.time() - self.ttl
+        with self._lock:
+            item = self._memory.get(domain)
+            if item is None and self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT checked, has_cat, evidence, product FROM cat_results WHERE domain = ?",
+                    (domain,)
+                ).fetchone()
+                if row:
+                    item = (row[0], (bool(row[1]), row[2], row[3]))
+                    self._memory[domain] = item
+            if item is None or item[0] < oldest:
+                return None
+            return item[1]
+
+    def put(self, domain: str, result: CatResult):
+        """Запоминает результат проверки домена"""
+        checked = time.time()
+        has_cat, evidence, product = result
+        with self._lock:
+            self._memory[domain] = (checked, (bool(has_cat), evidence, product))
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cat_results (domain, has_cat, evidence, product, checked) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (domain, int(bool(has_cat)), evidence, product, checked)
+                )
+                self.conn.commit()
+
+    def __len__(self) -> int:
+        return len(self._memory)
@@ -1,11 +1,34 @@
 """Вспомогательные функции для работы с данными"""
+import os
+import random
 import re
 import time
-from typing import Optional
-from fake_useragent import UserAgent
+from typing import Optional, TYPE_CHECKING
+from urllib.parse import urlparse
 
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
-ua = UserAgent()
+
+# Небольшой набор актуальных User-Agent настольных браузеров: загрузка базы
+# fake_useragent при импорте заметно замедляла запуск и могла зависать без сети
+USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/123.0.0.0 Safari/537.36 Edg/123.0.0.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'Version/17.4 Safari/605.1.15',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14.4; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/124.0.0.0 YaBrowser/24.4.0.0 Safari/537.36',
+)
 
 
 def normalize_revenue(revenue_str: Optional[str]) -> Optional[int]:
@@ -29,6 +52,34 @@ def normalize_revenue(revenue_str: Optional[str]) -> Optional[int]:
         return None
 
 
+# Множители для сумм вида "1,2 млрд ₽" в кратких карточках компаний
+REVENUE_MULTIPLIERS = {
+    'тыс': 1_000,
+    'млн': 1_000_000,
+    'млрд': 1_000_000_000,
+    'трлн': 1_000_000_000_000,
+}
+
+
+def parse_revenue_text(text: Optional[str]) -> Optional[int]:
+    """Извлекает выручку из текста вида "Выручка: 1,2 млрд ₽" или "Выручка 150 000 000 руб." """
+    if not text:
+        return None
+    
+    match = re.search(r'выручка\D{0,20}?(\d[\d\s\xa0]*(?:[.,]\d+)?)\s*(тыс|млн|млрд|трлн)?',
+                      str(text), re.IGNORECASE)
+    if not match:
+        return None
+    
+    number = re.sub(r'[\s\xa0]', '', match.group(1)).replace(',', '.')
+    multiplier = REVENUE_MULTIPLIERS.get((match.group(2) or '').lower(), 1)
+    try:
+        revenue = int(float(number) * multiplier)
+    except ValueError:
+        return None
+    return revenue if revenue >= 0 else None
+
+
 def normalize_inn(inn_str: Optional[str]) -> Optional[str]:
     """Нормализует ИНН (удаляет пробелы, приводит к строке)"""
     if not inn_str:
@@ -67,19 +118,92 @@ def normalize_url(url: Optional[str]) -> Optional[str]:
     return url
 
 
+# Публичные суффиксы второго уровня: домен компании в них на уровень глубже
+# (company.msk.ru, user.narod.ru - разные владельцы)
+MULTI_LABEL_SUFFIXES = {
+    'com.ru', 'net.ru', 'org.ru', 'pp.ru', 'msk.ru', 'spb.ru', 'msk.su',
+    'narod.ru', 'ucoz.ru', 'ucoz.net', 'tilda.ws', 'github.io', 'blogspot.com',
+    'com.ua', 'org.ua', 'co.uk', 'org.uk', 'com.by', 'com.kz',
+}
+
+
+def registrable_domain(url: Optional[str]) -> Optional[str]:
+    """Регистрируемый домен сайта: https://www.shop.example.ru/a -> example.ru"""
+    if not url:
+        return None
+    
+    url = str(url).strip().lower()
+    host = urlparse(url if '://' in url else 'http://' + url).hostname
+    if not host:
+        return None
+    
+    labels = host.rstrip('.').split('.')
+    if labels[0] == 'www':
+        labels = labels[1:]
+    if len(labels) <= 2 or re.fullmatch(r'[\d.]+', host):
+        return '.'.join(labels)
+    
+    depth = 3 if '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 2
+    return '.'.join(labels[-depth:])
+
+
+def decode_html(content: bytes) -> str:
+    """Декодирует HTML без полного разбора: UTF-8, иначе windows-1251 (часто у российских сайтов)"""
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return content.decode('cp1251', errors='replace')
+
+
+_json_loads = None
+
+
+def load_json(content: bytes):
+    """Разбирает JSON-ответ: orjson, если установлен (заметно быстрее), иначе стандартный json"""
+    global _json_loads
+    if _json_loads is None:
+        try:
+            import orjson
+            _json_loads = orjson.loads
+        except ImportError:
+            import json
+            _json_loads = json.loads
+    return _json_loads(content)
+
+
 def get_headers() -> dict:
-    """Возвращает заголовки для HTTP-запросов"""
+    """
+    Возвращает заголовки для HTTP-запросов.
+
+    Accept-Encoding здесь нет: его задает create_session по сжатиям,
+    которые умеет распаковывать http_client (available_encodings).
+    """
     return {
-        'User-Agent': ua.random,
+        'User-Agent': random.choice(USER_AGENTS),
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
         'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-        'Accept-Encoding': 'gzip, deflate',
         'Connection': 'keep-alive',
     }
 
 
+def make_soup(content) -> 'BeautifulSoup':
+    """Разбирает HTML через BeautifulSoup + lxml (bs4 импортируется при первом разборе)"""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(content, 'lxml')
+
+
+# Множитель пауз между запросами и перед повторами (REQUEST_DELAY_SCALE): 0 - без пауз,
+# например при прогоне на локальном симуляторе (src/simulator)
+DELAY_SCALE = float(os.environ.get('REQUEST_DELAY_SCALE') or 1.0)
+
+
+def sleep_scaled(seconds: float):
+    """Пауза с учетом DELAY_SCALE"""
+    if seconds * DELAY_SCALE > 0:
+        time.sleep(seconds * DELAY_SCALE)
+
+
 def sleep_random(min_seconds: float = 1.0, max_seconds: float = 3.0):
     """Случайная задержка между запросами"""
-    import random
-    time.sleep(random.uniform(min_seconds, max_seconds))
+    sleep_scaled(random.uniform(min_seconds, max_seconds))
 
@@ -0,0 +1,696 @@
+"""
+HTTP-слой: классификация ошибок, повторы с экспоненциальной задержкой, circuit breaker по хостам,
+канонизация URL и объединение одинаковых одновременных запросов
+"""
+import os
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from src.utils.helpers import get_headers, sleep_scaled
+
+if TYPE_CHECKING:
+    import requests
+
+
+# Классы результата загрузки
+OK = 'ok'
+NOT_FOUND = 'not_found'
+RATE_LIMITED = 'rate_limited'
+BLOCKED = 'blocked'
+SERVER_ERROR = 'server_error'
+CLIENT_ERROR = 'client_error'
+NETWORK_ERROR = 'network_error'
+CIRCUIT_OPEN = 'circuit_open'
+UNSUPPORTED_TYPE = 'unsupported_type'
+TOO_LARGE = 'too_large'
+TOO_SLOW = 'too_slow'
+# Время, отведенное вызывающим кодом (deadline_at), вышло - о хосте это ничего не говорит
+OUT_OF_TIME = 'out_of_time'
+
+# Ошибки, после которых имеет смысл повторить запрос
+RETRYABLE_STATUSES = {RATE_LIMITED, SERVER_ERROR, NETWORK_ERROR}
+# Ошибки, которые говорят о проблемах с хостом (а не с конкретной страницей)
+HOST_FAILURE_STATUSES = {RATE_LIMITED, BLOCKED, SERVER_ERROR, NETWORK_ERROR, TOO_SLOW}
+# Ответ получен, но не подходит нам - хост при этом исправен
+PAGE_REJECTED_STATUSES = {UNSUPPORTED_TYPE, TOO_LARGE}
+
+# Типы содержимого, которые имеет смысл разбирать как страницу
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+JSON_CONTENT_TYPES = ('application/json', 'text/json')
+# Ограничения загрузки: размер тела (после распаковки) и общее время чтения ответа
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_DEADLINE = 30.0
+CHUNK_SIZE = 64 * 1024
+# Число повторов по умолчанию (HTTP_MAX_RETRIES)
+MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES') or 3)
+
+# Параметры запроса, которые не влияют на содержимое страницы (метки рекламы и переходов)
+TRACKING_PARAMS = {
+    'gclid', 'yclid', 'fbclid', 'ysclid', 'msclkid', '_openstat', 'from', 'ref', 'rp',
+    'roistat', 'etext',
+}
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Сколько последних результатов загрузки помнить, сколько байт тел они могут занять
+# в сумме и как долго (секунды)
+RECENT_RESULTS_SIZE = 256
+RECENT_RESULTS_MAX_BYTES = 32 * 1024 * 1024
+RECENT_RESULTS_TTL = 300.0
+
+
+class FetchResult:
+    """Результат загрузки: класс результата, тело ответа и пауза, запрошенная сервером"""
+
+    def __init__(self, status: str, content: Optional[bytes] = None,
+                 status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        self.status = status
+        self.content = content
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def ok(self) -> bool:
+        return self.status == OK
+
+    def __repr__(self):
+        return f"FetchResult({self.status}, code={self.status_code})"
+
+
+def classify_status(status_code: int) -> str:
+    """Относит HTTP-код ответа к классу результата"""
+    if status_code < 400:
+        return OK
+    if status_code in (404, 410):
+        return NOT_FOUND
+    if status_code == 429:
+        return RATE_LIMITED
+    if status_code in (401, 403, 451):
+        return BLOCKED
+    if status_code >= 500:
+        return SERVER_ERROR
+    return CLIENT_ERROR
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Разбирает заголовок Retry-After: число секунд или HTTP-дата"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для одного хоста.
+
+    После failure_threshold подряд идущих отказов хост отключается на reset_timeout
+    секунд (или на Retry-After, если сервер попросил больше). Затем пропускается
+    один пробный запрос: успех замыкает цепь, отказ снова ее размыкает.
+    """
+
+    def __init__(self, host: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.open_until = 0.0
+        self.half_open = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """True, пока хост отключен и время пробного запроса еще не наступило"""
+        return self.open_until > time.monotonic()
+
+    def allow_request(self) -> bool:
+        """Можно ли сейчас выполнить запрос к хосту"""
+        with self._lock:
+            if not self.open_until:
+                return True
+            if self.open_until > time.monotonic() or self.half_open:
+                return False
+            # Время отключения вышло - пропускаем один пробный запрос
+            self.half_open = True
+            return True
+
+    def release_probe(self):
+        """
+        Снимает пробный запрос без исхода: запрос не дошел до хоста (например,
+        не нашлось свободного прокси), и следующий запрос снова может стать пробным
+        """
+        with self._lock:
+            self.half_open = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self.half_open = False
+
+    def record_failure(self, status: str, retry_after: Optional[float] = None):
+        with self._lock:
+            self.failures += 1
+            if self.half_open or self.failures >= self.failure_threshold or status == BLOCKED:
+                pause = max(self.reset_timeout, retry_after or 0.0)
+                self.open_until = time.monotonic() + pause
+                self.half_open = False
+                print(f"      ⚠ Источник {self.host} временно отключен ({status}) на {pause:.0f} с")
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """Возвращает общий для всех коллекторов circuit breaker хоста"""
+    host = urlparse(url).netloc.lower() or url
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+
+def is_host_available(url: str) -> bool:
+    """False, если circuit breaker хоста сейчас разомкнут"""
+    return not get_breaker(url).is_open
+
+
+_encodings = None
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Сжатия, которые можно распаковать: gzip и deflate всегда, br и zstd - если установлены модули"""
+    global _encodings
+    if _encodings is None:
+        encodings = ['gzip', 'deflate']
+        for encoding, module in (('br', 'brotli'), ('zstd', 'zstandard')):
+            try:
+                __import__(module)
+            except ImportError:
+                continue
+            encodings.append(encoding)
+        _encodings = tuple(encodings)
+    return _encodings
+
+
+class _ChunkReader:
+    """Файлоподобная обертка над итератором частей (источник для zstandard.stream_reader)"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b''
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._buffer:
+            data = next(self._chunks, None)
+            if data is None:
+                return b''
+            self._buffer = data
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _inflate(obj, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    for data in chunks:
+        # Не больше CHUNK_SIZE за вызов; остаток входа ждет в unconsumed_tail
+        while data:
+            out = obj.decompress(data, CHUNK_SIZE)
+            if out:
+                yield out
+            data = obj.unconsumed_tail
+    tail = obj.flush()
+    if tail:
+        yield tail
+
+
+def _unbrotli(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    import brotli
+    obj = brotli.Decompressor()
+    for data in chunks:
+        out = obj.process(data, output_buffer_limit=CHUNK_SIZE)
+        # Выход уперся в лимит - остаток забирается вызовами с пустым входом
+        # (лимит мягкий: буфер brotli может немного превысить его)
+        while out:
+            yield out
+            out = obj.process(b'', output_buffer_limit=CHUNK_SIZE)
+
+
+def _unzstd(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    import zstandard
+    reader = zstandard.ZstdDecompressor().stream_reader(_ChunkReader(chunks), read_across_frames=True)
+    while True:
+        out = reader.read(CHUNK_SIZE)
+        if not out:
+            return
+        yield out
+
+
+class StreamDecoder:
+    """
+    Распаковывает тело ответа по частям согласно Content-Encoding.
+
+    Несколько сжатий ("gzip, br") снимаются в обратном порядке;
+    неизвестное сжатие или identity - данные возвращаются как есть.
+    Каждая часть на выходе порядка CHUNK_SIZE, сколько бы ни давал
+    распаковки один сжатый фрагмент, - лимит размера проверяется до того,
+    как "бомба" будет распакована целиком.
+    """
+
+    def __init__(self, content_encoding: Optional[str]):
+        encodings = [e.strip().lower() for e in (content_encoding or '').split(',') if e.strip()]
+        self._steps = [self._make_step(e) for e in reversed(encodings)]
+        self._steps = [step for step in self._steps if step is not None]
+
+    @staticmethod
+    def _make_step(encoding: str) -> Optional[Callable[[Iterator[bytes]], Iterator[bytes]]]:
+        if encoding in ('gzip', 'x-gzip'):
+            # 16 + MAX_WBITS - формат gzip
+            return lambda chunks: _inflate(zlib.decompressobj(16 + zlib.MAX_WBITS), chunks)
+        if encoding == 'deflate':
+            # 32 + MAX_WBITS - автоопределение заголовка zlib; сырой deflate встречается редко
+            return lambda chunks: _inflate(zlib.decompressobj(32 + zlib.MAX_WBITS), chunks)
+        if encoding == 'br':
+            return _unbrotli
+        if encoding == 'zstd':
+            return _unzstd
+        return None
+
+    def decode(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """Распакованные части тела из сжатых частей chunks, включая хвост в конце потока"""
+        for step in self._steps:
+            chunks = step(chunks)
+        return chunks
+
+
+class BandwidthStats:
+    """Объем трафика по хостам: запросы, байты по сети и байты после распаковки"""
+
+    def __init__(self):
+        self._hosts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, url: str, wire_bytes: int, decoded_bytes: int):
+        host = urlparse(url).netloc.lower() or url
+        with self._lock:
+            stats = self._hosts.setdefault(host, {'requests': 0, 'wire_bytes': 0, 'decoded_bytes': 0})
+            stats['requests'] += 1
+            stats['wire_bytes'] += wire_bytes
+            stats['decoded_bytes'] += decoded_bytes
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Копия статистики: {хост: {requests, wire_bytes, decoded_bytes}}"""
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._hosts.items()}
+
+    def report(self, top: int = 10):
+        """Печатает хосты с наибольшим трафиком"""
+        hosts = sorted(self.snapshot().items(), key=lambda item: item[1]['wire_bytes'], reverse=True)
+        if not hosts:
+            return
+        print("\nТрафик по источникам (по сети / после распаковки):")
+        for host, stats in hosts[:top]:
+            ratio = stats['decoded_bytes'] / stats['wire_bytes'] if stats['wire_bytes'] else 0.0
+            print(f"   {host}: {stats['requests']} запросов, "
+                  f"{stats['wire_bytes'] / 1024:.0f} КБ / {stats['decoded_bytes'] / 1024:.0f} КБ "
+                  f"(сжатие x{ratio:.1f})")
+
+
+bandwidth = BandwidthStats()
+
+
+def create_session() -> 'requests.Session':
+    """
+    Сессия requests с заголовками браузера (requests импортируется при первом создании).
+
+    Accept-Encoding перечисляет все сжатия, которые умеет распаковывать StreamDecoder:
+    br и zstd добавляются, если установлены brotli и zstandard.
+    """
+    import requests
+    session = requests.Session()
+    session.headers.update(get_headers())
+    session.headers['Accept-Encoding'] = ', '.join(available_encodings())
+    return session
+
+
+def content_type_allowed(content_type: Optional[str], allowed_types: Optional[Tuple[str, ...]]) -> bool:
+    """Подходит ли Content-Type ответа; без заголовка ответ принимается"""
+    if not allowed_types or not content_type:
+        return True
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return media_type in allowed_types
+
+
+def iter_raw_chunks(raw) -> Iterator[bytes]:
+    """
+    Части тела ответа без распаковки - по мере поступления.
+
+    stream() и read(n) ждут, пока наберется n байт, поэтому ответ, который
+    отдается по килобайту, проходил бы проверку срока только в самом конце;
+    read1 (urllib3 2.x, см. requirements.txt) возвращает то, что уже пришло.
+    """
+    while True:
+        data = raw.read1(CHUNK_SIZE, decode_content=False)
+        if not data:
+            return
+        yield data
+
+
+def read_body(response, max_bytes: Optional[int], deadline_at: Optional[float]) -> FetchResult:
+    """
+    Читает тело ответа частями, не больше max_bytes и не дольше deadline_at (time.monotonic).
+
+    Превышение размера - TOO_LARGE, превышение времени - TOO_SLOW; соединение
+    в этих случаях закрывается, не дочитывая ответ. Сжатое тело распаковывается
+    по частям, поэтому лимит действует и на распакованный размер. Переданные
+    по сети и распакованные байты учитываются в статистике хоста.
+    """
+    import requests
+    from urllib3.exceptions import HTTPError
+    chunks = []
+    wire = 0
+    received = 0
+
+    def raw_chunks() -> Iterator[bytes]:
+        nonlocal wire
+        for raw in iter_raw_chunks(response.raw):
+            wire += len(raw)
+            yield raw
+
+    try:
+        decoder = StreamDecoder(response.headers.get('Content-Encoding'))
+        # Хвост распаковки в конце потока проходит те же проверки, что и остальные части
+        for chunk in decoder.decode(raw_chunks()):
+            received += len(chunk)
+            if max_bytes is not None and received > max_bytes:
+                return FetchResult(TOO_LARGE, status_code=response.status_code)
+            if deadline_at is not None and time.monotonic() > deadline_at:
+                return FetchResult(TOO_SLOW, status_code=response.status_code)
+            chunks.append(chunk)
+    except (requests.RequestException, HTTPError, OSError):
+        return FetchResult(NETWORK_ERROR, status_code=response.status_code)
+    except Exception:
+        # Поврежденные сжатые данные (zlib.error, ошибки brotli/zstd)
+        return FetchResult(NETWORK_ERROR, status_code=response.status_code)
+    finally:
+        bandwidth.record(response.url, wire, received)
+        response.close()
+    return FetchResult(OK, content=b''.join(chunks), status_code=response.status_code)
+
+
+def fetch_with_retry(session: 'requests.Session', url: str, timeout: float = 10,
+                     max_retries: Optional[int] = None, backoff_base: float = 1.0,
+                     backoff_max: float = 30.0,
+                     allowed_types: Optional[Tuple[str, ...]] = HTML_CONTENT_TYPES,
+                     max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                     deadline: Optional[float] = DEFAULT_DEADLINE,
+                     proxy_pool=None, deadline_at: Optional[float] = None, **kwargs) -> FetchResult:
+    """
+    Выполняет GET-запрос с повторами.
+
+    Повторяются только 429, 5xx и сетевые ошибки: с экспоненциальной задержкой
+    и случайным разбросом, либо через Retry-After, если сервер его прислал.
+    Если сервер просит ждать дольше backoff_max, повтор не выполняется.
+    max_retries по умолчанию - MAX_RETRIES.
+
+    Тело читается потоково: ответы с Content-Type не из allowed_types (None - любой)
+    не загружаются (UNSUPPORTED_TYPE), тело больше max_bytes обрывается (TOO_LARGE),
+    как и ответ, который читается дольше deadline секунд (TOO_SLOW).
+
+    С proxy_pool (ProxyPool) каждая попытка идет через прокси из пула. Отказ,
+    который относится к прокси (он недоступен, его адрес ограничен или
+    заблокирован хостом), не считается отказом хоста: следующая попытка сразу
+    идет через другой прокси.
+
+    deadline_at (момент по time.monotonic) - общий срок всех попыток: таймаут,
+    срок чтения и ожидание прокси укорачиваются до него, повтор, пауза перед
+    которым заканчивается позже, не выполняется. Попытка, прерванная этим
+    сроком, возвращает OUT_OF_TIME и не считается отказом хоста.
+    """
+    import requests
+    breaker = get_breaker(url)
+    if max_retries is None:
+        max_retries = MAX_RETRIES
+
+    def remaining() -> Optional[float]:
+        return deadline_at - time.monotonic() if deadline_at is not None else None
+
+    result = FetchResult(CIRCUIT_OPEN)
+    for attempt in range(max_retries + 1):
+        if deadline_at is not None and remaining() <= 0:
+            return FetchResult(OUT_OF_TIME)
+        if not breaker.allow_request():
+            return FetchResult(CIRCUIT_OPEN)
+
+        proxy = None
+        proxy_failed = False
+        if proxy_pool is not None:
+            proxy = proxy_pool.acquire(url, deadline_at=deadline_at)
+            if proxy is None:
+                # Для этого хоста ограничены или отключены все прокси; хост при этом
+                # не отвечал ошибкой, поэтому отказ хосту не засчитываем
+                breaker.release_probe()
+                return FetchResult(RATE_LIMITED)
+            kwargs['proxies'] = proxy.proxies
+
+        read_deadline_at = time.monotonic() + deadline if deadline is not None else None
+        attempt_timeout = timeout
+        if deadline_at is not None:
+            read_deadline_at = min(read_deadline_at or deadline_at, deadline_at)
+            attempt_timeout = max(0.1, min(timeout, remaining()))
+        try:
+            response = session.get(url, timeout=attempt_timeout, stream=True, **kwargs)
+        except requests.exceptions.ProxyError:
+            result = FetchResult(NETWORK_ERROR)
+            proxy_failed = True
+        except requests.RequestException:
+            result = FetchResult(NETWORK_ERROR)
+        else:
+            status = classify_status(response.status_code)
+            content_length = response.headers.get('Content-Length', '')
+            if status != OK:
+                response.close()
+                result = FetchResult(
+                    status,
+                    status_code=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get('Retry-After')),
+                )
+            elif not content_type_allowed(response.headers.get('Content-Type'), allowed_types):
+                # PDF, архивы, картинки - не загружаем и не разбираем
+                response.close()
+                result = FetchResult(UNSUPPORTED_TYPE, status_code=response.status_code)
+            elif max_bytes is not None and content_length.isdigit() and int(content_length) > max_bytes:
+                response.close()
+                result = FetchResult(TOO_LARGE, status_code=response.status_code)
+            else:
+                result = read_body(response, max_bytes, read_deadline_at)
+
+        if (deadline_at is not None and remaining() <= 0 and result.status != OK
+                and result.status not in (NOT_FOUND, CLIENT_ERROR) and result.status not in PAGE_REJECTED_STATUSES):
+            # Попытку оборвал срок вызывающего кода - ни хосту, ни прокси отказ не засчитываем
+            breaker.release_probe()
+            return FetchResult(OUT_OF_TIME, status_code=result.status_code)
+
+        if proxy is not None and proxy_pool.record(proxy, url, result.status, result.retry_after, proxy_failed):
+            # Отказ прокси ничего не говорит о хосте - пробный запрос не израсходован
+            breaker.release_probe()
+            if attempt == max_retries:
+                return result
+            continue
+
+        if result.status in (OK, NOT_FOUND, CLIENT_ERROR) or result.status in PAGE_REJECTED_STATUSES:
+            # Хост отвечает - значит, с ним все в порядке
+            breaker.record_success()
+            return result
+
+        breaker.record_failure(result.status, result.retry_after)
+        if result.status not in RETRYABLE_STATUSES or attempt == max_retries:
+            return result
+
+        if result.retry_after is not None:
+            if result.retry_after > backoff_max:
+                return result
+            delay = result.retry_after
+        else:
+            delay = min(backoff_max, backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if deadline_at is not None and delay >= remaining():
+            # До повтора срок истечет - возвращаем последний результат сразу
+            return result
+        sleep_scaled(delay)
+
+    return result
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Приводит URL к каноническому виду, чтобы одна страница загружалась один раз.
+
+    Схема и хост - в нижнем регистре (без схемы - http), порт по умолчанию
+    и фрагмент убираются, пустой путь заменяется на "/", а завершающий "/"
+    у остальных путей отбрасывается. Из запроса удаляются метки переходов
+    (utm_*, gclid, yclid, rp и т.п.), оставшиеся параметры сортируются.
+    """
+    url = url.strip()
+    if '://' not in url:
+        url = 'http://' + url
+    parts = urlparse(url)
+    scheme = parts.scheme.lower()
+
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query = urlencode(sorted(params))
+
+    return urlunparse((scheme, host, path, parts.params, query, ''))
+
+
+class _Call:
+    """Выполняющийся запрос, результат которого ждут другие потоки"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы с одинаковым ключом.
+
+    Первый поток выполняет функцию, остальные ждут и получают тот же
+    результат (или то же исключение).
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class RecentResults:
+    """
+    Небольшой LRU-кеш последних результатов загрузки с ограниченным временем жизни.
+
+    Ограничен и числом записей (max_size), и суммарным размером тел (max_bytes):
+    тело больше max_bytes не запоминается вовсе.
+    """
+
+    def __init__(self, max_size: int = RECENT_RESULTS_SIZE, ttl: float = RECENT_RESULTS_TTL,
+                 max_bytes: int = RECENT_RESULTS_MAX_BYTES):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(result: FetchResult) -> int:
+        return len(result.content) if result.content else 0
+
+    def _remove(self, key: str):
+        _, result = self._items.pop(key)
+        self.total_bytes -= self._size(result)
+
+    def get(self, key: str) -> Optional[FetchResult]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, result = item
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._items.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: FetchResult):
+        size = self._size(result)
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._items[key] = (time.monotonic() + self.ttl, result)
+            self.total_bytes += size
+            while len(self._items) > self.max_size or self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self._items)))
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.total_bytes = 0
+
+
+_single_flight = SingleFlight()
+_recent_results = RecentResults()
+
+
+def fetch_shared(url: str, fetch: Callable[[str], FetchResult],
+                 allowed_types: Optional[Tuple[str, ...]] = None) -> FetchResult:
+    """
+    Загружает URL через fetch(url), не повторяя одинаковые запросы.
+
+    Канонический URL (canonicalize_url) вместе с allowed_types - только ключ:
+    одновременные запросы с одним ключом выполняются один раз, остальные вызовы
+    получают тот же результат. Загружается исходный URL - завершающий "/" и
+    параметры вроде from или ref бывают значимы для сервера. Успешные ответы
+    и 404 запоминаются на RECENT_RESULTS_TTL секунд; ошибки не запоминаются,
+    чтобы следующий вызов мог повторить попытку.
+    """
+    key = f"{canonicalize_url(url)} {','.join(allowed_types or ())}"
+    result = _recent_results.get(key)
+    if result is not None:
+        return result
+
+    def load() -> FetchResult:
+        loaded = fetch(url)
+        if loaded.status in (OK, NOT_FOUND):
+            _recent_results.put(key, loaded)
+        return loaded
+
+    return _single_flight.do(key, load)
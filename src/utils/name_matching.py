@@ -0,0 +1,94 @@
+"""Сопоставление названий компаний с результатами поиска"""
+import re
+from difflib import SequenceMatcher
+from typing import List, Tuple
+
+
+TAG_RE = re.compile(r'<[^>]+>')
+SPACES_RE = re.compile(r'\s+')
+QUOTED_RE = re.compile(r'["«“]([^"»”<>]{2,100})["»”]')
+NON_WORD_RE = re.compile(r'[^\w]+')
+LEGAL_FORMS = {'ооо', 'оао', 'зао', 'пао', 'ао', 'ип', 'ано', 'нко', 'общество', 'с', 'ограниченной',
+               'ответственностью', 'акционерное', 'публичное', 'непубличное'}
+
+# Минимальная оценка name_similarity, с которой кандидат считается той же компанией:
+# название входит в текст целиком (1.0 за слова и 1.0 за вхождение), а совпадения
+# части слов ("Альфа Перевод Урал" для "Альфа Перевод Сибирь") до нее не дотягивают
+MIN_NAME_SIMILARITY = 2.0
+
+
+def name_words(name: str) -> List[str]:
+    """Значимые слова названия (длиннее 2 символов)"""
+    return [w for w in name.lower().split() if len(w) > 2]
+
+
+def matches_name(name: str, text: str) -> bool:
+    """Название целиком входит в текст или в тексте есть хотя бы половина его слов"""
+    name_lower = name.strip().lower()
+    text_lower = text.lower()
+    words = name_words(name_lower)
+    return (name_lower in text_lower or
+            len(words) > 0 and sum(1 for w in words if w in text_lower) >= len(words) * 0.5)
+
+
+def snippet_text(html_fragment: str) -> str:
+    """Текст фрагмента HTML без тегов и лишних пробелов"""
+    return SPACES_RE.sub(' ', TAG_RE.sub(' ', html_fragment)).strip()
+
+
+def name_similarity(name: str, snippet: str) -> float:
+    """
+    Оценка сходства названия с фрагментом результата поиска.
+
+    Складывается из доли найденных слов названия, бонуса за вхождение
+    названия целиком и близости к названию в кавычках (ООО "..."),
+    чтобы точное совпадение было выше похожих названий ("ПРОМТ" и "ПРОМТ-СЕРВИС").
+    """
+    name_lower = name.strip().lower()
+    snippet_lower = snippet.lower()
+    if not name_lower or not snippet_lower:
+        return 0.0
+
+    words = name_words(name_lower)
+    score = sum(1 for w in words if w in snippet_lower) / len(words) if words else 0.0
+    if name_lower in snippet_lower:
+        score += 1.0
+
+    quoted = QUOTED_RE.findall(snippet_lower) or [snippet_lower[:100]]
+    score += max(SequenceMatcher(None, name_lower, q.strip()).ratio() for q in quoted)
+    return score
+
+
+def normalize_name(name: str) -> str:
+    """Название без кавычек, знаков препинания, организационно-правовой формы и регистра"""
+    words = NON_WORD_RE.sub(' ', name.lower().replace('ё', 'е')).split()
+    return ' '.join(w for w in words if w not in LEGAL_FORMS)
+
+
+def accepts_name(name: str, candidate_name: str) -> bool:
+    """
+    Кандидат - та же компания: нормализованные названия совпадают (с точностью
+    до порядка слов) или name_similarity не ниже MIN_NAME_SIMILARITY.
+    """
+    normalized = normalize_name(name)
+    candidate = normalize_name(candidate_name)
+    if normalized and sorted(normalized.split()) == sorted(candidate.split()):
+        return True
+    return name_similarity(name, candidate_name) >= MIN_NAME_SIMILARITY
+
+
+def rank_candidates(candidates: List[Tuple[str, str]], name: str, top_k: int) -> List[Tuple[str, str]]:
+    """
+    Упорядочивает кандидатов (url, фрагмент результата) по сходству с названием.
+
+    Возвращает не более top_k пар (url, фрагмент), лучшие первыми. Повторы URL
+    схлопываются: оценка берется лучшая, а фрагмент - самый полный.
+    """
+    scores = {}
+    snippets = {}
+    for url, snippet in candidates:
+        scores[url] = max(scores.get(url, -1.0), name_similarity(name, snippet))
+        if len(snippet) > len(snippets.get(url, '')):
+            snippets[url] = snippet
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [(url, snippets.get(url, '')) for url in ranked[:top_k]]
@@ -0,0 +1,323 @@
+"""Запись результатов: CSV, JSONL, Parquet и Arrow с шардированием по числу строк, SQLite с обновлением по ИНН"""
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import List, Dict, Optional, Iterator
+
+
+# Поля выходного файла (порядок колонок)
+COMPANY_FIELDS = [
+    'inn', 'name', 'revenue', 'site', 'cat_evidence', 'source',
+    'cat_product', 'employees', 'okved_main'
+]
+
+# Числовые поля; остальные пишутся как строки
+INTEGER_FIELDS = ('revenue', 'employees')
+
+
+def _to_int(value) -> Optional[int]:
+    """Приводит значение числового поля к int (пустые и некорректные - None)"""
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(value) -> Optional[str]:
+    """Приводит значение строкового поля к str (пустые - None)"""
+    if value in (None, ''):
+        return None
+    return str(value)
+
+
+class OutputSink(ABC):
+    """
+    Базовый класс выходного формата.
+
+    При shard_size записи делятся на файлы по shard_size строк:
+    companies.parquet -> companies-00000.parquet, companies-00001.parquet, ...
+    """
+
+    extension = ''
+
+    def __init__(self, output_path: str, shard_size: Optional[int] = None,
+                 compression: Optional[str] = None):
+        self.output_path = output_path
+        self.shard_size = shard_size
+        self.compression = compression
+
+    def _shards(self, companies: List[Dict]) -> Iterator[List[Dict]]:
+        if not self.shard_size:
+            yield companies
+            return
+        for start in range(0, len(companies), self.shard_size):
+            yield companies[start:start + self.shard_size]
+
+    def _shard_path(self, shard_number: int) -> str:
+        base, ext = os.path.splitext(self.output_path)
+        ext = ext or self.extension
+        if not self.shard_size:
+            return base + ext
+        return f"{base}-{shard_number:05d}{ext}"
+
+    def write(self, companies: List[Dict]) -> List[str]:
+        """Записывает компании и возвращает список созданных файлов"""
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        paths = []
+        for shard_number, shard in enumerate(self._shards(companies)):
+            path = self._shard_path(shard_number)
+            self.write_shard(shard, path)
+            paths.append(path)
+        return paths
+
+    @abstractmethod
+    def write_shard(self, companies: List[Dict], path: str):
+        """Записывает одну часть записей в файл path"""
+        pass
+
+
+class CsvSink(OutputSink):
+    """CSV в UTF-8; compression='gzip' сжимает файл (.csv.gz)"""
+
+    extension = '.csv'
+
+    def _shard_path(self, shard_number: int) -> str:
+        path = super()._shard_path(shard_number)
+        if self.compression == 'gzip' and not path.endswith('.gz'):
+            path += '.gz'
+        return path
+
+    def write_shard(self, companies: List[Dict], path: str):
+        if self.compression == 'gzip':
+            f = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        elif self.compression:
+            raise ValueError(f"CSV поддерживает только сжатие gzip, получено: {self.compression}")
+        else:
+            f = open(path, 'w', newline='', encoding='utf-8')
+
+        with f:
+            writer = csv.DictWriter(f, fieldnames=COMPANY_FIELDS)
+            writer.writeheader()
+            for company in companies:
+                row = {field: company.get(field, '') for field in COMPANY_FIELDS}
+                writer.writerow(row)
+
+
+class JsonlSink(OutputSink):
+    """
+    JSON Lines со всеми полями записи (включая служебные, например detail_url) -
+    формат промежуточных файлов между этапами обработки
+    """
+
+    extension = '.jsonl'
+
+    def write_shard(self, companies: List[Dict], path: str):
+        if self.compression:
+            raise ValueError(f"JSONL пишется без сжатия, получено: {self.compression}")
+        with open(path, 'w', encoding='utf-8') as f:
+            for company in companies:
+                f.write(json.dumps(company, ensure_ascii=False) + '\n')
+
+
+class ArrowTableSink(OutputSink):
+    """Общая часть типизированных форматов на pyarrow (фиксированная схема)"""
+
+    def _table(self, companies: List[Dict]):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Для записи в Parquet/Arrow установите pyarrow: pip install pyarrow")
+
+        schema = pa.schema([
+            pa.field(field, pa.int64() if field in INTEGER_FIELDS else pa.string())
+            for field in COMPANY_FIELDS
+        ])
+        columns = {
+            field: [
+                (_to_int if field in INTEGER_FIELDS else _to_str)(company.get(field))
+                for company in companies
+            ]
+            for field in COMPANY_FIELDS
+        }
+        return pa.Table.from_pydict(columns, schema=schema)
+
+
+class ParquetSink(ArrowTableSink):
+    """Parquet; по умолчанию сжатие zstd"""
+
+    extension = '.parquet'
+
+    def write_shard(self, companies: List[Dict], path: str):
+        import pyarrow.parquet as pq
+        pq.write_table(self._table(companies), path, compression=self.compression or 'zstd')
+
+
+class ArrowSink(ArrowTableSink):
+    """Arrow IPC (Feather v2); сжатие zstd или lz4"""
+
+    extension = '.arrow'
+
+    def write_shard(self, companies: List[Dict], path: str):
+        import pyarrow.feather as feather
+        feather.write_feather(self._table(companies), path, compression=self.compression or 'zstd')
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    inn TEXT PRIMARY KEY,
+    name TEXT,
+    revenue INTEGER,
+    site TEXT,
+    cat_evidence TEXT,
+    source TEXT,
+    cat_product TEXT,
+    employees INTEGER,
+    okved_main TEXT,
+    run_id TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_companies_revenue ON companies(revenue);
+CREATE INDEX IF NOT EXISTS idx_companies_cat_product ON companies(cat_product);
+CREATE INDEX IF NOT EXISTS idx_companies_okved_main ON companies(okved_main);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    finished REAL NOT NULL,
+    companies INTEGER NOT NULL,
+    written INTEGER NOT NULL
+);
+"""
+
+
+def default_run_id() -> str:
+    """Уникальный идентификатор запуска, упорядоченный по времени: 20240801T120000-1234-9f1c2a3b"""
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class SqliteSink(OutputSink):
+    """
+    База SQLite, которая обновляется, а не перезаписывается: строка на ИНН.
+
+    Новые компании добавляются, у известных обновляются только изменившиеся
+    строки (пустое новое значение не затирает известное). В run_id строки -
+    запуск, который последним ее изменил; запуски перечислены в таблице runs.
+    По revenue, cat_product и okved_main построены индексы. Записи без ИНН
+    пропускаются - их не с чем сопоставить при следующем запуске.
+    """
+
+    extension = '.sqlite'
+
+    def __init__(self, output_path: str, shard_size: Optional[int] = None,
+                 compression: Optional[str] = None, run_id: Optional[str] = None):
+        super().__init__(output_path, shard_size=None, compression=compression)
+        # По умолчанию - время запуска с pid и случайным суффиксом (запуски в одну
+        # секунду не сливаются в один); RUN_ID задает свой идентификатор
+        self.run_id = run_id or os.environ.get('RUN_ID') or default_run_id()
+
+    def write(self, companies: List[Dict]) -> List[str]:
+        if self.compression:
+            raise ValueError(f"SQLite пишется без сжатия, получено: {self.compression}")
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        path = self._shard_path(0)
+        self.write_shard(companies, path)
+        return [path]
+
+    def write_shard(self, companies: List[Dict], path: str):
+        now = time.time()
+        rows = [
+            tuple(
+                (_to_int if field in INTEGER_FIELDS else _to_str)(company.get(field))
+                for field in COMPANY_FIELDS
+            ) + (self.run_id, now)
+            for company in companies
+            if _to_str(company.get('inn'))
+        ]
+        fields = COMPANY_FIELDS[1:]
+        merged = ', '.join(f'COALESCE(excluded.{f}, {f})' for f in fields)
+        sql = (
+            f"INSERT INTO companies ({', '.join(COMPANY_FIELDS)}, run_id, updated) "
+            f"VALUES ({', '.join('?' * (len(COMPANY_FIELDS) + 2))}) "
+            f"ON CONFLICT(inn) DO UPDATE SET "
+            + ', '.join(f'{f} = COALESCE(excluded.{f}, {f})' for f in fields)
+            + ", run_id = excluded.run_id, updated = excluded.updated "
+            f"WHERE ({merged}) IS NOT ({', '.join(fields)})"
+        )
+
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            conn.executescript(SQLITE_SCHEMA)
+            changes_before = conn.total_changes
+            with conn:
+                conn.executemany(sql, rows)
+                written = conn.total_changes - changes_before
+                conn.execute("INSERT OR REPLACE INTO runs (run_id, finished, companies, written) "
+                             "VALUES (?, ?, ?, ?)", (self.run_id, now, len(rows), written))
+        finally:
+            conn.close()
+
+        skipped = len(companies) - len(rows)
+        print(f"SQLite {path}: изменено строк {written} из {len(rows)}"
+              + (f", без ИНН пропущено {skipped}" if skipped else ""))
+
+
+SINKS = {
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'parquet': ParquetSink,
+    'arrow': ArrowSink,
+    'sqlite': SqliteSink,
+}
+
+
+def get_sink(fmt: str, output_path: str, shard_size: Optional[int] = None,
+             compression: Optional[str] = None) -> OutputSink:
+    """Возвращает выходной формат по названию: csv, jsonl, parquet, arrow, sqlite"""
+    if fmt not in SINKS:
+        raise ValueError(f"Неизвестный формат вывода: {fmt} (доступны: {', '.join(SINKS)})")
+    return SINKS[fmt](output_path, shard_size=shard_size, compression=compression)
+
+
+def save_companies(companies: List[Dict], output_path: str, fmt: str = 'csv',
+                   shard_size: Optional[int] = None, compression: Optional[str] = None) -> List[str]:
+    """Сохраняет компании в выбранном формате и возвращает пути созданных файлов"""
+    return get_sink(fmt, output_path, shard_size=shard_size, compression=compression).write(companies)
+
+
+def load_companies(path: str) -> List[Dict]:
+    """
+    Читает компании из файла, сохраненного save_companies: CSV (в том числе .csv.gz),
+    JSONL или SQLite. В CSV пустые значения становятся None, выручка и штат - числами.
+    """
+    if path.endswith(('.jsonl', '.ndjson')):
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    if path.endswith('.sqlite'):
+        conn = sqlite3.connect(path)
+        try:
+            rows = conn.execute(f"SELECT {', '.join(COMPANY_FIELDS)} FROM companies").fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(COMPANY_FIELDS, row)) for row in rows]
+
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', newline='', encoding='utf-8-sig') as f:
+        companies = []
+        for row in csv.DictReader(f):
+            company = {key: (value if value != '' else None) for key, value in row.items()}
+            for field in INTEGER_FIELDS:
+                if field in company:
+                    company[field] = _to_int(company[field])
+            companies.append(company)
+        return companies
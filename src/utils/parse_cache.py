@@ -0,0 +1,111 @@
+"""Кеш разобранных страниц: запись о компании по хешу тела ответа и версии разбора"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parsed_records (
+    source TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    record TEXT,
+    parsed REAL NOT NULL,
+    PRIMARY KEY (source, content_hash)
+);
+"""
+
+
+def content_key(content: bytes, url: str) -> str:
+    """Хеш страницы; URL входит в ключ, потому что ИНН разборщики берут и из него"""
+    digest = hashlib.sha1(url.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(content)
+    return digest.hexdigest()
+
+
+class ParsedRecordCache:
+    """
+    Результаты parse_company_page по (источник, хеш тела ответа); источник -
+    пространство имен коллектора: SOURCE и имя парсера (см. BaseCollector.parse_content).
+
+    Если страница загружена заново, но не изменилась, регулярные выражения
+    не выполняются - запись берется из кеша. У каждой записи хранится версия
+    разбора (EXTRACTOR_VERSION коллектора): при ее увеличении записи этого
+    источника со старой версией удаляются, записи других источников остаются.
+
+    С path записи хранятся в файле SQLite (и переживают перезапуск), без
+    path - только в памяти. None (страница не разобрана) тоже запоминается.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._memory: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._checked_versions: Set[Tuple[str, int]] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _drop_old_versions(self, source: str, version: int):
+        """Удаляет записи источника, разобранные другой версией (один раз за запуск)"""
+        if (source, version) in self._checked_versions:
+            return
+        self._checked_versions.add((source, version))
+        if self.conn is not None:
+            self.conn.execute("DELETE FROM parsed_records WHERE source = ? AND version != ?",
+                              (source, version))
+            self.conn.commit()
+
+    def get(self, source: str, key: str, version: int) -> Tuple[bool, Optional[Dict]]:
+        """(найдено, запись); запись каждый раз новая - ее можно дополнять"""
+        with self._lock:
+            self._drop_old_versions(source, version)
+            item = self._memory.get((source, key))
+            if item is None and self.conn is not None:
+                item = self.conn.execute(
+                    "SELECT version, record FROM parsed_records WHERE source = ? AND content_hash = ?",
+                    (source, key)
+                ).fetchone()
+            if item is None or item[0] != version:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+        return True, json.loads(item[1]) if item[1] is not None else None
+
+    def put(self, source: str, key: str, version: int, record: Optional[Dict]):
+        """Запоминает результат разбора страницы"""
+        data = json.dumps(record, ensure_ascii=False) if record is not None else None
+        with self._lock:
+            self._drop_old_versions(source, version)
+            if self.conn is None:
+                self._memory[(source, key)] = (version, data)
+                return
+            self.conn.execute(
+                "INSERT OR REPLACE INTO parsed_records (source, content_hash, version, record, parsed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (source, key, version, data, time.time())
+            )
+            self.conn.commit()
@@ -0,0 +1,37 @@
+"""Пул процессов для разбора HTML отдельно от сетевых потоков"""
+import os
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Callable, Optional
+
+
+class ParsePool:
+    """
+    Пул процессов для CPU-емкого разбора страниц (BeautifulSoup + lxml, регулярные выражения).
+
+    Сетевые потоки передают в пул только байты ответа и получают обратно
+    небольшие записи (dict/tuple), поэтому разбор не держит GIL потоков загрузки
+    и масштабируется по числу ядер. Функции разбора должны быть объявлены
+    на уровне модуля, чтобы их можно было передать в другой процесс.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def submit(self, parser: Callable, *args) -> Future:
+        """Ставит разбор в очередь и возвращает Future с результатом"""
+        return self._executor.submit(parser, *args)
+
+    def run(self, parser: Callable, *args):
+        """Выполняет разбор в пуле и ждет результат"""
+        return self.submit(parser, *args).result()
+
+    def close(self):
+        """Останавливает процессы пула"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,201 @@
+"""Пул исходящих прокси: бюджет запросов, состояние прокси и закрепление за хостами"""
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from src.utils.http_client import RATE_LIMITED, BLOCKED
+
+
+# Бюджет одного прокси: запросов в секунду к одному хосту и запас для всплеска
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 2
+# Подряд идущих сбоев прокси (соединение с ним), после которых он отключается, и на сколько (секунды)
+FAILURE_THRESHOLD = 3
+PROXY_COOLDOWN = 60.0
+# Пауза для адреса прокси на хосте после 429 без Retry-After и после блокировки (секунды)
+RATE_LIMIT_COOLDOWN = 5.0
+BLOCK_COOLDOWN = 600.0
+# Сколько ждать свободный прокси, прежде чем отказаться от запроса (секунды)
+MAX_WAIT = 30.0
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше burst про запас"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Забирает токен (в долг, если их нет) и возвращает, сколько секунд ждать его появления"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class EgressProxy:
+    """Один исходящий прокси: свои ведра токенов по хостам, счетчики и паузы"""
+
+    def __init__(self, url: str, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.url = url
+        self.rate = rate
+        self.burst = burst
+        # Аргумент proxies для requests
+        self.proxies = {'http': url, 'https': url}
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0
+        self.disabled_until = 0.0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._host_paused: Dict[str, float] = {}
+
+    def available_at(self, host: str) -> float:
+        """Момент (time.monotonic), с которого прокси можно использовать для хоста"""
+        return max(self.disabled_until, self._host_paused.get(host, 0.0))
+
+    def reserve(self, host: str, now: float) -> float:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        self.requests += 1
+        return bucket.reserve(now)
+
+    def pause_host(self, host: str, seconds: float):
+        self._host_paused[host] = max(self._host_paused.get(host, 0.0), time.monotonic() + seconds)
+
+    def __repr__(self):
+        return f"EgressProxy({self.url})"
+
+
+class ProxyPool:
+    """
+    Пул исходящих прокси с бюджетом запросов у каждого.
+
+    Ограничения источников действуют на один IP-адрес: у каждого прокси свое
+    ведро токенов на каждый хост (rate запросов в секунду), поэтому общая
+    скорость растет с числом прокси. За парой (хост, поток) закрепляется один
+    прокси - последовательные запросы одного поиска (страница поиска, карточка)
+    идут с одного адреса, а разные потоки распределяются по прокси поровну.
+
+    Прокси, с которым не удается соединиться FAILURE_THRESHOLD раз подряд,
+    отключается на PROXY_COOLDOWN секунд. Ответ 429 или блокировка ставят на
+    паузу только этот прокси и только для этого хоста - запрос сразу
+    повторяется через другой.
+    """
+
+    def __init__(self, urls: List[str], rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        if not urls:
+            raise ValueError("Пул прокси пуст")
+        self.proxies = [EgressProxy(url, rate, burst) for url in urls]
+        self._sticky: Dict[Tuple[str, int], EgressProxy] = {}
+        self._lock = threading.Lock()
+
+    def _pick(self, host: str, now: float) -> Optional[EgressProxy]:
+        """Закрепленный за (хост, поток) прокси или наименее загруженный доступный"""
+        key = (host, threading.get_ident())
+        proxy = self._sticky.get(key)
+        if proxy is not None and proxy.available_at(host) <= now:
+            return proxy
+
+        candidates = [p for p in self.proxies if p.available_at(host) <= now]
+        if not candidates:
+            return None
+        # Меньше всего потоков на этом хосте, при равенстве - меньше всего запросов вообще
+        # (иначе все новые хосты, например сайты компаний, достались бы первому прокси)
+        load = Counter(p.url for (sticky_host, _), p in self._sticky.items() if sticky_host == host)
+        proxy = min(candidates, key=lambda p: (load[p.url], p.requests))
+        self._sticky[key] = proxy
+        return proxy
+
+    def acquire(self, url: str, max_wait: float = MAX_WAIT,
+                deadline_at: Optional[float] = None) -> Optional[EgressProxy]:
+        """
+        Выбирает прокси для запроса к url и ждет токен в его ведре.
+
+        None - все прокси для этого хоста отключены или на паузе дольше max_wait
+        (или дольше срока deadline_at по time.monotonic).
+        """
+        host = urlparse(url).netloc.lower()
+        give_up_at = time.monotonic() + max_wait
+        if deadline_at is not None:
+            give_up_at = min(give_up_at, deadline_at)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                proxy = self._pick(host, now)
+                if proxy is not None:
+                    wait = proxy.reserve(host, now)
+                else:
+                    wait = min(p.available_at(host) for p in self.proxies) - now
+            if proxy is not None:
+                if wait > 0:
+                    time.sleep(wait)
+                return proxy
+            if now + wait > give_up_at:
+                return None
+            time.sleep(wait)
+
+    def record(self, proxy: EgressProxy, url: str, status: str,
+               retry_after: Optional[float] = None, proxy_failed: bool = False) -> bool:
+        """
+        Учитывает результат запроса через прокси.
+
+        Returns:
+            True, если отказ относится к прокси (он недоступен, его адрес
+            ограничен или заблокирован хостом) - запрос стоит повторить через другой
+        """
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if proxy_failed:
+                proxy.errors += 1
+                proxy.failures += 1
+                if proxy.failures >= FAILURE_THRESHOLD:
+                    proxy.disabled_until = time.monotonic() + PROXY_COOLDOWN
+                    proxy.failures = 0
+                    print(f"      ⚠ Прокси {proxy.url} временно отключен на {PROXY_COOLDOWN:.0f} с")
+                return True
+
+            proxy.failures = 0
+            if status == RATE_LIMITED:
+                proxy.errors += 1
+                proxy.pause_host(host, retry_after if retry_after is not None else RATE_LIMIT_COOLDOWN)
+                return True
+            if status == BLOCKED:
+                proxy.errors += 1
+                proxy.pause_host(host, max(BLOCK_COOLDOWN, retry_after or 0.0))
+                return True
+        return False
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Запросы и отказы по прокси"""
+        with self._lock:
+            return {p.url: {'requests': p.requests, 'errors': p.errors} for p in self.proxies}
+
+    def report(self):
+        """Печатает запросы и отказы по прокси"""
+        for url, counts in self.stats().items():
+            print(f"   {url}: запросов {counts['requests']}, отказов {counts['errors']}")
+
+
+_pool: Optional[ProxyPool] = None
+_pool_lock = threading.Lock()
+
+
+def pool_from_env() -> Optional[ProxyPool]:
+    """
+    Общий для процесса пул из EGRESS_PROXIES ("http://10.0.0.1:3128,http://10.0.0.2:3128")
+    с бюджетом PROXY_RATE запросов в секунду на хост; None - прокси не заданы
+    """
+    global _pool
+    urls = [u.strip() for u in os.environ.get('EGRESS_PROXIES', '').split(',') if u.strip()]
+    if not urls:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProxyPool(urls, rate=float(os.environ.get('PROXY_RATE') or DEFAULT_RATE))
+        return _pool
@@ -0,0 +1,196 @@
+"""Компактный бинарный индекс выручки по ИНН (memory-mapped)"""
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.utils.helpers import normalize_inn
+
+
+# Заголовок: сигнатура, версия формата, количество записей
+HEADER = struct.Struct('<4sHxxI')
+MAGIC = b'RVIX'
+VERSION = 1
+
+# Запись фиксированной ширины: ИНН (12 байт, дополнен пробелами), год, выручка в рублях
+RECORD = struct.Struct('<12sHq')
+KEY_SIZE = 12
+
+# Сколько записей сортировать в памяти, прежде чем сбросить отсортированную часть на диск
+RUN_SIZE = 1_000_000
+
+
+def _make_key(inn: str) -> bytes:
+    """Приводит ИНН к ключу фиксированной ширины"""
+    return inn.encode('ascii').ljust(KEY_SIZE, b' ')
+
+
+def _write_run(rows: Dict[Tuple[bytes, int], int], directory: str) -> str:
+    """Сбрасывает отсортированную часть записей во временный файл"""
+    fd, run_path = tempfile.mkstemp(suffix='.run', dir=directory or None)
+    with os.fdopen(fd, 'wb') as f:
+        for (key, year), revenue in sorted(rows.items()):
+            f.write(RECORD.pack(key, year, revenue))
+    return run_path
+
+
+def _read_run(run_path: str, run_number: int) -> Iterator[Tuple[bytes, int, int, int]]:
+    """Записи временного файла: (ключ, год, номер части, выручка)"""
+    block_size = RECORD.size * 4096
+    with open(run_path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            for key, year, revenue in RECORD.iter_unpack(block):
+                yield key, year, run_number, revenue
+
+
+def build_revenue_index(records: Iterable[Tuple[str, int, int]], path: str,
+                        run_size: int = RUN_SIZE) -> int:
+    """
+    Строит индекс из записей (ИНН, год, выручка) любого массового источника.
+
+    Записи сортируются по ключу и году, поэтому поиск по индексу - бинарный.
+    При повторе пары (ИНН, год) остается последнее значение. Сортировка
+    внешняя: по run_size записей сортируются в памяти и сбрасываются во
+    временные файлы, которые затем сливаются, - память не зависит от размера
+    выгрузки.
+
+    Returns:
+        количество записей в индексе
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    run_paths: List[str] = []
+    rows = {}
+    try:
+        for inn, year, revenue in records:
+            inn = normalize_inn(inn)
+            if not inn or revenue is None or not year:
+                continue
+            rows[(_make_key(inn), int(year))] = int(revenue)
+            if len(rows) >= run_size:
+                run_paths.append(_write_run(rows, directory))
+                rows = {}
+        if rows or not run_paths:
+            run_paths.append(_write_run(rows, directory))
+        rows = {}
+
+        # При равных (ключ, год) более поздняя часть идет последней - ее значение и остается
+        merged = heapq.merge(*(_read_run(run_path, number) for number, run_path in enumerate(run_paths)))
+        count = 0
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0))
+            pending = None
+            for key, year, _, revenue in merged:
+                if pending is not None and pending[:2] != (key, year):
+                    f.write(RECORD.pack(*pending))
+                    count += 1
+                pending = (key, year, revenue)
+            if pending is not None:
+                f.write(RECORD.pack(*pending))
+                count += 1
+            # Число записей известно только после слияния
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, count))
+        os.replace(tmp_path, path)
+    finally:
+        for run_path in run_paths:
+            os.remove(run_path)
+
+    return count
+
+
+class RevenueIndex:
+    """Индекс выручки по ИНН, отображенный в память; поиск за O(log n)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Неподдерживаемый формат индекса выручки: {path}")
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Закрывает отображение файла"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def _key_at(self, position: int) -> bytes:
+        offset = HEADER.size + position * RECORD.size
+        return self._mm[offset:offset + KEY_SIZE]
+
+    def _lower_bound(self, key: bytes) -> int:
+        """Позиция первой записи с ключом >= key"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def revenue_by_year(self, inn: Optional[str]) -> Dict[int, int]:
+        """Возвращает выручку компании по годам"""
+        inn = normalize_inn(inn)
+        if not inn:
+            return {}
+
+        key = _make_key(inn)
+        result = {}
+        position = self._lower_bound(key)
+        while position < self._count:
+            record_key, year, revenue = RECORD.unpack_from(self._mm, HEADER.size + position * RECORD.size)
+            if record_key != key:
+                break
+            result[year] = revenue
+            position += 1
+        return result
+
+    def latest_revenue(self, inn: Optional[str]) -> Optional[int]:
+        """Выручка за последний доступный год"""
+        by_year = self.revenue_by_year(inn)
+        if not by_year:
+            return None
+        return by_year[max(by_year)]
+
+    def meets_threshold(self, inn: Optional[str], min_revenue: int) -> Optional[bool]:
+        """True/False, если выручка известна, иначе None"""
+        revenue = self.latest_revenue(inn)
+        if revenue is None:
+            return None
+        return revenue >= min_revenue
+
+    def prescreen(self, names: Iterable[str], min_revenue: int) -> Iterator[str]:
+        """
+        Отсеивает без сетевых запросов ИНН, выручка которых по индексу ниже порога.
+
+        Названия и ИНН, которых нет в индексе, проходят: их выручку можно
+        узнать только из источников.
+        """
+        for name in names:
+            inn = name.strip()
+            if inn.isdigit() and self.meets_threshold(inn, min_revenue) is False:
+                continue
+            yield name
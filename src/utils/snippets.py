@@ -0,0 +1,82 @@
+"""Извлечение неполных записей о компаниях из фрагментов страниц поиска"""
+import re
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from src.utils.helpers import normalize_inn, parse_revenue_text
+
+
+ORG_NAME_RE = re.compile(r'((?:ООО|АО|ЗАО|ОАО|ПАО|НАО|АНО|НКО|ФГУП|МУП|ИП)\s*["«][^"»]{1,150}["»])')
+INN_IN_URL_RE = re.compile(r'/inn/(\d{10,12})')
+INN_IN_TEXT_RE = re.compile(r'ИНН\D{0,5}(\d{10,12})', re.IGNORECASE)
+OKVED_RE = re.compile(r'(?<![\d.])(\d{2}\.\d{2}(?:\.\d{1,2})?)(?![\d.])')
+
+
+# Окно после ссылки на компанию, в котором ищутся ИНН, название, ОКВЭД, выручка
+SNIPPET_RADIUS = 500
+
+
+def iter_result_windows(pattern: str, html_text: str,
+                        radius: int = SNIPPET_RADIUS) -> Iterator[Tuple['re.Match', str]]:
+    """
+    Ссылки на компании на странице поиска и HTML карточки каждого результата.
+
+    Карточка начинается со ссылки и заканчивается на ссылке следующего
+    результата (но не дальше radius символов), иначе ИНН одной компании
+    окажется рядом с названием и ОКВЭД соседней. Повторная ссылка на ту же
+    компанию (название и "подробнее") карточку не обрывает.
+    """
+    matches = list(re.finditer(pattern, html_text, re.IGNORECASE))
+    for i, match in enumerate(matches):
+        end_pos = min(len(html_text), match.end() + radius)
+        for following in matches[i + 1:]:
+            if following.start() >= end_pos:
+                break
+            if following.group(1) != match.group(1):
+                end_pos = following.start()
+                break
+        yield match, html_text[match.start():end_pos]
+
+
+def parse_search_snippet(snippet: str, url: str, source: str) -> Optional[Dict]:
+    """
+    Строит неполную запись о компании по фрагменту результата поиска.
+
+    Из фрагмента берутся ИНН (из ссылки или текста), название, ОКВЭД и выручка,
+    если они показаны в карточке. В записи сохраняется detail_url, чтобы
+    недостающие поля можно было дозагрузить с детальной страницы позже.
+    """
+    if not snippet:
+        return None
+
+    inn = None
+    inn_match = INN_IN_URL_RE.search(url) or INN_IN_TEXT_RE.search(snippet)
+    if inn_match:
+        inn = normalize_inn(inn_match.group(1))
+
+    name_match = ORG_NAME_RE.search(snippet)
+    if name_match:
+        name = name_match.group(1).strip()
+    elif len(snippet) <= 150:
+        # Фрагмент из текста ссылки - это и есть название
+        name = snippet.strip()
+    else:
+        name = None
+
+    if not inn or not name:
+        return None
+
+    okved_match = OKVED_RE.search(snippet)
+    return {
+        'inn': inn,
+        'name': name,
+        'revenue': parse_revenue_text(snippet),
+        'site': None,
+        'employees': None,
+        'okved_main': okved_match.group(1) if okved_match else None,
+        'source': source,
+        'detail_url': url,
+    }
+
+
+def missing_fields(company: Dict, fields: Iterable[str]) -> list:
+    """Поля из списка, которые в записи пусты"""
+    return [field for field in fields if not company.get(field)]
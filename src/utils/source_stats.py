@@ -0,0 +1,135 @@
+"""Скользящая статистика источников каскадного поиска и порядок их опроса"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+
+# Сколько последних попыток поиска по каждому источнику учитывается
+WINDOW = 200
+# До стольких попыток статистике источника не доверяем
+MIN_SAMPLES = 20
+# Источник с такой долей ошибок/блокировок пропускается...
+SKIP_ERROR_RATE = 0.5
+# ...кроме каждой PROBE_EVERY-й компании - чтобы заметить, что он снова работает
+PROBE_EVERY = 20
+# Оценки до накопления статистики: вероятность найти компанию и время поиска (секунды)
+PRIOR_HIT_RATE = 0.5
+PRIOR_LATENCY = 2.0
+# Статистика старше суток при запуске не загружается
+MAX_AGE = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_stats (
+    source TEXT PRIMARY KEY,
+    outcomes TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class SourceStats:
+    """
+    Доля найденных компаний, медианное время поиска и доля ошибок по источникам.
+
+    По каждому источнику хранятся последние WINDOW попыток (найдено, ошибка,
+    время). Порядок опроса (order) выбирается так, чтобы минимизировать
+    ожидаемое время до успешного поиска: источники сортируются по отношению
+    p50 времени к вероятности найти компанию. Источник, который сейчас
+    в основном отвечает ошибками (блокировка, 5xx), пропускается и опрашивается
+    только для каждой PROBE_EVERY-й компании.
+
+    С path статистика сохраняется в SQLite (save) и загружается при следующем запуске.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._outcomes: Dict[str, deque] = {}
+        self._calls = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            conn = sqlite3.connect(path, timeout=30)
+            conn.executescript(SCHEMA)
+            oldest = time.time() - MAX_AGE
+            for source, outcomes, updated in conn.execute(
+                    "SELECT source, outcomes, updated FROM source_stats"):
+                if updated >= oldest:
+                    self._outcomes[source] = deque(
+                        (tuple(o) for o in json.loads(outcomes)), maxlen=WINDOW
+                    )
+            conn.close()
+
+    def record(self, source: str, found: bool, error: bool, latency: float):
+        """Учитывает попытку поиска компании на источнике"""
+        with self._lock:
+            outcomes = self._outcomes.setdefault(source, deque(maxlen=WINDOW))
+            outcomes.append((bool(found), bool(error), round(latency, 3)))
+
+    def summary(self, source: str) -> Dict:
+        """{'samples', 'hit_rate', 'error_rate', 'p50'} по последним попыткам"""
+        with self._lock:
+            outcomes = list(self._outcomes.get(source, ()))
+        samples = len(outcomes)
+        hits = sum(1 for found, _, _ in outcomes if found)
+        errors = sum(1 for _, error, _ in outcomes if error)
+        latencies = sorted(latency for _, _, latency in outcomes)
+        return {
+            'samples': samples,
+            # Сглаживание к априорной оценке, пока попыток мало
+            'hit_rate': (hits + PRIOR_HIT_RATE * MIN_SAMPLES) / (samples + MIN_SAMPLES),
+            'error_rate': errors / samples if samples else 0.0,
+            'p50': latencies[len(latencies) // 2] if latencies else PRIOR_LATENCY,
+        }
+
+    def order(self, collectors: Sequence) -> List:
+        """
+        Коллекторы (по SOURCE) в порядке опроса для очередной компании.
+
+        При равных оценках сохраняется переданный порядок, поэтому без
+        статистики каскад остается прежним.
+        """
+        with self._lock:
+            self._calls += 1
+            probe = self._calls % PROBE_EVERY == 0
+
+        scored = []
+        for position, collector in enumerate(collectors):
+            stats = self.summary(collector.SOURCE)
+            blocked = stats['samples'] >= MIN_SAMPLES and stats['error_rate'] >= SKIP_ERROR_RATE
+            if blocked and not probe:
+                continue
+            # Ожидаемая "цена" источника: время попытки / вероятность успеха
+            p50 = stats['p50'] if stats['samples'] >= MIN_SAMPLES else PRIOR_LATENCY
+            cost = p50 / max(stats['hit_rate'] * (1 - stats['error_rate']), 0.01)
+            scored.append((blocked, cost, position, collector))
+        scored.sort(key=lambda item: item[:3])
+        return [collector for _, _, _, collector in scored]
+
+    def report(self):
+        """Печатает статистику источников"""
+        with self._lock:
+            sources = sorted(self._outcomes)
+        for source in sources:
+            stats = self.summary(source)
+            print(f"   {source}: попыток {stats['samples']}, найдено {stats['hit_rate']:.0%}, "
+                  f"ошибок {stats['error_rate']:.0%}, p50 {stats['p50']:.2f} с")
+
+    def save(self):
+        """Сохраняет статистику в SQLite (если задан path)"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            rows = [(source, json.dumps(list(outcomes)), time.time())
+                    for source, outcomes in self._outcomes.items()]
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT OR REPLACE INTO source_stats (source, outcomes, updated) VALUES (?, ?, ?)",
+                         rows)
+        conn.commit()
+        conn.close()
@@ -0,0 +1,161 @@
+"""Очередь заданий на SQLite с арендой (lease), повторами и сбором результатов"""
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+
+# Состояния задания
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+# Виды заданий
+LOOKUP = 'lookup'
+SITE_CHECK = 'site_check'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated REAL,
+    UNIQUE (kind, payload)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_kind_status ON tasks (kind, status, lease_expires);
+"""
+
+
+class WorkQueue:
+    """
+    Очередь заданий в файле SQLite.
+
+    Воркер берет задание в аренду на lease_seconds; если он не успел отчитаться
+    (упал процесс, пропала сеть), задание снова становится доступным другим
+    воркерам. После max_attempts неудачных попыток задание помечается failed.
+
+    Очередь рассчитана на процессы одной машины: журнал WAL использует общую
+    память, которой нет у сетевых файловых систем (NFS, SMB), - файл очереди
+    на общем диске может быть поврежден. Разные исходящие IP для воркеров
+    дает пул прокси (EGRESS_PROXIES), а не несколько машин.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Транзакции открываем явно (BEGIN IMMEDIATE), чтобы аренда была атомарной
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        # WAL - читатели не ждут писателей; работает только на локальном диске
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, kind: str, payloads: Iterable[str]) -> int:
+        """Добавляет задания; повторяющиеся (kind, payload) пропускаются. Возвращает число новых"""
+        now = time.time()
+        before = self.conn.total_changes
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tasks (kind, payload, updated) VALUES (?, ?, ?)",
+                ((kind, payload, now) for payload in payloads)
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return self.conn.total_changes - before
+
+    def lease(self, kind: str, owner: str) -> Optional[Tuple[int, str]]:
+        """Берет в аренду следующее доступное задание: (id, payload) или None"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Просроченные аренды без оставшихся попыток больше не выдаем
+            self.conn.execute(
+                """
+                UPDATE tasks SET status = ?, error = 'lease expired', updated = ?
+                WHERE kind = ? AND status = ? AND lease_expires < ? AND attempts >= ?
+                """,
+                (FAILED, now, kind, LEASED, now, self.max_attempts)
+            )
+            row = self.conn.execute(
+                """
+                SELECT id, payload FROM tasks
+                WHERE kind = ? AND (status = ? OR (status = ? AND lease_expires < ?))
+                ORDER BY id LIMIT 1
+                """,
+                (kind, PENDING, LEASED, now)
+            ).fetchone()
+            if row:
+                self.conn.execute(
+                    """
+                    UPDATE tasks SET status = ?, lease_owner = ?, lease_expires = ?,
+                        attempts = attempts + 1, updated = ?
+                    WHERE id = ?
+                    """,
+                    (LEASED, owner, now + self.lease_seconds, now, row[0])
+                )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return (row[0], row[1]) if row else None
+
+    def complete(self, task_id: int, owner: str, result) -> bool:
+        """Сохраняет результат; False, если аренда уже перешла к другому воркеру"""
+        cursor = self.conn.execute(
+            """
+            UPDATE tasks SET status = ?, result = ?, error = NULL, lease_owner = NULL, updated = ?
+            WHERE id = ? AND status = ? AND lease_owner = ?
+            """,
+            (DONE, json.dumps(result, ensure_ascii=False), time.time(), task_id, LEASED, owner)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, task_id: int, owner: str, error: str) -> bool:
+        """Отмечает неудачную попытку: задание вернется в очередь, пока есть попытки"""
+        cursor = self.conn.execute(
+            """
+            UPDATE tasks
+            SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                error = ?, lease_owner = NULL, lease_expires = NULL, updated = ?
+            WHERE id = ? AND status = ? AND lease_owner = ?
+            """,
+            (self.max_attempts, FAILED, PENDING, error, time.time(), task_id, LEASED, owner)
+        )
+        return cursor.rowcount == 1
+
+    def results(self, kind: str) -> Iterator[Tuple[str, object]]:
+        """Перебирает (payload, результат) выполненных заданий"""
+        rows = self.conn.execute(
+            "SELECT payload, result FROM tasks WHERE kind = ? AND status = ? ORDER BY id",
+            (kind, DONE)
+        )
+        for payload, result in rows:
+            yield payload, json.loads(result)
+
+    def stats(self, kind: Optional[str] = None) -> Dict[str, int]:
+        """Количество заданий по состояниям"""
+        if kind:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE kind = ? GROUP BY status", (kind,)
+            )
+        else:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status")
+        return dict(rows.fetchall())
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Тесты импортируют модули как src.* (как и скрипты запуска)
+sys.path.insert(0, str(Path(__file__).parent.parent))
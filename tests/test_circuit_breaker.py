@@ -0,0 +1,151 @@
+import io
+import time
+
+import requests
+
+from src.utils import http_client
+from src.utils.http_client import (
+    BLOCKED, NOT_FOUND, OK, RATE_LIMITED, SERVER_ERROR, CircuitBreaker, fetch_with_retry,
+    get_breaker, parse_retry_after,
+)
+
+
+class FakeRaw(io.BytesIO):
+    def read1(self, size=-1, decode_content=False):
+        return super().read1(size)
+
+
+class ScriptedSession:
+    """Сессия, отвечающая заранее заданными кодами: [(код, Retry-After или None), ...]"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        status_code, retry_after = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = status_code
+        response.url = url
+        response.headers['Content-Type'] = 'text/html'
+        if retry_after is not None:
+            response.headers['Retry-After'] = retry_after
+        response.raw = FakeRaw(b'<html></html>')
+        return response
+
+
+def record_sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_client, 'sleep_scaled', sleeps.append)
+    return sleeps
+
+
+def test_breaker_opens_after_failure_threshold():
+    breaker = CircuitBreaker('threshold.test', failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure(SERVER_ERROR)
+        assert breaker.allow_request()
+    breaker.record_failure(SERVER_ERROR)
+    assert breaker.is_open
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker('reset.test', failure_threshold=2)
+    breaker.record_failure(SERVER_ERROR)
+    breaker.record_success()
+    breaker.record_failure(SERVER_ERROR)
+    assert breaker.allow_request()
+
+
+def test_block_opens_breaker_at_once_for_retry_after():
+    breaker = CircuitBreaker('blocked.test', failure_threshold=5, reset_timeout=60)
+    breaker.record_failure(BLOCKED, retry_after=600)
+    assert not breaker.allow_request()
+    assert breaker.open_until - time.monotonic() > 500
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker('probe.test', failure_threshold=1, reset_timeout=60)
+    breaker.record_failure(SERVER_ERROR)
+    breaker.open_until = time.monotonic() - 1
+
+    assert breaker.allow_request()
+    # Пока пробный запрос не завершен, остальные не пропускаются
+    assert not breaker.allow_request()
+
+    breaker.record_failure(SERVER_ERROR)
+    assert breaker.is_open and not breaker.half_open
+
+    breaker.open_until = time.monotonic() - 1
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_retries_use_exponential_backoff(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    session = ScriptedSession([(503, None), (503, None), (200, None)])
+
+    result = fetch_with_retry(session, 'http://backoff.test/', max_retries=3, backoff_base=1.0)
+
+    assert result.status == OK
+    assert session.calls == 3
+    # Задержка backoff_base * 2^attempt со случайным разбросом 0.5-1.0
+    assert 0.5 <= sleeps[0] <= 1.0
+    assert 1.0 <= sleeps[1] <= 2.0
+    assert get_breaker('http://backoff.test/').failures == 0
+
+
+def test_retry_after_is_honored(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    session = ScriptedSession([(429, '7'), (200, None)])
+
+    result = fetch_with_retry(session, 'http://retry-after.test/', max_retries=2)
+
+    assert result.status == OK
+    assert sleeps == [7.0]
+
+
+def test_long_retry_after_is_not_waited_for(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    session = ScriptedSession([(429, '120')])
+
+    result = fetch_with_retry(session, 'http://retry-after-long.test/', max_retries=3, backoff_max=30)
+
+    assert result.status == RATE_LIMITED
+    assert result.retry_after == 120
+    assert session.calls == 1
+    assert sleeps == []
+
+
+def test_not_found_is_not_retried(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    session = ScriptedSession([(404, None)])
+
+    result = fetch_with_retry(session, 'http://not-found.test/', max_retries=3)
+
+    assert result.status == NOT_FOUND
+    assert session.calls == 1
+    assert sleeps == []
+
+
+def test_repeated_failures_open_breaker_for_later_fetches(monkeypatch):
+    record_sleeps(monkeypatch)
+    url = 'http://down.test/'
+    session = ScriptedSession([(503, None)])
+
+    fetch_with_retry(session, url, max_retries=get_breaker(url).failure_threshold - 1)
+
+    assert get_breaker(url).is_open
+    calls = session.calls
+    assert fetch_with_retry(session, url).status == http_client.CIRCUIT_OPEN
+    assert session.calls == calls
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('15') == 15.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('garbage') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
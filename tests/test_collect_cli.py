@@ -0,0 +1,44 @@
+import time
+
+from src import main as main_module
+
+
+def run_collect_stage(monkeypatch, tmp_path, env, argv=()):
+    """Запускает этап collect с заглушкой поиска и возвращает переданные ему аргументы"""
+    for name in ('TIME_BUDGET', 'RUN_DEADLINE'):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    received = {}
+
+    def fake_run_collect(collectors, **kwargs):
+        received.update(kwargs)
+        return []
+
+    monkeypatch.setattr(main_module, 'run_collect', fake_run_collect)
+    monkeypatch.setattr(main_module, 'create_collectors', lambda parse_pool: [])
+    monkeypatch.setattr(main_module, 'create_parse_pool', lambda: None)
+    monkeypatch.setattr(main_module, 'open_revenue_index', lambda: None)
+    main_module.main(['collect', '--output', str(tmp_path / 'collected.jsonl'), *argv])
+    return received
+
+
+def test_collect_reads_time_limits_from_env(monkeypatch, tmp_path):
+    started = time.monotonic()
+    received = run_collect_stage(monkeypatch, tmp_path, {'TIME_BUDGET': '120', 'RUN_DEADLINE': '1000'})
+
+    assert received['time_budget'] == 120
+    # На поиск отводится та же доля срока запуска, что и в полном прогоне
+    expected = started + 1000 * main_module.COLLECT_SHARE
+    assert expected <= received['deadline'] <= expected + 5
+
+
+def test_collect_without_limits(monkeypatch, tmp_path):
+    received = run_collect_stage(monkeypatch, tmp_path, {})
+    assert received['time_budget'] is None
+    assert received['deadline'] is None
+
+
+def test_collect_arguments_override_env(monkeypatch, tmp_path):
+    received = run_collect_stage(monkeypatch, tmp_path, {'TIME_BUDGET': '120'}, ['--time-budget', '30'])
+    assert received['time_budget'] == 30
@@ -0,0 +1,60 @@
+import gzip
+import io
+
+import pytest
+
+from src.utils.http_client import CHUNK_SIZE, OK, TOO_LARGE, StreamDecoder, read_body
+
+
+BODY = b'<html>' + b'0' * (4 * 1024 * 1024) + b'</html>'
+
+
+class FakeRaw:
+    def __init__(self, data: bytes):
+        self._stream = io.BytesIO(data)
+
+    def read1(self, size, decode_content=False):
+        return self._stream.read(size)
+
+
+class FakeResponse:
+    status_code = 200
+    url = 'http://example.test/page'
+
+    def __init__(self, data: bytes, encoding: str):
+        self.headers = {'Content-Encoding': encoding}
+        self.raw = FakeRaw(data)
+
+    def close(self):
+        pass
+
+
+def compress(encoding: str, data: bytes) -> bytes:
+    if encoding == 'gzip':
+        return gzip.compress(data)
+    if encoding == 'br':
+        return pytest.importorskip('brotli').compress(data)
+    return pytest.importorskip('zstandard').ZstdCompressor().compress(data)
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br', 'zstd'])
+def test_small_body_expanding_past_limit_is_too_large(encoding):
+    compressed = compress(encoding, BODY)
+    assert len(compressed) < 64 * 1024
+    result = read_body(FakeResponse(compressed, encoding), max_bytes=1024 * 1024, deadline_at=None)
+    assert result.status == TOO_LARGE
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br', 'zstd'])
+def test_decoded_pieces_are_bounded(encoding):
+    # Весь сжатый ответ одним фрагментом - распаковка все равно идет частями
+    pieces = list(StreamDecoder(encoding).decode(iter([compress(encoding, BODY)])))
+    # Лимит выхода brotli мягкий - буфер может вырасти чуть больше CHUNK_SIZE
+    assert max(len(piece) for piece in pieces) <= 2 * CHUNK_SIZE
+    assert b''.join(pieces) == BODY
+
+
+def test_body_within_limit_is_decoded():
+    result = read_body(FakeResponse(gzip.compress(BODY), 'gzip'), max_bytes=8 * 1024 * 1024, deadline_at=None)
+    assert result.status == OK
+    assert result.content == BODY
@@ -0,0 +1,62 @@
+import io
+import time
+
+import requests
+
+from src.utils.http_client import OUT_OF_TIME, SERVER_ERROR, FetchResult, fetch_with_retry, get_breaker
+
+
+class FailingSession:
+    """Сессия, у которой каждый запрос заканчивается 503 с Retry-After: 1"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        response.url = url
+        response.raw = io.BytesIO(b'')
+        return response
+
+
+def test_retries_stop_at_deadline():
+    session = FailingSession()
+    started = time.monotonic()
+    result = fetch_with_retry(session, 'http://deadline-retry.test/', max_retries=5,
+                              deadline_at=time.monotonic() + 0.5)
+
+    # Пауза перед повтором (1 с) дольше оставшегося срока - повторов нет
+    assert result.status == SERVER_ERROR
+    assert session.calls == 1
+    assert time.monotonic() - started < 0.5
+
+
+def test_expired_deadline_makes_no_request():
+    session = FailingSession()
+    result = fetch_with_retry(session, 'http://deadline-expired.test/', deadline_at=time.monotonic() - 1)
+    assert result.status == OUT_OF_TIME
+    assert session.calls == 0
+    assert get_breaker('http://deadline-expired.test/').failures == 0
+
+
+def test_collector_fetch_uses_search_deadline(monkeypatch):
+    from src.collectors import base_collector
+    from src.collectors.company_searcher import CompanySearcher
+
+    seen = []
+
+    def fake_fetch(session, url, **kwargs):
+        seen.append(kwargs.get('deadline_at'))
+        return FetchResult(OUT_OF_TIME)
+
+    monkeypatch.setattr(base_collector, 'fetch_with_retry', fake_fetch)
+    monkeypatch.setattr(base_collector, 'sleep_random', lambda *args: None)
+    searcher = CompanySearcher(base_url='http://deadline-collector.test')
+    deadline = time.monotonic() + 30
+    searcher.search_one_company('ООО Альфа', deadline=deadline)
+
+    assert seen and all(d == deadline for d in seen)
+    assert searcher.fetch_deadline is None
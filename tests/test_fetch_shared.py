@@ -0,0 +1,53 @@
+from src.utils.http_client import (
+    HTML_CONTENT_TYPES, JSON_CONTENT_TYPES, OK, FetchResult, RecentResults, fetch_shared,
+)
+
+
+def test_original_url_is_fetched():
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return FetchResult(OK, content=b'{}')
+
+    url = 'http://shared.test/nbo/organizations/1/bfo/?from=20&page=2'
+    fetch_shared(url, fetch, JSON_CONTENT_TYPES)
+    assert fetched == [url]
+
+
+def test_same_canonical_url_is_fetched_once():
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return FetchResult(OK, content=b'<html></html>')
+
+    fetch_shared('http://shared.test/company/1?utm_source=x', fetch, HTML_CONTENT_TYPES)
+    fetch_shared('http://SHARED.test/company/1', fetch, HTML_CONTENT_TYPES)
+    assert fetched == ['http://shared.test/company/1?utm_source=x']
+
+
+def test_allowed_types_are_part_of_the_key():
+    def fetch_html(url):
+        return FetchResult(OK, content=b'<html></html>')
+
+    def fetch_json(url):
+        return FetchResult(OK, content=b'{}')
+
+    url = 'http://shared.test/both'
+    assert fetch_shared(url, fetch_html, HTML_CONTENT_TYPES).content == b'<html></html>'
+    assert fetch_shared(url, fetch_json, JSON_CONTENT_TYPES).content == b'{}'
+
+
+def test_recent_results_are_capped_by_total_bytes():
+    cache = RecentResults(max_size=100, max_bytes=1000)
+    for i in range(5):
+        cache.put(f'url{i}', FetchResult(OK, content=b'x' * 400))
+    assert cache.total_bytes <= 1000
+    assert cache.get('url0') is None
+    assert cache.get('url4') is not None
+
+    # Тело больше всего кеша не запоминается
+    cache.put('huge', FetchResult(OK, content=b'x' * 2000))
+    assert cache.get('huge') is None
+    assert cache.total_bytes <= 1000
@@ -0,0 +1,53 @@
+import io
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from src.collectors import fns_dump_collector
+from src.collectors.fns_dump_collector import FnsDumpCollector, import_fns_dumps, iter_xml_records
+
+
+def dump_xml(count: int) -> bytes:
+    documents = ''.join(
+        f'<Документ ДатаСост="01.08.2024"><СвНП НаимОрг="ООО Компания {i}" ИННЮЛ="77000000{i:02d}"/>'
+        f'<СведДохРасх СумДоход="{i * 1000}"/></Документ>'
+        for i in range(count)
+    )
+    # Документы внутри промежуточного элемента, как в пакетах выгрузки
+    return f'<Файл ИдФайл="1"><Пакет>{documents}</Пакет></Файл>'.encode('utf-8')
+
+
+def test_processed_records_are_removed_from_tree(monkeypatch):
+    started = []
+    iterparse = ET.iterparse
+
+    def tracking_iterparse(source, events=None):
+        for event, elem in iterparse(source, events=events):
+            if event == 'start':
+                started.append(elem)
+            yield event, elem
+
+    monkeypatch.setattr(fns_dump_collector.ET, 'iterparse', tracking_iterparse)
+    records = list(iter_xml_records(io.BytesIO(dump_xml(5))))
+
+    assert [r['inn'] for r in records] == [f'77000000{i:02d}' for i in range(5)]
+    assert records[3]['revenue'] == '3000'
+    root = started[0]
+    assert root.tag == 'Файл'
+    assert list(root.iter('Документ')) == []
+
+
+def test_registry_collector_is_usable_from_several_threads(tmp_path):
+    dump = tmp_path / 'dump.xml'
+    dump.write_bytes(dump_xml(20))
+    db_path = str(tmp_path / 'registry.sqlite')
+    assert import_fns_dumps([str(dump)], db_path) == 20
+
+    collector = FnsDumpCollector(db_path)
+    assert collector.last_fetch_status is None
+    assert not collector.last_fetch_failed()
+
+    inns = [f'77000000{i:02d}' for i in range(20)] * 5
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        found = list(executor.map(collector.get_company_by_inn, inns))
+    assert [c['inn'] for c in found] == inns
+    assert found[3]['revenue'] == 3000
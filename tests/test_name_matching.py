@@ -0,0 +1,15 @@
+from src.utils.name_matching import accepts_name, name_similarity, MIN_NAME_SIMILARITY
+
+
+def test_neighbour_with_shared_words_is_rejected():
+    assert name_similarity('Альфа Перевод Сибирь', 'ООО "Альфа Перевод Урал"') < MIN_NAME_SIMILARITY
+    assert not accepts_name('Альфа Перевод Сибирь', 'ООО "Альфа Перевод Урал"')
+
+
+def test_exact_name_is_accepted():
+    assert accepts_name('Альфа Перевод Сибирь', 'ООО "Альфа Перевод Сибирь"')
+
+
+def test_normalized_name_is_accepted():
+    assert accepts_name('Альфа-Перевод', 'ООО "АЛЬФА ПЕРЕВОД"')
+    assert accepts_name('ООО «Перевод Альфа»', 'Альфа Перевод')
@@ -0,0 +1,17 @@
+import sqlite3
+
+from src.utils.output_sinks import SqliteSink
+
+
+def test_runs_in_the_same_second_get_distinct_ids(tmp_path, monkeypatch):
+    monkeypatch.delenv('RUN_ID', raising=False)
+    path = str(tmp_path / 'companies.sqlite')
+    first = SqliteSink(path)
+    second = SqliteSink(path)
+    assert first.run_id != second.run_id
+
+    first.write([{'inn': '7700000001', 'name': 'ООО "Альфа"'}])
+    second.write([{'inn': '7700000002', 'name': 'ООО "Бета"'}])
+    with sqlite3.connect(path) as conn:
+        runs = [row[0] for row in conn.execute('SELECT run_id FROM runs')]
+    assert sorted(runs) == sorted([first.run_id, second.run_id])
@@ -0,0 +1,32 @@
+from src.collectors.company_searcher import CompanySearcher
+from src.collectors.rusprofile_collector import RusprofileCollector
+from src.utils.parse_cache import ParsedRecordCache
+
+
+CONTENT = '<html><h1>ООО "Альфа"</h1></html>'.encode('utf-8')
+URL = 'https://www.rusprofile.ru/id/1'
+calls = []
+
+
+def searcher_parser(content, url):
+    calls.append('searcher')
+    return {'parser': 'searcher'}
+
+
+def collector_parser(content, url):
+    calls.append('collector')
+    return {'parser': 'collector'}
+
+
+def test_collectors_of_one_source_do_not_share_parsed_records():
+    cache = ParsedRecordCache()
+    searcher = CompanySearcher(parse_cache=cache)
+    collector = RusprofileCollector(parse_cache=cache)
+    assert searcher.SOURCE == collector.SOURCE
+    assert searcher.EXTRACTOR_VERSION == collector.EXTRACTOR_VERSION
+
+    assert searcher.parse_content(searcher_parser, CONTENT, URL) == {'parser': 'searcher'}
+    assert collector.parse_content(collector_parser, CONTENT, URL) == {'parser': 'collector'}
+    # Повторный разбор той же страницы тем же парсером берется из кеша
+    assert searcher.parse_content(searcher_parser, CONTENT, URL) == {'parser': 'searcher'}
+    assert calls == ['searcher', 'collector']
@@ -0,0 +1,52 @@
+import time
+
+import requests
+
+from src.utils.http_client import NETWORK_ERROR, RATE_LIMITED, fetch_with_retry, get_breaker
+from src.utils.proxy_pool import ProxyPool
+
+
+def half_open_breaker(url: str):
+    """Circuit breaker хоста, у которого вышло время отключения - следующий запрос пробный"""
+    breaker = get_breaker(url)
+    breaker.failures = breaker.failure_threshold
+    breaker.open_until = time.monotonic() - 1
+    breaker.half_open = False
+    return breaker
+
+
+def test_no_free_proxy_does_not_count_as_host_failure():
+    url = 'http://proxy-pool.test/page'
+    pool = ProxyPool(['http://127.0.0.1:9'])
+    pool.proxies[0].pause_host('proxy-pool.test', 60.0)
+
+    result = fetch_with_retry(requests.Session(), url, max_retries=0, proxy_pool=pool)
+
+    assert result.status == RATE_LIMITED
+    assert get_breaker(url).failures == 0
+
+
+def test_half_open_probe_is_released_when_no_proxy_is_free():
+    url = 'http://probe-exhausted.test/page'
+    breaker = half_open_breaker(url)
+    pool = ProxyPool(['http://127.0.0.1:9'])
+    pool.proxies[0].pause_host('probe-exhausted.test', 60.0)
+
+    result = fetch_with_retry(requests.Session(), url, max_retries=0, proxy_pool=pool)
+
+    assert result.status == RATE_LIMITED
+    assert not breaker.half_open
+    assert breaker.allow_request()
+
+
+def test_half_open_probe_is_released_when_proxy_fails():
+    url = 'http://probe-proxy-down.test/page'
+    breaker = half_open_breaker(url)
+    # На порту 9 никто не слушает - соединиться с прокси не удастся
+    pool = ProxyPool(['http://127.0.0.1:9'])
+
+    result = fetch_with_retry(requests.Session(), url, max_retries=0, proxy_pool=pool)
+
+    assert result.status == NETWORK_ERROR
+    assert not breaker.half_open
+    assert breaker.allow_request()
@@ -0,0 +1,58 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.utils.http_client import OK, TOO_SLOW, fetch_with_retry
+
+
+class SlowDripHandler(BaseHTTPRequestHandler):
+    """Отдает тело по байту раз в 50 мс - ни один read(n) не наберет n байт до конца"""
+
+    body_size = 200
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(self.body_size))
+        self.end_headers()
+        try:
+            for _ in range(self.body_size):
+                self.wfile.write(b'x')
+                self.wfile.flush()
+                time.sleep(0.05)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowDripHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_slow_drip_body_is_cut_at_deadline(slow_server):
+    started = time.monotonic()
+    result = fetch_with_retry(requests.Session(), slow_server, max_retries=0, deadline=0.5)
+    elapsed = time.monotonic() - started
+
+    assert result.status == TOO_SLOW
+    # Весь ответ шел бы 10 секунд
+    assert elapsed < 3
+
+
+def test_fast_body_within_deadline_is_read(slow_server, monkeypatch):
+    monkeypatch.setattr(SlowDripHandler, 'body_size', 5)
+    result = fetch_with_retry(requests.Session(), slow_server, max_retries=0, deadline=5)
+    assert result.status == OK
+    assert result.content == b'xxxxx'
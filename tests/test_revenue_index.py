@@ -0,0 +1,43 @@
+from src.collectors.company_searcher import CompanySearcher
+from src.utils.revenue_index import RevenueIndex, build_revenue_index
+
+
+def test_streamed_build_keeps_last_value_across_runs(tmp_path):
+    path = str(tmp_path / 'revenue.idx')
+    records = [
+        ('7700000003', 2023, 300),
+        ('7700000001', 2022, 100),
+        ('7700000001', 2023, 150),
+        ('7700000002', 2023, 5),
+        # Повтор пары (ИНН, год) в другой части - остается последнее значение
+        ('7700000001', 2023, 180),
+        ('нет ИНН', 2023, 1),
+    ]
+    assert build_revenue_index(records, path, run_size=2) == 4
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['revenue.idx']
+
+    with RevenueIndex(path) as index:
+        assert index.revenue_by_year('7700000001') == {2022: 100, 2023: 180}
+        assert index.latest_revenue('7700000003') == 300
+        assert index.latest_revenue('7700000009') is None
+
+
+def test_prescreen_drops_only_inns_known_to_be_below_threshold(tmp_path):
+    path = str(tmp_path / 'revenue.idx')
+    build_revenue_index([('7700000001', 2023, 500), ('7700000002', 2023, 5)], path)
+    with RevenueIndex(path) as index:
+        names = ['ООО Альфа', '7700000001', '7700000002', '7700000009']
+        assert list(index.prescreen(names, 100)) == ['ООО Альфа', '7700000001', '7700000009']
+
+
+def test_low_revenue_inn_is_not_looked_up(tmp_path):
+    path = str(tmp_path / 'revenue.idx')
+    build_revenue_index([('7700000001', 2023, 500), ('7700000002', 2023, 5)], path)
+    searcher = CompanySearcher()
+    looked_up = []
+    searcher.search_one_company = lambda name, *args, **kwargs: looked_up.append(name) or {'name': name}
+
+    with RevenueIndex(path) as index:
+        searcher.search_multiple_companies(['7700000001', '7700000002', 'ООО Альфа'],
+                                           revenue_index=index, min_revenue=100)
+    assert looked_up == ['7700000001', 'ООО Альфа']
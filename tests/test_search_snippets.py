@@ -0,0 +1,57 @@
+"""Фрагменты результатов поиска не должны захватывать соседние результаты"""
+from src.collectors.company_searcher import CompanySearcher
+from src.collectors.list_org_collector import ListOrgCollector
+from src.utils.helpers import make_soup
+from src.utils.snippets import iter_result_windows, parse_search_snippet
+
+
+# Два результата ближе 500 символов друг к другу, с разными названиями и ОКВЭД
+RUSPROFILE_RESULTS = (
+    '<div class="company-item"><a href="/inn/7700000001">ООО "Альфа Перевод Урал"</a>'
+    '<div>ИНН 7700000001, ОКВЭД 74.30</div></div>'
+    '<div class="company-item"><a href="/inn/7700000002">ООО "Альфа Перевод Сибирь"</a>'
+    '<div>ИНН 7700000002, ОКВЭД 62.01</div></div>'
+)
+LIST_ORG_RESULTS = (
+    '<div class="org"><a href="/company/101">ООО "Альфа Перевод Урал"</a>'
+    '<div>ИНН 7700000001, ОКВЭД 74.30</div></div>'
+    '<div class="org"><a href="/company/102">ООО "Альфа Перевод Сибирь"</a>'
+    '<div>ИНН 7700000002, ОКВЭД 62.01</div></div>'
+)
+
+
+def _page(results: str):
+    return make_soup(f'<html><body>{results}</body></html>'.encode('utf-8'))
+
+
+def test_windows_end_at_next_result():
+    windows = list(iter_result_windows(r'href=["\']?/inn/(\d{10,12})', RUSPROFILE_RESULTS))
+    records = [parse_search_snippet(window, f'https://x/inn/{m.group(1)}', 'rusprofile')
+               for m, window in windows]
+    assert [(r['inn'], r['name'], r['okved_main']) for r in records] == [
+        ('7700000001', 'ООО "Альфа Перевод Урал"', '74.30'),
+        ('7700000002', 'ООО "Альфа Перевод Сибирь"', '62.01'),
+    ]
+
+
+def test_repeated_link_does_not_cut_window():
+    html = ('<a href="/inn/7700000001">ООО "Альфа"</a> <a href="/inn/7700000001">подробнее</a>'
+            '<div>ОКВЭД 74.30</div>')
+    (_, first), (_, second) = iter_result_windows(r'href=["\']?/inn/(\d{10,12})', html)
+    assert 'ОКВЭД 74.30' in first
+
+
+def test_rusprofile_snippet_keeps_own_name_and_okved(monkeypatch):
+    searcher = CompanySearcher(base_url='https://rusprofile.test')
+    monkeypatch.setattr(searcher, 'fetch_page', lambda url: _page(RUSPROFILE_RESULTS))
+    company = searcher.search_company_by_name('Альфа Перевод Сибирь', ('inn', 'name'))
+    assert (company['inn'], company['name'], company['okved_main']) == (
+        '7700000002', 'ООО "Альфа Перевод Сибирь"', '62.01')
+
+
+def test_list_org_snippet_keeps_own_name_and_okved(monkeypatch):
+    collector = ListOrgCollector(base_url='https://list-org.test')
+    monkeypatch.setattr(collector, 'fetch_page', lambda url: _page(LIST_ORG_RESULTS))
+    company = collector.search_company_by_name('Альфа Перевод Сибирь', ('inn', 'name'))
+    assert (company['inn'], company['name'], company['okved_main']) == (
+        '7700000002', 'ООО "Альфа Перевод Сибирь"', '62.01')
@@ -0,0 +1,61 @@
+import time
+
+from src.utils.work_queue import DONE, FAILED, LEASED, LOOKUP, PENDING, WorkQueue
+
+
+def make_queue(tmp_path, **kwargs) -> WorkQueue:
+    return WorkQueue(str(tmp_path / 'queue.sqlite'), **kwargs)
+
+
+def test_leased_task_is_not_given_to_another_worker(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.enqueue(LOOKUP, ['ООО Альфа', 'ООО Бета', 'ООО Альфа']) == 2
+
+    first = queue.lease(LOOKUP, 'worker-1')
+    second = queue.lease(LOOKUP, 'worker-2')
+    assert first[1] == 'ООО Альфа'
+    assert second[1] == 'ООО Бета'
+    assert queue.lease(LOOKUP, 'worker-3') is None
+
+    assert queue.complete(first[0], 'worker-1', {'inn': '7700000001'})
+    assert queue.stats(LOOKUP) == {DONE: 1, LEASED: 1}
+    assert list(queue.results(LOOKUP)) == [('ООО Альфа', {'inn': '7700000001'})]
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.05)
+    queue.enqueue(LOOKUP, ['ООО Альфа'])
+
+    task_id, _ = queue.lease(LOOKUP, 'worker-1')
+    assert queue.lease(LOOKUP, 'worker-2') is None
+    time.sleep(0.1)
+
+    # Воркер пропал - задание переходит к другому, а поздний отчет первого отклоняется
+    assert queue.lease(LOOKUP, 'worker-2') == (task_id, 'ООО Альфа')
+    assert not queue.complete(task_id, 'worker-1', {'inn': '7700000001'})
+    assert queue.complete(task_id, 'worker-2', {'inn': '7700000001'})
+
+
+def test_abandoned_task_fails_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.01, max_attempts=2)
+    queue.enqueue(LOOKUP, ['ООО Альфа'])
+
+    for owner in ('worker-1', 'worker-2'):
+        assert queue.lease(LOOKUP, owner) is not None
+        time.sleep(0.02)
+
+    assert queue.lease(LOOKUP, 'worker-3') is None
+    assert queue.stats(LOOKUP) == {FAILED: 1}
+
+
+def test_failed_attempt_returns_task_to_queue(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    queue.enqueue(LOOKUP, ['ООО Альфа'])
+
+    task_id, _ = queue.lease(LOOKUP, 'worker-1')
+    assert queue.fail(task_id, 'worker-1', 'network_error')
+    assert queue.stats(LOOKUP) == {PENDING: 1}
+
+    task_id, _ = queue.lease(LOOKUP, 'worker-2')
+    assert queue.fail(task_id, 'worker-2', 'network_error')
+    assert queue.stats(LOOKUP) == {FAILED: 1}